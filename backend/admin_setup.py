@@ -6,20 +6,20 @@ Professional RBAC implementation for Vantage platform
 
 import sys
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from models import User, Base
-from database import DatabaseManager
-from config import Config
+import shared_db
+from shared_db import get_db_manager
 
 def add_admin_columns():
     """Add admin role columns to existing users table"""
     try:
-        # Use database URL from config
-        database_url = Config.DATABASE_URL
-        engine = create_engine(database_url)
+        db_manager = get_db_manager()
+        # Fresh database: create the tables (users already has the columns then)
+        db_manager.create_tables()
         
-        with engine.connect() as conn:
+        with db_manager.engine.connect() as conn:
             # Check if columns exist before adding them
             result = conn.execute(text("""
                 SELECT column_name 
@@ -55,7 +55,7 @@ def add_admin_columns():
 def promote_user_to_admin(email: str, role: str = 'admin'):
     """Promote a user to admin role by email"""
     try:
-        db_manager = DatabaseManager(Config.DATABASE_URL)
+        db_manager = get_db_manager()
         
         with db_manager.get_session() as session:
             user = session.query(User).filter(User.email == email).first()
@@ -82,7 +82,7 @@ def promote_user_to_admin(email: str, role: str = 'admin'):
 def promote_user_by_id(user_id: int, role: str = 'admin'):
     """Promote a user to admin role by user ID"""
     try:
-        db_manager = DatabaseManager(Config.DATABASE_URL)
+        db_manager = get_db_manager()
         
         with db_manager.get_session() as session:
             user = session.query(User).filter(User.id == user_id).first()
@@ -110,7 +110,7 @@ def promote_user_by_id(user_id: int, role: str = 'admin'):
 def update_user_info(user_id: int, email: str = None, first_name: str = None, last_name: str = None):
     """Update user information manually"""
     try:
-        db_manager = DatabaseManager(Config.DATABASE_URL)
+        db_manager = get_db_manager()
         
         with db_manager.get_session() as session:
             user = session.query(User).filter(User.id == user_id).first()
@@ -140,7 +140,7 @@ def update_user_info(user_id: int, email: str = None, first_name: str = None, la
 def list_admin_users():
     """List all admin users"""
     try:
-        db_manager = DatabaseManager(Config.DATABASE_URL)
+        db_manager = get_db_manager()
         
         with db_manager.get_session() as session:
             admin_users = session.query(User).filter(User.is_admin == True).all()
@@ -162,7 +162,7 @@ def list_admin_users():
 def list_all_users():
     """List all users to help debug"""
     try:
-        db_manager = DatabaseManager(Config.DATABASE_URL)
+        db_manager = get_db_manager()
         
         with db_manager.get_session() as session:
             all_users = session.query(User).all()
@@ -187,7 +187,7 @@ def list_all_users():
 def search_user(search_term: str):
     """Search for users by email or name"""
     try:
-        db_manager = DatabaseManager(Config.DATABASE_URL)
+        db_manager = get_db_manager()
         
         with db_manager.get_session() as session:
             users = session.query(User).filter(
@@ -215,7 +215,7 @@ def search_user(search_term: str):
 def revoke_admin(email: str):
     """Revoke admin privileges from a user"""
     try:
-        db_manager = DatabaseManager(Config.DATABASE_URL)
+        db_manager = get_db_manager()
         
         with db_manager.get_session() as session:
             user = session.query(User).filter(User.email == email).first()
@@ -237,6 +237,8 @@ def revoke_admin(email: str):
 
 def main():
     """Main CLI interface"""
+    shared_db.configure('script')
+    
     if len(sys.argv) < 2:
         print("""
 🛡️  Vantage Admin Management Tool
@@ -18,7 +18,7 @@ from flask_cors import CORS
 from config import Config
 
 # Import database and initialization
-from database import DatabaseManager
+from shared_db import get_db_manager
 
 # Import controllers (blueprints)
 from controllers.user_controller import user_bp
@@ -29,6 +29,8 @@ from controllers.admin_controller import admin_bp
 from controllers.admin_token_controller import admin_token_bp
 from controllers.baseline_controller import baseline_bp
 from controllers.image_controller import image_bp
+from controllers.job_controller import job_bp
+from controllers.event_controller import event_bp
 
 # Import middleware
 from middleware.error_handlers import register_error_handlers
@@ -60,8 +62,10 @@ def create_app():
     # Create directories
     os.makedirs(Config.IMAGES_DIR, exist_ok=True)
     
-    # Initialize database manager
-    db_manager = DatabaseManager(Config.DATABASE_URL, Config.SQLALCHEMY_ENGINE_OPTIONS)
+    # Process-wide database manager (shared with controllers and services)
+    db_manager = get_db_manager()
+    if Config.DB_CREATE_TABLES:
+        db_manager.create_tables()
     
     # Initialize satellite service (choose based on configuration)
     if Config.USE_OPENCV:
@@ -84,10 +88,21 @@ def create_app():
     app.register_blueprint(admin_token_bp)
     app.register_blueprint(baseline_bp)
     app.register_blueprint(image_bp)
+    app.register_blueprint(job_bp)
+    app.register_blueprint(event_bp)
     
     # Register error handlers
     register_error_handlers(app)
     
+    # Read-your-writes: each request starts reading from replicas until it writes
+    from services.replica_service import reset_read_pin
+    app.before_request(reset_read_pin)
+    
+    # Start the baseline worker pool and resume baselines left unfinished by a previous run
+    from services.baseline_service import baseline_queue
+    baseline_queue.start()
+    app.baseline_queue = baseline_queue
+    
     # Initialize and start automatic analysis manager
     try:
         auto_analysis_manager = AutoAnalysisManager(db_manager, satellite_service)
@@ -103,6 +118,10 @@ def create_app():
 
 def shutdown_app(app):
     """Clean shutdown of application services"""
+    if hasattr(app, 'baseline_queue'):
+        app.baseline_queue.stop()
+        logger.info("🛰️ Baseline queue: STOPPED")
+    
     if hasattr(app, 'auto_analysis_manager') and app.auto_analysis_manager:
         try:
             app.auto_analysis_manager.stop()
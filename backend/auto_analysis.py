@@ -1,10 +1,14 @@
 # auto_analysis.py - מנהל ניתוחים אוטומטיים
 import os
+import time
 import uuid
 from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from config import Config
+from services.priority_service import sort_for_dispatch, schedule_meta
+
 class AutoAnalysisManager:
     """מנהל ניתוחים אוטומטיים - בודק ומבצע ניתוחים לפי לוח זמנים"""
     
@@ -71,16 +75,28 @@ class AutoAnalysisManager:
             
             print(f"🎯 נמצאו {len(aois_to_analyze)} AOIs זקוקים לניתוח")
             
+            # Highest effective priority first (overdue runs age upwards), then longest waiting
+            aois_to_analyze = sort_for_dispatch(aois_to_analyze)
+            
             # הגבלת מספר הניתוחים
             analyses_to_run = aois_to_analyze[:self.max_analyses_per_run]
             if len(aois_to_analyze) > self.max_analyses_per_run:
                 print(f"⚠️ מגביל ל-{self.max_analyses_per_run} ניתוחים בהרצה זו")
             
-            # הפעלת ניתוחים
+            # הפעלת ניתוחים - catch-up drains at CATCHUP_MAX_PER_MINUTE at most
             successful_analyses = 0
             failed_analyses = 0
-            
-            for aoi_data in analyses_to_run:
+            min_spacing = 60.0 / Config.CATCHUP_MAX_PER_MINUTE if Config.CATCHUP_MAX_PER_MINUTE > 0 else 0.0
+            last_started = None
+            
+            for index, aoi_data in enumerate(analyses_to_run, start=1):
+                if last_started is not None:
+                    wait = min_spacing - (time.monotonic() - last_started)
+                    if wait > 0:
+                        time.sleep(wait)
+                last_started = time.monotonic()
+                print(f"📈 התקדמות: {index}/{len(analyses_to_run)} (נותרו בפיגור: {len(aois_to_analyze) - index})")
+                
                 try:
                     success = self.run_automatic_analysis(aoi_data)
                     if success:
@@ -104,6 +120,7 @@ class AutoAnalysisManager:
         user_id = aoi_data['user_db_id']
         aoi_name = aoi_data['name']
         bbox = aoi_data['bbox_coordinates']
+        started_at = datetime.utcnow()
         
         print(f"🛰️ מתחיל ניתוח אוטומטי עבור: {aoi_name}")
         
@@ -170,18 +187,20 @@ class AutoAnalysisManager:
                 'processing_time': datetime.now().isoformat(),
                 'analysis_type': aoi_data['analysis_type'],
                 'automatic': True,
-                'change_percentage': change_percentage
+                'change_percentage': change_percentage,
+                **schedule_meta(aoi_data.get('priority'), aoi_data.get('next_run_at'), started_at)
             }
             
             analysis_id = self.db_manager.save_analysis(
                 user_id=user_id,
+                aoi_id=aoi_id,
                 process_id=process_id,
+                operation_name="AUTOMATIC ANALYSIS",
+                location_description=aoi_name,
                 bbox_coordinates=bbox,
                 image_filenames=filenames,
-                metadata=metadata,
-                aoi_id=aoi_id,
+                meta=metadata,
                 tokens_used=0,
-                is_automatic=True,
                 change_percentage=change_percentage
             )
             
@@ -248,6 +267,7 @@ class AutoAnalysisManager:
             'is_running': self.is_running,
             'check_interval_hours': self.check_interval_hours,
             'max_analyses_per_run': self.max_analyses_per_run,
+            'catchup_max_per_minute': Config.CATCHUP_MAX_PER_MINUTE,
             'scheduler_running': self.scheduler.running if hasattr(self.scheduler, 'running') else False
         }
     
@@ -20,7 +20,26 @@ def make_celery(app_name=__name__):
         result_serializer='json',
         timezone='UTC',
         enable_utc=True,
-        beat_schedule={},  # We'll populate this dynamically
+        # AOI priority maps onto message priority (0 = highest on the Redis transport)
+        broker_transport_options={
+            'priority_steps': list(range(10)),
+            'sep': ':',
+            'queue_order_strategy': 'priority',
+        },
+        # Fetch one message at a time so a busy worker does not hoard low-priority work
+        worker_prefetch_multiplier=1,
+        beat_schedule={
+            # Publish scheduled runs as ETA tasks only once they come within the horizon
+            'sweep-scheduled-analyses': {
+                'task': 'tasks.sweep_scheduled_analyses',
+                'schedule': Config.SCHEDULE_SWEEP_SECONDS,
+            },
+            # Move analyses past HISTORY_RETENTION_DAYS to the archive tier
+            'archive-analysis-history': {
+                'task': 'tasks.archive_analysis_history',
+                'schedule': Config.HISTORY_ARCHIVE_INTERVAL_SECONDS,
+            },
+        },
         beat_schedule_filename='celerybeat-schedule',
     )
     
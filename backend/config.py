@@ -17,6 +17,14 @@ class Config:
     # Authentication - Clerk
     CLERK_PUBLISHABLE_KEY = os.getenv('CLERK_PUBLISHABLE_KEY')
     CLERK_SECRET_KEY = os.getenv('CLERK_SECRET_KEY')
+    CLERK_JWKS_URL = os.getenv('CLERK_JWKS_URL')  # default: derived from CLERK_PUBLISHABLE_KEY
+    CLERK_JWKS_FILE = os.getenv('CLERK_JWKS_FILE')  # local JWKS stand-in (tests, offline development)
+    CLERK_ISSUER = os.getenv('CLERK_ISSUER')  # checked against the token's iss when set
+    CLERK_AUTHORIZED_PARTIES = [p for p in os.getenv('CLERK_AUTHORIZED_PARTIES', '').split(',') if p]
+    JWKS_REFRESH_SECONDS = int(os.getenv('JWKS_REFRESH_SECONDS', '3600'))
+    JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', '1024'))  # verified tokens kept until their exp
+    # Never enable outside local development: accepts any well-formed token
+    AUTH_SKIP_SIGNATURE_VERIFICATION = os.getenv('AUTH_SKIP_SIGNATURE_VERIFICATION', 'false').lower() == 'true'
     
     # Satellite API
     CLIENT_ID = os.getenv('CLIENT_ID')
@@ -41,6 +49,20 @@ class Config:
         'echo': os.getenv('DEBUG', 'false').lower() == 'true'
     }
 
+    # One engine per process (see shared_db.py); pool size depends on what the process does
+    DB_PROCESS_ROLE = os.getenv('DB_PROCESS_ROLE', 'api')  # api, worker or script; Celery workers set 'worker'
+    DB_POOL_SIZES = {  # role -> (pool_size, max_overflow)
+        'api': (int(os.getenv('DB_POOL_SIZE_API', '10')), int(os.getenv('DB_MAX_OVERFLOW_API', '10'))),
+        'worker': (int(os.getenv('DB_POOL_SIZE_WORKER', '2')), int(os.getenv('DB_MAX_OVERFLOW_WORKER', '3'))),
+        'script': (2, 0)
+    }
+    DB_CREATE_TABLES = os.getenv('DB_CREATE_TABLES', 'true').lower() == 'true'  # create_all once at API startup
+    
+    # Read replicas for read-only queries (comma-separated URLs, empty = primary only)
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    DB_REPLICA_HEALTH_SECONDS = float(os.getenv('DB_REPLICA_HEALTH_SECONDS', '30'))  # re-check each replica this often
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '30'))  # skip replicas further behind
+
     
     # Image processing configuration
     USE_OPENCV = os.getenv('USE_OPENCV', 'true').lower() == 'true'
@@ -52,6 +74,77 @@ class Config:
     AWS_S3_BUCKET = os.getenv('AWS_S3_BUCKET')
     S3_UPLOAD_ENABLED = os.getenv('S3_UPLOAD_ENABLED', 'true').lower() == 'true'
     
+    # Baseline creation queue
+    BASELINE_WORKERS = int(os.getenv('BASELINE_WORKERS', '2'))
+    BASELINE_QUEUE_SIZE = int(os.getenv('BASELINE_QUEUE_SIZE', '100'))
+    BASELINE_RESCAN_SECONDS = int(os.getenv('BASELINE_RESCAN_SECONDS', '60'))
+    BASELINE_STALE_MINUTES = int(os.getenv('BASELINE_STALE_MINUTES', '30'))  # 'processing' claims older than this are reset
+    
+    # Admission control for synchronous analysis endpoints (per API process)
+    ANALYSIS_MAX_CONCURRENT = int(os.getenv('ANALYSIS_MAX_CONCURRENT', '4'))
+    ANALYSIS_MAX_PER_USER = int(os.getenv('ANALYSIS_MAX_PER_USER', '1'))
+    ANALYSIS_MAX_WAITING = int(os.getenv('ANALYSIS_MAX_WAITING', '8'))
+    ANALYSIS_ADMISSION_WAIT_SECONDS = float(os.getenv('ANALYSIS_ADMISSION_WAIT_SECONDS', '10'))
+    
+    # UserActivity rows are buffered per process and bulk-inserted off the request path
+    ACTIVITY_BUFFER_ENABLED = os.getenv('ACTIVITY_BUFFER_ENABLED', 'true').lower() == 'true'
+    ACTIVITY_BATCH_SIZE = int(os.getenv('ACTIVITY_BATCH_SIZE', '500'))  # flush when this many rows are buffered
+    ACTIVITY_FLUSH_SECONDS = float(os.getenv('ACTIVITY_FLUSH_SECONDS', '2'))  # ... or at least this often
+    ACTIVITY_MAX_BUFFER = int(os.getenv('ACTIVITY_MAX_BUFFER', '10000'))  # oldest entries dropped beyond this
+    
+    # Authenticated-user cache for require_auth (0 disables); entries are invalidated on change
+    USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', '30'))  # in-process tier, bounds cross-process staleness
+    USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000'))
+    USER_CACHE_REDIS_TTL_SECONDS = int(os.getenv('USER_CACHE_REDIS_TTL_SECONDS', '0'))  # shared Redis tier, 0 = off
+    
+    # Scheduled analysis ETA tasks
+    SCHEDULE_ETA_HORIZON_MINUTES = int(os.getenv('SCHEDULE_ETA_HORIZON_MINUTES', '60'))  # publish ETA tasks at most this far ahead
+    SCHEDULE_SWEEP_SECONDS = int(os.getenv('SCHEDULE_SWEEP_SECONDS', '300'))  # must be shorter than the horizon
+    SCHEDULE_RETRY_DELAY_MINUTES = int(os.getenv('SCHEDULE_RETRY_DELAY_MINUTES', '30'))  # first retry of a failed scheduled run; doubles per failure
+    SCHEDULE_MAX_RETRIES = int(os.getenv('SCHEDULE_MAX_RETRIES', '3'))  # after this many failed retries the run moves to the next slot
+    SCHEDULE_RUN_TIMEOUT_MINUTES = int(os.getenv('SCHEDULE_RUN_TIMEOUT_MINUTES', '120'))  # claim of a run still going after this is stale
+    
+    # Scheduling priority: overdue runs are promoted one level per aging window
+    PRIORITY_AGING_MINUTES = int(os.getenv('PRIORITY_AGING_MINUTES', '30'))
+    SCHEDULE_SLO_SECONDS = {  # max delay between scheduled time and run start
+        'HIGH': int(os.getenv('SCHEDULE_SLO_HIGH_SECONDS', '300')),
+        'MEDIUM': int(os.getenv('SCHEDULE_SLO_MEDIUM_SECONDS', '1800')),
+        'LOW': int(os.getenv('SCHEDULE_SLO_LOW_SECONDS', '7200'))
+    }
+    
+    # Catch-up after an outage: overdue runs drain at a bounded rate, most urgent first
+    CATCHUP_MAX_PER_MINUTE = float(os.getenv('CATCHUP_MAX_PER_MINUTE', '10'))
+    CATCHUP_COLLAPSE_MISSED = os.getenv('CATCHUP_COLLAPSE_MISSED', 'true').lower() == 'true'  # one run for several missed slots
+    
+    # Recurring runs without a user-chosen time get a per-AOI slot inside this UTC window
+    SCHEDULE_SLOT_WINDOW_START_HOUR = int(os.getenv('SCHEDULE_SLOT_WINDOW_START_HOUR', '0'))
+    SCHEDULE_SLOT_WINDOW_HOURS = float(os.getenv('SCHEDULE_SLOT_WINDOW_HOURS', '24'))
+    
+    # Per-AOI statistics (aoi_stats): weight of the newest analysis in the rolling change average
+    AOI_STATS_EWMA_ALPHA = float(os.getenv('AOI_STATS_EWMA_ALPHA', '0.3'))
+    
+    # AOI spatial queries: first search radius of nearest_aois (widened 4x until enough AOIs are found)
+    AOI_KNN_START_KM = float(os.getenv('AOI_KNN_START_KM', '25'))
+    
+    # Change-metric series (aoi_change_metrics): most points returned by an unbucketed query
+    CHANGE_METRICS_MAX_POINTS = int(os.getenv('CHANGE_METRICS_MAX_POINTS', '1000'))
+    
+    # analysis_history retention: older analyses move to analysis_history_archive (0 keeps everything hot)
+    HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', '180'))
+    HISTORY_ARCHIVE_BATCH_SIZE = int(os.getenv('HISTORY_ARCHIVE_BATCH_SIZE', '1000'))  # rows per transaction
+    HISTORY_ARCHIVE_INTERVAL_SECONDS = int(os.getenv('HISTORY_ARCHIVE_INTERVAL_SECONDS', '3600'))
+    
+    # Admin dashboard statistics snapshot
+    ADMIN_STATS_TTL_SECONDS = float(os.getenv('ADMIN_STATS_TTL_SECONDS', '60'))
+    ADMIN_STATS_BACKGROUND_REFRESH = os.getenv('ADMIN_STATS_BACKGROUND_REFRESH', 'true').lower() == 'true'  # serve stale while recomputing
+    
+    # Redis (Celery broker, event pub/sub)
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Server-Sent Events
+    SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+    SSE_MAX_STREAM_SECONDS = int(os.getenv('SSE_MAX_STREAM_SECONDS', '300'))  # clients reconnect after this
+    
     # API Configuration
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
     API_PORT = int(os.getenv('API_PORT', '5000'))
@@ -11,8 +11,10 @@ import re
 
 from utils.decorators import require_auth, handle_errors
 from utils.responses import success_response, error_response, not_found_response
+from utils.pagination import parse_total_mode
+from utils.bbox import parse_bbox, parse_point, tile_bbox
 from shared_db import db_manager
-from models import User, AreaOfInterest, AnalysisHistory, UserActivity
+from models import User, AreaOfInterest, AnalysisHistory, AnalysisHistoryArchive, UserActivity
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -60,8 +62,9 @@ def get_admin_stats():
         return error_response('Admin access required', 'FORBIDDEN', 403)
     
     try:
-        # Use the database manager method we created
-        stats = db_manager.get_admin_stats()
+        # Cached snapshot; ?refresh=true recomputes it now
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        stats = db_manager.get_admin_stats(refresh=refresh)
         
         return success_response(
             data={'stats': stats},
@@ -77,6 +80,155 @@ def get_admin_stats():
         )
 
 
+@admin_bp.route('/admin/users')
+@require_auth
+@handle_errors
+def get_admin_users():
+    """List users, newest first, with keyset pagination (?limit=&cursor=&total=none|estimate|exact)"""
+    user = request.user
+    
+    # Check if user is admin
+    if not user.get('is_admin') and user.get('role') not in ['admin', 'super_admin']:
+        return error_response('Admin access required', 'FORBIDDEN', 403)
+    
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    page = db_manager.get_all_users_paginated(
+        per_page=limit,
+        cursor=request.args.get('cursor'),
+        total=parse_total_mode(request.args.get('total'))
+    )
+    
+    return success_response(
+        data=page,
+        message="Users retrieved successfully"
+    )
+
+
+@admin_bp.route('/admin/baseline-queue')
+@require_auth
+@handle_errors
+def get_baseline_queue_metrics():
+    """Get baseline creation queue metrics"""
+    user = request.user
+    
+    # Check if user is admin
+    if not user.get('is_admin') and user.get('role') not in ['admin', 'super_admin']:
+        return error_response('Admin access required', 'FORBIDDEN', 403)
+    
+    from services.baseline_service import baseline_queue
+    
+    return success_response(
+        data={'baseline_queue': baseline_queue.get_metrics()},
+        message="Baseline queue metrics retrieved successfully"
+    )
+
+
+@admin_bp.route('/admin/admission')
+@require_auth
+@handle_errors
+def get_admission_metrics():
+    """Get admission control metrics for the synchronous analysis endpoints (this process)"""
+    user = request.user
+
+    # Check if user is admin
+    if not user.get('is_admin') and user.get('role') not in ['admin', 'super_admin']:
+        return error_response('Admin access required', 'FORBIDDEN', 403)
+
+    from services.admission_service import admission_controller
+
+    return success_response(
+        data={'admission': admission_controller.get_metrics()},
+        message="Admission metrics retrieved successfully"
+    )
+
+
+@admin_bp.route('/admin/database')
+@require_auth
+@handle_errors
+def get_database_metrics():
+    """Get connection pool and read replica status (this process)"""
+    user = request.user
+
+    # Check if user is admin
+    if not user.get('is_admin') and user.get('role') not in ['admin', 'super_admin']:
+        return error_response('Admin access required', 'FORBIDDEN', 403)
+
+    import shared_db
+
+    return success_response(
+        data={
+            'role': shared_db.current_role(),
+            'pool': db_manager.engine.pool.status(),
+            'replicas': db_manager.replicas.get_metrics() if db_manager.replicas is not None else None
+        },
+        message="Database metrics retrieved successfully"
+    )
+
+
+@admin_bp.route('/admin/aois/spatial')
+@require_auth
+@handle_errors
+def search_aois_spatial():
+    """
+    Spatial AOI search across all users: ?bbox=min_lon,min_lat,max_lon,max_lat
+    with ?mode=intersects|contains|within, ?tile=z/x/y (AOIs intersecting a map
+    tile), ?near=lon,lat&k= (nearest AOIs) or ?tiles=<zoom> (AOIs sharing a tile).
+    ?include_inactive=true also returns deactivated AOIs.
+    """
+    user = request.user
+
+    # Check if user is admin
+    if not user.get('is_admin') and user.get('role') not in ['admin', 'super_admin']:
+        return error_response('Admin access required', 'FORBIDDEN', 403)
+
+    active_only = request.args.get('include_inactive', 'false').lower() != 'true'
+    limit = min(max(request.args.get('limit', 500, type=int), 1), 5000)
+    data = {'backend': db_manager.spatial_backend()}
+
+    if request.args.get('near'):
+        lon, lat = parse_point(request.args['near'])
+        k = min(max(request.args.get('k', 10, type=int), 1), 100)
+        data['aois'] = db_manager.nearest_aois(lon, lat, k=k, active_only=active_only)
+    elif request.args.get('tiles'):
+        zoom = min(max(request.args.get('tiles', type=int) or 0, 0), 18)
+        data['tile_groups'] = db_manager.get_aoi_tile_groups(zoom, active_only=active_only)
+    else:
+        if request.args.get('tile'):
+            try:
+                z, x, y = (int(part) for part in request.args['tile'].split('/'))
+            except ValueError:
+                raise ValueError("tile must be z/x/y")
+            bbox = tile_bbox(z, x, y)
+        elif request.args.get('bbox'):
+            bbox = parse_bbox(request.args['bbox'])
+        else:
+            return error_response('One of bbox, tile, near or tiles is required', 'VALIDATION_ERROR', 400)
+        mode = request.args.get('mode', 'intersects')
+        data.update(bbox=list(bbox), mode=mode)
+        data['aois'] = db_manager.find_aois_by_bbox(bbox, mode=mode, active_only=active_only, limit=limit)
+
+    return success_response(data=data, message="Spatial AOI search completed")
+
+
+@admin_bp.route('/admin/scheduler/slo')
+@require_auth
+@handle_errors
+def get_schedule_slo_metrics():
+    """Get per-priority scheduling latency against SLO targets"""
+    user = request.user
+
+    # Check if user is admin
+    if not user.get('is_admin') and user.get('role') not in ['admin', 'super_admin']:
+        return error_response('Admin access required', 'FORBIDDEN', 403)
+
+    hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 30)
+
+    return success_response(
+        data={'schedule_latency': db_manager.get_schedule_latency_stats(hours=hours)},
+        message="Scheduling SLO metrics retrieved successfully"
+    )
+
+
 @admin_bp.route('/debug/user-status')
 @require_auth
 @handle_errors
@@ -97,6 +249,8 @@ def debug_user_status():
         
         analysis_count = session.query(AnalysisHistory).filter_by(
             user_id=user_id
+        ).count() + session.query(AnalysisHistoryArchive).filter_by(
+            user_id=user_id
         ).count()
         
         recent_activity = session.query(UserActivity).filter_by(
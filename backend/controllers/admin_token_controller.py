@@ -7,6 +7,7 @@ from flask import Blueprint, request, jsonify
 
 from utils.decorators import require_auth, handle_errors
 from utils.responses import success_response, error_response, not_found_response
+from utils.pagination import parse_total_mode
 from shared_db import db_manager
 
 logger = logging.getLogger(__name__)
@@ -84,12 +85,20 @@ def add_tokens_to_user():
 @handle_errors
 def get_all_transactions():
     """Get all token transactions (admin view)"""
-    limit = request.args.get('limit', 100, type=int)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
     
-    transactions = db_manager.get_all_token_transactions(limit=limit)
+    page = db_manager.get_token_transactions_page(
+        limit=limit,
+        cursor=request.args.get('cursor'),
+        total=parse_total_mode(request.args.get('total'))
+    )
     
     return success_response(
-        data={'transactions': transactions, 'total_count': len(transactions)},
+        data={
+            'transactions': page['transactions'],
+            'total_count': len(page['transactions']),
+            'pagination': page['pagination']
+        },
         message="Token transactions retrieved successfully"
     )
 
@@ -100,20 +109,26 @@ def get_all_transactions():
 @handle_errors
 def get_user_transactions(user_id):
     """Get token transactions for a specific user"""
-    limit = request.args.get('limit', 50, type=int)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
     
     # Verify user exists
     user = db_manager.get_user_by_id(user_id)
     if not user:
         return not_found_response("User not found")
     
-    transactions = db_manager.get_user_token_transactions(user_id, limit=limit)
+    page = db_manager.get_token_transactions_page(
+        limit=limit,
+        cursor=request.args.get('cursor'),
+        user_id=user_id,
+        total=parse_total_mode(request.args.get('total'))
+    )
     
     return success_response(
         data={
             'user': user,
-            'transactions': transactions, 
-            'total_count': len(transactions)
+            'transactions': page['transactions'], 
+            'total_count': len(page['transactions']),
+            'pagination': page['pagination']
         },
         message=f"Token transactions for user {user['email']} retrieved successfully"
     )
@@ -135,41 +150,30 @@ def bulk_grant_tokens():
     if not users:
         return error_response("users list is required", "VALIDATION_ERROR", 400)
     
-    results = []
-    errors = []
+    outcomes = db_manager.bulk_add_tokens(
+        [
+            {'email': user_data.get('email'), 'amount': user_data.get('amount', default_amount)}
+            for user_data in users
+        ],
+        transaction_type='admin_grant',
+        admin_user_id=admin_user['id'],
+        admin_note=f"Bulk grant: {admin_note}"
+    )
     
-    for user_data in users:
-        user_email = user_data.get('email')
-        amount = user_data.get('amount', default_amount)
-        
-        if not user_email:
-            errors.append({'email': 'missing', 'error': 'Email required'})
-            continue
-            
-        # Find user
-        user = db_manager.get_user_by_email(user_email)
-        if not user:
-            errors.append({'email': user_email, 'error': 'User not found'})
-            continue
-        
-        # Add tokens
-        result = db_manager.add_tokens_to_user(
-            user_id=user['id'],
-            amount=amount,
-            transaction_type='admin_grant',
-            admin_user_id=admin_user['id'],
-            admin_note=f"Bulk grant: {admin_note}"
-        )
-        
-        if result['success']:
-            results.append({
-                'email': user_email,
-                'amount': amount,
-                'new_balance': result['balance_after'],
-                'transaction_id': result['transaction_id']
-            })
-        else:
-            errors.append({'email': user_email, 'error': result['message']})
+    results = [
+        {
+            'row': outcome['row'],
+            'email': outcome['email'],
+            'amount': outcome['amount'],
+            'new_balance': outcome['new_balance'],
+            'transaction_id': outcome['transaction_id']
+        }
+        for outcome in outcomes if outcome['success']
+    ]
+    errors = [
+        {'row': outcome['row'], 'email': outcome['email'], 'error': outcome['error']}
+        for outcome in outcomes if not outcome['success']
+    ]
     
     logger.info(f"Admin {admin_user['email']} performed bulk token grant: {len(results)} successful, {len(errors)} errors")
     
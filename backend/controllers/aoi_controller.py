@@ -8,8 +8,8 @@ from flask import Blueprint, request, jsonify
 
 from utils.decorators import require_auth, handle_errors
 from utils.responses import success_response, error_response, not_found_response
+from utils.time_buckets import parse_bucket
 from shared_db import db_manager
-from models import AreaOfInterest
 
 logger = logging.getLogger(__name__)
 
@@ -149,84 +149,9 @@ def get_aoi_dashboard_view(aoi_id):
     
     logger.info(f"Getting dashboard view for AOI {aoi_id}, user {user_id}")
     
-    with db_manager.get_session() as session:
-        from sqlalchemy.sql import func
-        from models import AnalysisHistory
-        
-        # Get AOI details
-        aoi = session.query(AreaOfInterest).filter_by(
-            id=aoi_id, 
-            user_id=user_id
-        ).first()
-        
-        if not aoi:
-            return not_found_response("AOI not found")
-        
-        # Get analysis history (last 10 analyses)
-        analyses = session.query(AnalysisHistory).filter_by(
-            aoi_id=aoi_id
-        ).order_by(AnalysisHistory.analysis_timestamp.desc()).limit(10).all()
-        
-        # Get statistics
-        total_analyses = session.query(AnalysisHistory).filter_by(aoi_id=aoi_id).count()
-        total_tokens_used = session.query(func.sum(AnalysisHistory.tokens_used)).filter_by(aoi_id=aoi_id).scalar() or 0
-        
-        # Get latest analysis for quick view
-        latest_analysis = analyses[0] if analyses else None
-        
-        # Calculate monitoring status
-        last_analysis_date = latest_analysis.analysis_timestamp if latest_analysis else None
-        monitoring_status = "active" if latest_analysis and (
-            datetime.now() - latest_analysis.analysis_timestamp
-        ).days < 30 else "idle"
-        
-        dashboard_data = {
-            'aoi': {
-                'id': aoi.id,
-                'name': aoi.name,
-                'description': aoi.description,
-                'location_name': aoi.location_name,
-                'bbox_coordinates': aoi.bbox_coordinates,
-                'classification': aoi.classification,
-                'priority': aoi.priority,
-                'color_code': aoi.color_code,
-                'monitoring_frequency': aoi.monitoring_frequency,
-                'baseline_status': aoi.baseline_status,
-                'baseline_date': aoi.baseline_date.isoformat() if aoi.baseline_date else None,
-                'created_at': aoi.created_at.isoformat() if aoi.created_at else None
-            },
-            'statistics': {
-                'total_analyses': total_analyses,
-                'total_tokens_used': total_tokens_used,
-                'monitoring_status': monitoring_status,
-                'last_analysis_date': last_analysis_date.isoformat() if last_analysis_date else None
-            },
-            'baseline': {
-                'status': aoi.baseline_status,
-                'image_url': f'/api/image/{aoi.baseline_image_filename}' if aoi.baseline_image_filename else None,
-                'date': aoi.baseline_date.isoformat() if aoi.baseline_date else None
-            },
-            'recent_analyses': [
-                {
-                    'id': analysis.id,
-                    'process_id': analysis.process_id,
-                    'operation_name': analysis.operation_name,
-                    'analysis_timestamp': analysis.analysis_timestamp.isoformat(),
-                    'change_percentage': analysis.change_percentage,
-                    'tokens_used': analysis.tokens_used,
-                    'images': {
-                        'baseline_url': f'/api/image/{analysis.image1_filename}' if analysis.image1_filename else None,
-                        'current_url': f'/api/image/{analysis.image2_filename}' if analysis.image2_filename else None,
-                        'heatmap_url': f'/api/image/{analysis.heatmap_filename}' if analysis.heatmap_filename else None
-                    }
-                } for analysis in analyses
-            ],
-            'actions_available': {
-                'can_run_analysis': aoi.baseline_status == 'completed',
-                'can_schedule_monitoring': True,
-                'can_update_baseline': True
-            }
-        }
+    dashboard_data = db_manager.get_aoi_dashboard_view(aoi_id, user_id)
+    if not dashboard_data:
+        return not_found_response("AOI not found")
     
     return success_response(
         data={'dashboard': dashboard_data},
@@ -240,31 +165,44 @@ def get_aoi_dashboard_view(aoi_id):
 def get_aoi_history(aoi_id):
     """Get analysis history for specific AOI"""
     user_id = request.user['id']
-    limit = request.args.get('limit', 20, type=int)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
     
-    with db_manager.get_session() as session:
-        from models import AnalysisHistory
-        
-        # Verify access
-        aoi = session.query(AreaOfInterest).filter_by(
-            id=aoi_id, 
-            user_id=user_id
-        ).first()
-        
-        if not aoi:
-            return not_found_response("AOI not found")
-        
-        # Get analysis history
-        analyses = session.query(AnalysisHistory).filter_by(
-            aoi_id=aoi_id
-        ).order_by(AnalysisHistory.analysis_timestamp.desc()).limit(limit).all()
+    history = db_manager.get_aoi_history(aoi_id, user_id, limit=limit, cursor=request.args.get('cursor'))
+    if history is None:
+        return not_found_response("AOI not found")
     
     return success_response(
         data={
             'aoi_id': aoi_id,
-            'aoi_name': aoi.name,
-            'analyses': [analysis.to_dict() for analysis in analyses],
-            'total_count': len(analyses)
+            'aoi_name': history['aoi_name'],
+            'analyses': history['analyses'],
+            'total_count': len(history['analyses']),
+            'pagination': history['pagination']
         },
         message="AOI analysis history retrieved successfully"
-    )
\ No newline at end of file
+    )
+
+
+@aoi_bp.route('/<int:aoi_id>/metrics')
+@require_auth
+@handle_errors
+def get_aoi_metrics(aoi_id):
+    """
+    Change-metric trend for an AOI: ?bucket=day|week|month (min/max/avg per
+    bucket) or raw, over ?since= / ?until= (ISO dates, default the last year)
+    """
+    user_id = request.user['id']
+    bucket = parse_bucket(request.args.get('bucket'), allow_raw=True)
+    until = request.args.get('until')
+    until = datetime.fromisoformat(until) if until else None
+    since = request.args.get('since')
+    since = datetime.fromisoformat(since) if since else (until or datetime.now()) - timedelta(days=365)
+    
+    metrics = db_manager.get_aoi_change_metrics(aoi_id, user_id, bucket=bucket, since=since, until=until)
+    if metrics is None:
+        return not_found_response("AOI not found")
+    
+    return success_response(
+        data=metrics,
+        message="AOI change metrics retrieved successfully"
+    )
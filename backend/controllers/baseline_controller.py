@@ -38,12 +38,14 @@ def create_baseline_manual(aoi_id):
         if aoi.baseline_status == 'processing':
             return error_response("Baseline creation already in progress", "BASELINE_IN_PROGRESS", 400)
     
-    # Start baseline creation
-    create_baseline_async(aoi_id)
+    # Queue baseline creation
+    queue_status = create_baseline_async(aoi_id)
+    if queue_status == 'duplicate':
+        return error_response("Baseline creation already queued", "BASELINE_IN_PROGRESS", 400)
     
     return success_response(
-        data={'aoi_id': aoi_id},
-        message="Baseline creation started"
+        data={'aoi_id': aoi_id, 'baseline_status': 'pending', 'queue_status': queue_status},
+        message="Baseline creation queued"
     )
 
 
@@ -0,0 +1,64 @@
+"""
+Event Controller
+Server-Sent Events stream for baseline and analysis completion
+"""
+import json
+import time
+import logging
+from flask import Blueprint, Response, request, stream_with_context
+
+from utils.decorators import require_auth, allow_query_token
+from services.event_service import event_broker
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+event_bp = Blueprint('events', __name__, url_prefix='/api/events')
+
+
+def _format_sse(event_type, payload):
+    """Format one SSE frame"""
+    return f"event: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@event_bp.route('/stream')
+@require_auth
+@allow_query_token
+def event_stream():
+    """
+    Stream baseline status transitions, job updates and analysis completions
+    for the authenticated user. Replaces polling the baseline/dashboard endpoints.
+    """
+    user_id = request.user['id']
+    logger.info(f"Event stream opened for user {user_id}")
+
+    def generate():
+        deadline = time.monotonic() + Config.SSE_MAX_STREAM_SECONDS
+        # Tell EventSource how quickly to reconnect once the stream is recycled
+        yield "retry: 3000\n\n"
+        yield _format_sse('connected', {'user_id': user_id})
+
+        events = event_broker.subscribe(user_id, heartbeat_seconds=Config.SSE_HEARTBEAT_SECONDS)
+        try:
+            for event in events:
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield _format_sse(event['type'], event)
+
+                if time.monotonic() >= deadline:
+                    break
+        finally:
+            events.close()
+            logger.info(f"Event stream closed for user {user_id}")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # disable proxy buffering (nginx)
+        }
+    )
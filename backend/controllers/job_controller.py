@@ -0,0 +1,35 @@
+"""
+Job Controller
+Handles status polling for asynchronous analysis jobs
+"""
+import logging
+from flask import Blueprint, request
+
+from utils.decorators import require_auth, handle_errors
+from utils.responses import success_response, not_found_response
+from shared_db import db_manager
+
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+job_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+
+@job_bp.route('/<job_id>', methods=['GET'])
+@require_auth
+@handle_errors
+def get_job_status(job_id):
+    """Get status, current stage and per-stage timings of an analysis job"""
+    user_id = request.user['id']
+    
+    job = db_manager.get_analysis_job(job_id, user_id=user_id)
+    if not job:
+        return not_found_response("Job not found")
+    
+    job.pop('params', None)
+    
+    return success_response(
+        data={'job': job},
+        message="Job status retrieved successfully"
+    )
@@ -3,13 +3,14 @@ Schedule Controller
 Handles scheduling and monitoring API endpoints
 """
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from flask import Blueprint, request
 
 from utils.decorators import require_auth, handle_errors
 from utils.responses import success_response, error_response, not_found_response
 from shared_db import db_manager
 from models import AreaOfInterest
+from services.schedule_slots import next_slot
 
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,17 @@ schedule_bp = Blueprint('schedule', __name__, url_prefix='/api')
 
 
 
+def _reschedule_celery(aoi_id, next_run_at):
+    """Revoke the AOI's pending ETA task and schedule next_run_at (None cancels)"""
+    try:
+        from tasks import reschedule_aoi
+        task_id = reschedule_aoi(aoi_id, next_run_at)
+        logger.info(f"Rescheduled Celery task for AOI {aoi_id}: {task_id}")
+    except Exception as e:
+        logger.error(f"Failed to schedule Celery task: {e}")
+        # Continue anyway - the sweeper and APScheduler fallback will handle it
+
+
 @schedule_bp.route('/aoi/<int:aoi_id>/schedule-monitoring', methods=['GET','POST','DELETE','OPTIONS'])
 @require_auth
 @handle_errors
@@ -78,6 +90,7 @@ def schedule_monitoring(aoi_id):
                 logger.info(f"🗑️ Disabling/removing schedule for AOI {aoi_id}")
                 aoi.monitoring_frequency = None
                 aoi.next_run_at = None
+                aoi.schedule_anchor_at = None
                 # Keep AOI active, just remove schedule
             else:
                 # This is an enable/create request
@@ -100,7 +113,9 @@ def schedule_monitoring(aoi_id):
                             parsed_time = datetime(*utc_time[:6])
                             logger.info(f"🕐 Converted to UTC: {parsed_time}")
                         
+                        # An explicit time is honored as given and anchors later runs
                         aoi.next_run_at = parsed_time
+                        aoi.schedule_anchor_at = parsed_time
                         logger.info(f"🕐 Final stored time: {aoi.next_run_at}")
                         
                         # Also log current server time for comparison
@@ -111,29 +126,13 @@ def schedule_monitoring(aoi_id):
                         logger.error(f"❌ Failed to parse scheduled_at '{scheduled_at}': {e}")
                         return error_response(f"Invalid scheduled_at format: {e}", "VALIDATION_ERROR", 400)
                 else:
-                    # Fallback to frequency-based scheduling
-                    if freq == 'daily':
-                        aoi.next_run_at = datetime.utcnow() + timedelta(days=1)
-                    elif freq == 'weekly':
-                        aoi.next_run_at = datetime.utcnow() + timedelta(days=7)
-                    elif freq == 'monthly':
-                        aoi.next_run_at = datetime.utcnow() + timedelta(days=30)
-                    elif freq == 'once':
-                        # For one-time scheduling, we need the scheduled_at parameter
-                        if not scheduled_at:
-                            return error_response("scheduled_at parameter is required for one-time scheduling", "VALIDATION_ERROR", 400)
-                    else:
-                        aoi.next_run_at = datetime.utcnow() + timedelta(days=7)  # Default to weekly
-                
-                # Schedule with Celery
-                if aoi.next_run_at:
-                    try:
-                        from tasks import schedule_analysis_task
-                        task_id = schedule_analysis_task(aoi_id, aoi.next_run_at)
-                        logger.info(f"Scheduled Celery task {task_id} for AOI {aoi_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to schedule Celery task: {e}")
-                        # Continue anyway - the APScheduler fallback will handle it
+                    # For one-time scheduling, we need the scheduled_at parameter
+                    if freq == 'once':
+                        return error_response("scheduled_at parameter is required for one-time scheduling", "VALIDATION_ERROR", 400)
+                    
+                    # Frequency-based scheduling: the AOI's jittered slot (unknown frequencies recur weekly)
+                    aoi.schedule_anchor_at = None
+                    aoi.next_run_at = next_slot(aoi.id, freq)
                         
             # Log the changes we're about to commit
             logger.info(f"💾 About to commit AOI {aoi_id}: freq={aoi.monitoring_frequency}, next_run={aoi.next_run_at}, active={aoi.is_active}")
@@ -144,6 +143,9 @@ def schedule_monitoring(aoi_id):
             session.refresh(aoi)
             logger.info(f"✅ After commit AOI {aoi_id}: freq={aoi.monitoring_frequency}, next_run={aoi.next_run_at}, active={aoi.is_active}")
             
+            # Replace (or cancel) the Celery ETA task for this AOI
+            _reschedule_celery(aoi_id, aoi.next_run_at)
+            
             return success_response(
                 data={
                     'aoi_id': aoi_id, 
@@ -158,9 +160,12 @@ def schedule_monitoring(aoi_id):
         if request.method == 'DELETE':
             aoi.monitoring_frequency = None
             aoi.next_run_at = None
+            aoi.schedule_anchor_at = None
             aoi.is_active = True  # Keep AOI active, just remove schedule
             session.commit()
             
+            _reschedule_celery(aoi_id, None)
+            
             return success_response(
                 data={
                     'aoi_id': aoi_id, 
@@ -196,6 +201,7 @@ def get_scheduler_status():
             data={
                 'scheduler': status,
                 'scheduled_aois': scheduled_aois,
+                'catch_up': db_manager.get_catchup_progress(),
                 'message': '🤖 Scheduler running - checking hourly for due analyses' if status['is_running'] else '⚠️ Scheduler not running'
             },
             message="Scheduler status retrieved successfully"
@@ -204,6 +210,19 @@ def get_scheduler_status():
         return error_response(f"Failed to get scheduler status: {str(e)}", "SCHEDULER_ERROR", 500)
 
 
+@schedule_bp.route('/scheduler/load')
+@require_auth
+@handle_errors
+def get_scheduler_load():
+    """Get the number of scheduled runs per hour over the coming window"""
+    hours = min(max(request.args.get('hours', 48, type=int), 1), 24 * 31)
+    
+    return success_response(
+        data=db_manager.get_schedule_load_histogram(hours=hours),
+        message="Scheduler load retrieved successfully"
+    )
+
+
 @schedule_bp.route('/scheduler/trigger/<int:aoi_id>', methods=['POST'])
 @require_auth
 @handle_errors  
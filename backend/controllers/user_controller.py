@@ -73,12 +73,13 @@ def get_user_history():
     if limit < 1 or limit > 100:
         limit = 20
     
-    history = db_manager.get_user_history(user_id, limit=limit)
+    page = db_manager.get_user_history_page(user_id, limit=limit, cursor=request.args.get('cursor'))
     
     return success_response(
         data={
-            'history': history,
-            'total_analyses': len(history)
+            'history': page['history'],
+            'total_analyses': len(page['history']),
+            'pagination': page['pagination']
         },
         message="User history retrieved successfully"
     )
\ No newline at end of file
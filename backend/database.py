@@ -1,29 +1,81 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event, or_, and_, true, case, update, insert, select, values, column, bindparam, Integer, text, literal_column
+from sqlalchemy.orm import sessionmaker, Session, joinedload
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.sql import func
 from contextlib import contextmanager
 import logging
 from typing import Dict, List, Any, Optional, Tuple
 import os
+from datetime import datetime, timedelta
 from config import Config
 
 # Import models - חשוב!
-from models import Base, User, AreaOfInterest, AnalysisHistory, UserActivity
+from models import (Base, User, AreaOfInterest, AnalysisHistory, AnalysisHistoryArchive, AOIStats, AOIChangeMetric,
+                    UserActivity, AnalysisJob)
+from services.event_service import event_broker
+from services.activity_service import ActivitySink
+from services.user_cache import user_cache
+from services.replica_service import ReplicaPool, pin_reads, reads_pinned
+from services.snapshot_cache import SnapshotCache
+from services.schedule_slots import following_slot, frequency_interval
+from utils.pagination import keyset_page, merge_keyset_pages, count_rows, page_info
+from utils.time_buckets import bucket_start, bucket_label
+from utils.bbox import km_window, covers_globe, sorted_by_distance, bbox_tiles
 
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
-    def __init__(self, database_url: str, engine_options: Dict = None):
+    def __init__(self, database_url: str, engine_options: Dict = None, replica_urls: List[str] = None):
         self.engine = create_engine(
             database_url,
             **(engine_options or {})
         )
         self.SessionLocal = sessionmaker(bind=self.engine)
         
-        # Create tables
-        Base.metadata.create_all(bind=self.engine)
+        # Read replicas for the read-only methods (see services/replica_service.py)
+        self.replicas = None
+        if replica_urls:
+            self.replicas = ReplicaPool(
+                replica_urls,
+                engine_options,
+                health_interval=Config.DB_REPLICA_HEALTH_SECONDS,
+                max_lag=Config.DB_REPLICA_MAX_LAG_SECONDS
+            )
+        
+        # Buffered activity writes (see services/activity_service.py)
+        self.activity_sink = None
+        if Config.ACTIVITY_BUFFER_ENABLED:
+            self.activity_sink = ActivitySink(
+                self.engine,
+                batch_size=Config.ACTIVITY_BATCH_SIZE,
+                flush_interval=Config.ACTIVITY_FLUSH_SECONDS,
+                max_buffer=Config.ACTIVITY_MAX_BUFFER
+            )
+        
+        # Admin dashboard statistics are served from a snapshot (see services/snapshot_cache.py)
+        self.admin_stats_cache = SnapshotCache(
+            self._compute_admin_stats,
+            ttl=Config.ADMIN_STATS_TTL_SECONDS,
+            background=Config.ADMIN_STATS_BACKGROUND_REFRESH,
+            name='admin-stats'
+        )
+        
+        # 'postgis' or 'btree', detected on first spatial query (see spatial_backend)
+        self._spatial_backend = None
+        
+        # Post-commit work (activity hand-off, user cache invalidation) is queued on session.info
+        event.listen(self.SessionLocal, 'before_flush', self._track_user_changes)
+        event.listen(self.SessionLocal, 'after_flush', self._note_flush)
+        event.listen(self.SessionLocal, 'do_orm_execute', self._note_statement)
+        event.listen(self.SessionLocal, 'after_commit', self._after_commit)
+        event.listen(self.SessionLocal, 'after_rollback', self._after_rollback)
         
-        logger.info(f"Database initialized: {database_url.split('@')[0]}@[HIDDEN]")
+        logger.info(f"Database initialized: {database_url.split('@')[0]}@[HIDDEN]"
+                    + (f" with {len(replica_urls)} read replicas" if replica_urls else ""))
+    
+    def create_tables(self):
+        """Create missing tables (run once at API startup, not on every import)"""
+        Base.metadata.create_all(bind=self.engine)
     
     @contextmanager
     def get_session(self) -> Session:
@@ -39,16 +91,54 @@ class DatabaseManager:
         finally:
             session.close()
     
+    @contextmanager
+    def get_read_session(self) -> Session:
+        """
+        Session for read-only methods.
+        
+        Uses a healthy replica when replicas are configured and this request has
+        not written yet (read-your-writes); otherwise the primary.
+        """
+        replica = None
+        if self.replicas is not None and not reads_pinned():
+            replica = self.replicas.choose()
+        
+        session = None
+        if replica is not None:
+            session = replica.SessionLocal()
+            try:
+                session.connection()
+            except DBAPIError as e:
+                session.close()
+                self.replicas.mark_failed(replica, e)
+                session = None
+        
+        if session is None:
+            with self.get_session() as session:
+                yield session
+            return
+        
+        try:
+            yield session
+        except DBAPIError as e:
+            if e.connection_invalidated:
+                self.replicas.mark_failed(replica, e)
+            logger.error(f"Replica read error: {str(e)}")
+            raise
+        finally:
+            session.rollback()
+            session.close()
+    
     def get_or_create_user(self, clerk_user_id: str, email: str = None, 
                           first_name: str = None, last_name: str = None) -> Dict[str, Any]:
         """Get or create user"""
         with self.get_session() as session:
-            logger.info(f"Looking for user with clerk_user_id: {clerk_user_id}")
+            logger.debug(f"Looking for user with clerk_user_id: {clerk_user_id}")
             
             user = session.query(User).filter_by(clerk_user_id=clerk_user_id).first()
             
             if user:
-                logger.info(f"Found existing user: ID={user.id}, tokens_remaining={user.tokens_remaining}")
+                logger.debug(f"Found existing user: ID={user.id}, tokens_remaining={user.tokens_remaining}")
                 
                 # Update user info if provided
                 updated = False
@@ -85,12 +175,7 @@ class DatabaseManager:
             session.flush()  # Get the ID
             
             # Log user creation activity
-            activity = UserActivity(
-                user_id=user.id,
-                activity_type='user_created',
-                activity_data={'clerk_user_id': clerk_user_id, 'email': email, 'initial_tokens': 5}
-            )
-            session.add(activity)
+            self._add_activity(session, user.id, 'user_created', {'clerk_user_id': clerk_user_id, 'email': email, 'initial_tokens': 5})
             
             logger.info(f"Created user with ID: {user.id}, tokens: 5")
             return user.to_dict()
@@ -123,21 +208,147 @@ class DatabaseManager:
             )
             session.add(aoi)
             session.flush()  # Get the ID
+            session.add(AOIStats(aoi_id=aoi.id, total_analyses=0, total_tokens_used=0, change_samples=0))
             
             # Log activity
-            activity = UserActivity(
-                user_id=user_id,
-                activity_type='aoi_created',
-                activity_data={'aoi_id': aoi.id, 'aoi_name': aoi.name}
-            )
-            session.add(activity)
+            self._add_activity(session, user_id, 'aoi_created', {'aoi_id': aoi.id, 'aoi_name': aoi.name})
             
             logger.info(f"AOI created with ID: {aoi.id}")
             return aoi.id
     
+    SPATIAL_MODES = ('intersects', 'contains', 'within')
+    
+    def spatial_backend(self) -> str:
+        """'postgis' once migrate_aoi_bbox.py has built the GiST envelope index, otherwise 'btree'"""
+        if self._spatial_backend is None:
+            backend = 'btree'
+            if self.engine.dialect.name == 'postgresql':
+                with self.engine.connect() as connection:
+                    if connection.execute(text("SELECT to_regclass('ix_aoi_bbox_gist')")).scalar():
+                        backend = 'postgis'
+            self._spatial_backend = backend
+        return self._spatial_backend
+    
+    def _bbox_condition(self, bbox: Tuple[float, float, float, float], mode: str):
+        """
+        WHERE clause for AOIs that intersect, contain or lie within bbox.
+        
+        PostGIS: the box operators on the indexed envelope expression. B-tree:
+        a range on min_lon, which for intersects / contains is bounded below
+        by the widest AOI span (ix_aoi_lon_span), plus the other three bounds.
+        """
+        if mode not in self.SPATIAL_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(self.SPATIAL_MODES)}")
+        min_lon, min_lat, max_lon, max_lat = bbox
+        
+        if self.spatial_backend() == 'postgis':
+            # Must match the ix_aoi_bbox_gist expression, SRID inlined
+            envelope = func.ST_MakeEnvelope(
+                AreaOfInterest.min_lon, AreaOfInterest.min_lat, AreaOfInterest.max_lon, AreaOfInterest.max_lat,
+                literal_column('4326')
+            )
+            operator = {'intersects': '&&', 'contains': '~', 'within': '@'}[mode]
+            return envelope.op(operator)(func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326))
+        
+        widest = select(
+            func.coalesce(func.max(AreaOfInterest.max_lon - AreaOfInterest.min_lon), 0)
+        ).scalar_subquery()
+        if mode == 'intersects':
+            return and_(
+                AreaOfInterest.min_lon >= min_lon - widest, AreaOfInterest.min_lon <= max_lon,
+                AreaOfInterest.max_lon >= min_lon,
+                AreaOfInterest.min_lat <= max_lat, AreaOfInterest.max_lat >= min_lat
+            )
+        if mode == 'contains':
+            return and_(
+                AreaOfInterest.min_lon >= max_lon - widest, AreaOfInterest.min_lon <= min_lon,
+                AreaOfInterest.max_lon >= max_lon,
+                AreaOfInterest.min_lat <= min_lat, AreaOfInterest.max_lat >= max_lat
+            )
+        return and_(
+            AreaOfInterest.min_lon >= min_lon, AreaOfInterest.min_lon <= max_lon,
+            AreaOfInterest.max_lon <= max_lon,
+            AreaOfInterest.min_lat >= min_lat, AreaOfInterest.max_lat <= max_lat
+        )
+    
+    @staticmethod
+    def _spatial_dict(row, distance_km: float = None) -> Dict:
+        result = {
+            'id': row.id,
+            'user_id': row.user_id,
+            'name': row.name,
+            'location_name': row.location_name,
+            'bbox_coordinates': [row.min_lon, row.min_lat, row.max_lon, row.max_lat],
+            'is_active': row.is_active,
+            'monitoring_frequency': row.monitoring_frequency,
+            'priority': row.priority
+        }
+        if distance_km is not None:
+            result['distance_km'] = round(distance_km, 3)
+        return result
+    
+    def _spatial_rows(self, session, bbox, mode: str, active_only: bool, limit: int = None):
+        query = session.query(
+            AreaOfInterest.id, AreaOfInterest.user_id, AreaOfInterest.name, AreaOfInterest.location_name,
+            AreaOfInterest.min_lon, AreaOfInterest.min_lat, AreaOfInterest.max_lon, AreaOfInterest.max_lat,
+            AreaOfInterest.is_active, AreaOfInterest.monitoring_frequency, AreaOfInterest.priority
+        ).filter(self._bbox_condition(bbox, mode))
+        if active_only:
+            query = query.filter(AreaOfInterest.is_active == True)
+        query = query.order_by(AreaOfInterest.id)
+        return query.limit(limit).all() if limit else query.all()
+    
+    def find_aois_by_bbox(self, bbox: Tuple[float, float, float, float], mode: str = 'intersects',
+                          active_only: bool = True, limit: int = 500) -> List[Dict]:
+        """AOIs whose box intersects, contains or lies within bbox (min_lon, min_lat, max_lon, max_lat), by id"""
+        with self.get_read_session() as session:
+            return [self._spatial_dict(row) for row in self._spatial_rows(session, bbox, mode, active_only, limit)]
+    
+    def nearest_aois(self, lon: float, lat: float, k: int = 10, active_only: bool = True) -> List[Dict]:
+        """
+        The k AOIs nearest to a point (distance to the box, 0 inside it), nearest first.
+        
+        Index-assisted: searches a window of AOI_KNN_START_KM and widens it 4x
+        until k AOIs lie within the radius, so the answer is exact while only
+        AOIs near the point are read.
+        """
+        radius = Config.AOI_KNN_START_KM
+        with self.get_read_session() as session:
+            while True:
+                window = km_window(lon, lat, radius)
+                ranked = sorted_by_distance(
+                    lon, lat, self._spatial_rows(session, window, 'intersects', active_only), k
+                )
+                if covers_globe(window) or (len(ranked) == k and ranked[-1][0] <= radius):
+                    return [self._spatial_dict(row, distance) for distance, row in ranked]
+                radius *= 4
+    
+    def get_aoi_tile_groups(self, zoom: int, aoi_ids: List[int] = None, active_only: bool = True) -> Dict[str, List[int]]:
+        """
+        AOI ids grouped by the web-mercator tiles (z/x/y) their boxes overlap,
+        only tiles shared by two or more AOIs. For batch jobs that fetch one
+        image per tile.
+        """
+        with self.get_read_session() as session:
+            query = session.query(
+                AreaOfInterest.id, AreaOfInterest.min_lon, AreaOfInterest.min_lat,
+                AreaOfInterest.max_lon, AreaOfInterest.max_lat
+            ).filter(AreaOfInterest.min_lon.isnot(None))
+            if aoi_ids is not None:
+                query = query.filter(AreaOfInterest.id.in_(aoi_ids))
+            if active_only:
+                query = query.filter(AreaOfInterest.is_active == True)
+            rows = query.order_by(AreaOfInterest.id).all()
+        
+        groups: Dict[str, List[int]] = {}
+        for row in rows:
+            for z, x, y in bbox_tiles((row.min_lon, row.min_lat, row.max_lon, row.max_lat), zoom):
+                groups.setdefault(f"{z}/{x}/{y}", []).append(row.id)
+        return {tile: ids for tile, ids in groups.items() if len(ids) > 1}
+    
     def get_user_aois(self, user_id: int) -> List[Dict]:
         """Get all active AOIs for a user"""
-        with self.get_session() as session:
+        with self.get_read_session() as session:
             aois = session.query(AreaOfInterest).filter_by(
                 user_id=user_id, 
                 is_active=True
@@ -161,12 +372,7 @@ class DatabaseManager:
             aoi.updated_at = func.now()
             
             # Log activity
-            activity = UserActivity(
-                user_id=user_id,
-                activity_type='aoi_deleted',
-                activity_data={'aoi_id': aoi_id, 'aoi_name': aoi_name}
-            )
-            session.add(activity)
+            self._add_activity(session, user_id, 'aoi_deleted', {'aoi_id': aoi_id, 'aoi_name': aoi_name})
             
             logger.info(f"AOI {aoi_id} ({aoi_name}) marked as inactive")
             return True, "AOI deleted successfully"
@@ -175,62 +381,179 @@ class DatabaseManager:
     def save_analysis(self, user_id: int, aoi_id: Optional[int], process_id: str, 
                  operation_name: str, location_description: str, bbox_coordinates: List,
                  image_filenames: Dict, meta: Dict, change_percentage: float = None, 
-                 tokens_used: int = 1, s3_keys: Dict = None) -> int:
-        """Save analysis results to database"""
+                 tokens_used: int = 1, s3_keys: Dict = None, change_metrics: Dict = None) -> int:
+        """Save analysis results to database (change_metrics: per-component metrics for the AOI series)"""
         with self.get_session() as session:
-            # Extract S3 keys if provided
-            s3_keys = s3_keys or {}
-            
-            analysis = AnalysisHistory(
-                user_id=user_id,
-                aoi_id=aoi_id,
-                process_id=process_id,
-                operation_name=operation_name,
-                location_description=location_description,
-                bbox_coordinates=bbox_coordinates,
-                image1_filename=image_filenames.get('image1'),
-                image2_filename=image_filenames.get('image2'),
-                heatmap_filename=image_filenames.get('heatmap'),
-                # S3 keys
-                image1_s3_key=s3_keys.get('image1'),
-                image2_s3_key=s3_keys.get('image2'),
-                heatmap_s3_key=s3_keys.get('heatmap'),
-                tokens_used=tokens_used,
-                change_percentage=change_percentage,
-                meta=meta
+            analysis_id = self._insert_analysis(
+                session, user_id, aoi_id, process_id, operation_name, location_description, bbox_coordinates,
+                image_filenames, meta, change_percentage, tokens_used, s3_keys, change_metrics
             )
-            session.add(analysis)
-            session.flush()
-            
-            # Log activity
-            activity = UserActivity(
-                user_id=user_id,
-                activity_type='analysis_completed',
-                activity_data={
-                    'analysis_id': analysis.id,
-                    'process_id': process_id,
-                    'aoi_id': aoi_id,
-                    'location': location_description,
-                    'tokens_used': tokens_used,
-                    'change_percentage': change_percentage
-                }
-            )
-            session.add(activity)
+        
+        self._publish_analysis_completed(user_id, analysis_id, aoi_id, process_id, change_percentage)
+        return analysis_id
+    
+    def save_charged_analysis(self, user_id: int, aoi_id: Optional[int], process_id: str, tokens_used: int,
+                              reference_id: str = None, **record) -> Tuple[bool, str, Optional[int]]:
+        """
+        Debit tokens_used and save the analysis in one transaction (record: save_analysis arguments).
+        
+        Either both the debit (with its ledger row) and the history row are
+        committed, or neither is. Returns (success, message, analysis_id).
+        """
+        with self.get_session() as session:
+            if tokens_used:
+                debit = self._debit_tokens(session, user_id, tokens_used, reference_id)
+                if not debit['success']:
+                    return False, debit['message'], None
             
-            logger.info(f"Analysis saved with ID: {analysis.id}")
-            return analysis.id
+            analysis_id = self._insert_analysis(session, user_id, aoi_id, process_id, tokens_used=tokens_used, **record)
+        
+        self._publish_analysis_completed(user_id, analysis_id, aoi_id, process_id, record.get('change_percentage'))
+        return True, f'Used {tokens_used} tokens', analysis_id
+    
+    def _insert_analysis(self, session, user_id: int, aoi_id: Optional[int], process_id: str,
+                         operation_name: str, location_description: str, bbox_coordinates: List,
+                         image_filenames: Dict, meta: Dict, change_percentage: float = None,
+                         tokens_used: int = 1, s3_keys: Dict = None, change_metrics: Dict = None) -> int:
+        """Add an analysis_history row and its AOI statistics in the caller's transaction"""
+        # Extract S3 keys if provided
+        s3_keys = s3_keys or {}
+        
+        analysis = AnalysisHistory(
+            user_id=user_id,
+            aoi_id=aoi_id,
+            process_id=process_id,
+            operation_name=operation_name,
+            location_description=location_description,
+            bbox_coordinates=bbox_coordinates,
+            image1_filename=image_filenames.get('image1'),
+            image2_filename=image_filenames.get('image2'),
+            heatmap_filename=image_filenames.get('heatmap'),
+            # S3 keys
+            image1_s3_key=s3_keys.get('image1'),
+            image2_s3_key=s3_keys.get('image2'),
+            heatmap_s3_key=s3_keys.get('heatmap'),
+            tokens_used=tokens_used,
+            change_percentage=change_percentage,
+            meta=meta
+        )
+        session.add(analysis)
+        session.flush()
+        
+        if aoi_id is not None:
+            self._record_aoi_analysis(session, aoi_id, analysis.id, tokens_used, change_percentage)
+            self._record_change_metrics(session, aoi_id, analysis.id, change_percentage, change_metrics)
+        
+        # Log activity
+        self._add_activity(session, user_id, 'analysis_completed', {
+            'analysis_id': analysis.id,
+            'process_id': process_id,
+            'aoi_id': aoi_id,
+            'location': location_description,
+            'tokens_used': tokens_used,
+            'change_percentage': change_percentage
+        })
+        
+        logger.info(f"Analysis saved with ID: {analysis.id}")
+        return analysis.id
+
+    def _publish_analysis_completed(self, user_id: int, analysis_id: int, aoi_id: Optional[int], process_id: str,
+                                    change_percentage: Optional[float]):
+        """Notify the user's event stream of a saved analysis (after commit)"""
+        event_broker.publish(user_id, 'analysis.completed', {
+            'analysis_id': analysis_id,
+            'aoi_id': aoi_id,
+            'process_id': process_id,
+            'change_percentage': change_percentage
+        })
 
+    def _record_aoi_analysis(self, session, aoi_id: int, analysis_id: int, tokens_used: int,
+                             change_percentage: Optional[float]):
+        """Fold one analysis into the AOI's aoi_stats row, in the caller's transaction"""
+        stats = AOIStats.__table__.c
+        values = {
+            'total_analyses': stats.total_analyses + 1,
+            'total_tokens_used': stats.total_tokens_used + (tokens_used or 0),
+            'last_analysis_id': analysis_id,
+            'last_analysis_at': select(AnalysisHistory.analysis_timestamp).where(
+                AnalysisHistory.id == analysis_id
+            ).scalar_subquery(),
+            'updated_at': func.now()
+        }
+        if change_percentage is not None:
+            # Right-hand sides see the row's values from before this UPDATE
+            alpha = Config.AOI_STATS_EWMA_ALPHA
+            values.update(
+                last_change_percentage=change_percentage,
+                change_samples=stats.change_samples + 1,
+                avg_change_percentage=(
+                    func.coalesce(stats.avg_change_percentage, 0.0) * stats.change_samples + change_percentage
+                ) / (stats.change_samples + 1),
+                ewma_change_percentage=case(
+                    (stats.ewma_change_percentage.is_(None), change_percentage),
+                    else_=alpha * change_percentage + (1 - alpha) * stats.ewma_change_percentage
+                )
+            )
+        
+        statement = update(AOIStats).where(AOIStats.aoi_id == aoi_id).values(values).execution_options(
+            synchronize_session=False
+        )
+        if session.execute(statement).rowcount == 1:
+            return
+        
+        # AOI without a stats row (created before aoi_stats; see migrate_aoi_stats.py)
+        try:
+            with session.begin_nested():
+                session.add(AOIStats(aoi_id=aoi_id, total_analyses=0, total_tokens_used=0, change_samples=0))
+        except IntegrityError:
+            pass  # created by a concurrent save
+        session.execute(statement)
+    
+    @staticmethod
+    def _record_change_metrics(session, aoi_id: int, analysis_id: int, change_percentage: Optional[float],
+                               change_metrics: Optional[Dict]):
+        """Append the analysis to the AOI's change-metric series (nothing measured, nothing appended)"""
+        values = {name: (change_metrics or {}).get(name) for name in AOIChangeMetric.METRICS}
+        if change_percentage is not None:
+            values['overall_change'] = change_percentage
+        if all(value is None for value in values.values()):
+            return
+        session.add(AOIChangeMetric(aoi_id=aoi_id, analysis_id=analysis_id, **values))
+    
+    @staticmethod
+    def _aoi_statistics(stats: Optional[AOIStats]) -> Dict[str, Any]:
+        """Dashboard statistics from an aoi_stats row (zeros when the AOI has none)"""
+        summary = stats.to_dict() if stats is not None else AOIStats(total_analyses=0, total_tokens_used=0).to_dict()
+        summary.pop('aoi_id')
+        return summary
+    
     def create_baseline_image(self, aoi_id: int, satellite_processor):
-        """Create baseline image for AOI"""
+        """
+        Create baseline image for AOI.
+        
+        The 'pending' row is claimed with a conditional update first, so when
+        several processes queue the same AOI only one of them builds it; the
+        others get None back.
+        """
+        with self.get_session() as session:
+            claimed = session.query(AreaOfInterest).filter(
+                AreaOfInterest.id == aoi_id,
+                AreaOfInterest.baseline_status == 'pending'
+            ).update({'baseline_status': 'processing', 'baseline_started_at': datetime.utcnow()},
+                     synchronize_session=False)
+        
+        if not claimed:
+            logger.info(f"Baseline for AOI {aoi_id} is not pending (missing, done or claimed elsewhere) - skipping")
+            return None
+        
         with self.get_session() as session:
             aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
             if not aoi:
                 logger.error(f"AOI {aoi_id} not found for baseline creation")
                 return False
             
-            # Update status to processing
-            aoi.baseline_status = 'processing'
-            session.commit()
+            user_id = aoi.user_id
+            self._publish_baseline_status(user_id, aoi_id, 'processing')
             
             try:
                 # Use new date strategy for baseline creation
@@ -261,54 +584,154 @@ class DatabaseManager:
                     logger.info(f"Baseline created successfully for AOI {aoi_id}")
                     
                     # Log activity
-                    activity = UserActivity(
-                        user_id=aoi.user_id,
-                        activity_type='baseline_created',
-                        activity_data={'aoi_id': aoi_id, 'baseline_filename': baseline_filename}
-                    )
-                    session.add(activity)
+                    self._add_activity(session, aoi.user_id, 'baseline_created', {'aoi_id': aoi_id, 'baseline_filename': baseline_filename})
                     
-                    return True
+                    created = True
                 else:
                     aoi.baseline_status = 'failed'
                     logger.error(f"Failed to download baseline image for AOI {aoi_id}")
-                    return False
+                    created = False
                     
             except Exception as e:
                 aoi.baseline_status = 'failed'
                 logger.error(f"Error creating baseline for AOI {aoi_id}: {str(e)}")
-                return False
+                created = False
+        
+        self._publish_baseline_status(user_id, aoi_id, 'completed' if created else 'failed')
+        return created
+    
+    def mark_baseline_pending(self, aoi_id: int) -> bool:
+        """Record that a baseline has been requested (durable queue entry)"""
+        with self.get_session() as session:
+            updated = session.query(AreaOfInterest).filter(
+                AreaOfInterest.id == aoi_id,
+                AreaOfInterest.baseline_status != 'processing'
+            ).update({'baseline_status': 'pending'}, synchronize_session=False)
+            return updated > 0
+    
+    def get_pending_baseline_aoi_ids(self, limit: int = 100, exclude_ids=None) -> List[int]:
+        """Get active AOIs waiting for a baseline, oldest first"""
+        with self.get_session() as session:
+            query = session.query(AreaOfInterest.id).filter(
+                AreaOfInterest.is_active == True,
+                AreaOfInterest.baseline_status == 'pending'
+            )
+            if exclude_ids:
+                query = query.filter(AreaOfInterest.id.notin_(list(exclude_ids)))
+            
+            rows = query.order_by(AreaOfInterest.id).limit(limit).all()
+            return [row.id for row in rows]
+    
+    def reset_stale_baselines(self, older_than: datetime) -> int:
+        """
+        Return baselines left in 'processing' by a crashed process to 'pending'.
+        
+        Only claims taken before older_than are reset, so baselines another
+        live process is still building are left alone.
+        """
+        with self.get_session() as session:
+            return session.query(AreaOfInterest).filter(
+                AreaOfInterest.baseline_status == 'processing',
+                or_(AreaOfInterest.baseline_started_at.is_(None), AreaOfInterest.baseline_started_at < older_than)
+            ).update({'baseline_status': 'pending', 'baseline_started_at': None}, synchronize_session=False)
+    
+    def _publish_baseline_status(self, user_id: int, aoi_id: int, status: str):
+        """Notify the user's event stream of a baseline status transition"""
+        event_broker.publish(user_id, 'baseline.status', {'aoi_id': aoi_id, 'baseline_status': status})
+
+    def create_analysis_job(self, job_id: str, user_id: int, job_type: str, params: Dict,
+                            aoi_id: int = None) -> Dict:
+        """Create a queued analysis job"""
+        with self.get_session() as session:
+            job = AnalysisJob(
+                job_id=job_id,
+                user_id=user_id,
+                aoi_id=aoi_id,
+                job_type=job_type,
+                status='queued',
+                stage='queued',
+                stage_timings={},
+                params=params
+            )
+            session.add(job)
+            session.flush()
+            
+            logger.info(f"Analysis job {job_id} created for user {user_id}")
+            return job.to_dict()
+    
+    def update_analysis_job(self, job_id: str, **fields) -> Optional[Dict]:
+        """Update status, stage, timings or result of an analysis job"""
+        with self.get_session() as session:
+            job = session.query(AnalysisJob).filter_by(job_id=job_id).first()
+            if not job:
+                return None
+            
+            for key, value in fields.items():
+                setattr(job, key, value)
+            
+            if fields.get('status') == 'running' and not job.started_at:
+                job.started_at = datetime.utcnow()
+            if fields.get('status') in ('completed', 'failed'):
+                job.completed_at = datetime.utcnow()
+            
+            session.flush()
+            job_dict = job.to_dict()
+        
+        if 'status' in fields:
+            event_broker.publish(job_dict['user_id'], 'job.status', {
+                'job_id': job_id,
+                'aoi_id': job_dict['aoi_id'],
+                'status': job_dict['status'],
+                'stage': job_dict['stage'],
+                'analysis_id': job_dict['analysis_id']
+            })
+        return job_dict
+    
+    def get_analysis_job(self, job_id: str, user_id: int = None) -> Optional[Dict]:
+        """Get analysis job, optionally restricted to its owner"""
+        with self.get_session() as session:
+            query = session.query(AnalysisJob).filter_by(job_id=job_id)
+            if user_id is not None:
+                query = query.filter_by(user_id=user_id)
+            
+            job = query.first()
+            if not job:
+                return None
+            
+            job_dict = job.to_dict()
+            job_dict['params'] = job.params
+            return job_dict
 
     def get_aoi_dashboard(self, aoi_id: int, user_id: int) -> Optional[Dict]:
         """Get comprehensive AOI dashboard data"""
-        with self.get_session() as session:
-            aoi = session.query(AreaOfInterest).filter_by(
-                id=aoi_id, 
-                user_id=user_id
+        with self.get_read_session() as session:
+            # AOI and its precomputed statistics in one primary-key lookup
+            row = session.query(AreaOfInterest, AOIStats).outerjoin(
+                AOIStats, AOIStats.aoi_id == AreaOfInterest.id
+            ).filter(
+                AreaOfInterest.id == aoi_id,
+                AreaOfInterest.user_id == user_id
             ).first()
             
-            if not aoi:
+            if not row:
                 return None
+            aoi, stats = row
             
             # Get recent analyses
-            recent_analyses = session.query(AnalysisHistory).filter_by(
-                aoi_id=aoi_id
-            ).order_by(AnalysisHistory.analysis_timestamp.desc()).limit(5).all()
-            
-            # Calculate statistics
-            total_analyses = session.query(AnalysisHistory).filter_by(aoi_id=aoi_id).count()
-            total_tokens_used = session.query(func.sum(AnalysisHistory.tokens_used)).filter_by(aoi_id=aoi_id).scalar() or 0
+            recent_analyses, _ = self._history_page(session, 5, aoi_id=aoi_id)
             
             return {
                 'aoi': aoi.to_dict(),
-                'recent_analyses': [analysis.to_dict() for analysis in recent_analyses],
-                'statistics': {
-                    'total_analyses': total_analyses,
-                    'total_tokens_used': total_tokens_used,
-                    'monitoring_status': 'active' if aoi.monitoring_frequency and aoi.is_active else 'inactive',
-                    'baseline_status': aoi.baseline_status,
-                    'baseline_date': aoi.baseline_date.isoformat() if aoi.baseline_date else None
-                },
+                'recent_analyses': [
+                    AnalysisHistory.summary_from_row(row, aoi.name, aoi.location_name)
+                    for row in recent_analyses
+                ],
+                'statistics': dict(
+                    self._aoi_statistics(stats),
+                    monitoring_status='active' if aoi.monitoring_frequency and aoi.is_active else 'inactive',
+                    baseline_status=aoi.baseline_status,
+                    baseline_date=aoi.baseline_date.isoformat() if aoi.baseline_date else None
+                ),
                 'baseline': {
                     'status': aoi.baseline_status,
                     'date': aoi.baseline_date.isoformat() if aoi.baseline_date else None,
@@ -316,95 +739,510 @@ class DatabaseManager:
                 }
             }
     
+    def get_aoi_dashboard_view(self, aoi_id: int, user_id: int) -> Optional[Dict]:
+        """AOI dashboard for viewing only (last 10 analyses, statistics from aoi_stats)"""
+        with self.get_read_session() as session:
+            row = session.query(AreaOfInterest, AOIStats).outerjoin(
+                AOIStats, AOIStats.aoi_id == AreaOfInterest.id
+            ).filter(
+                AreaOfInterest.id == aoi_id,
+                AreaOfInterest.user_id == user_id
+            ).first()
+            
+            if not row:
+                return None
+            aoi, stats = row
+            
+            analyses, _ = self._history_page(session, 10, aoi_id=aoi_id)
+            
+            statistics = self._aoi_statistics(stats)
+            last_analysis_date = stats.last_analysis_at if stats is not None else None
+            statistics['monitoring_status'] = "active" if last_analysis_date and (
+                datetime.now() - last_analysis_date
+            ).days < 30 else "idle"
+            statistics['last_analysis_date'] = statistics['last_analysis_at']
+            
+            return {
+                'aoi': {
+                    'id': aoi.id,
+                    'name': aoi.name,
+                    'description': aoi.description,
+                    'location_name': aoi.location_name,
+                    'bbox_coordinates': aoi.bbox_coordinates,
+                    'classification': aoi.classification,
+                    'priority': aoi.priority,
+                    'color_code': aoi.color_code,
+                    'monitoring_frequency': aoi.monitoring_frequency,
+                    'baseline_status': aoi.baseline_status,
+                    'baseline_date': aoi.baseline_date.isoformat() if aoi.baseline_date else None,
+                    'created_at': aoi.created_at.isoformat() if aoi.created_at else None
+                },
+                'statistics': statistics,
+                'baseline': {
+                    'status': aoi.baseline_status,
+                    'image_url': f'/api/image/{aoi.baseline_image_filename}' if aoi.baseline_image_filename else None,
+                    'date': aoi.baseline_date.isoformat() if aoi.baseline_date else None
+                },
+                'recent_analyses': [
+                    {
+                        'id': analysis.id,
+                        'process_id': analysis.process_id,
+                        'operation_name': analysis.operation_name,
+                        'analysis_timestamp': analysis.analysis_timestamp.isoformat(),
+                        'change_percentage': analysis.change_percentage,
+                        'tokens_used': analysis.tokens_used,
+                        'images': {
+                            'baseline_url': f'/api/image/{analysis.image1_filename}' if analysis.image1_filename else None,
+                            'current_url': f'/api/image/{analysis.image2_filename}' if analysis.image2_filename else None,
+                            'heatmap_url': f'/api/image/{analysis.heatmap_filename}' if analysis.heatmap_filename else None
+                        }
+                    } for analysis in analyses
+                ],
+                'actions_available': {
+                    'can_run_analysis': aoi.baseline_status == 'completed',
+                    'can_schedule_monitoring': True,
+                    'can_update_baseline': True
+                }
+            }
+    
     def get_user_history(self, user_id: int, limit: int = 10) -> List[Dict]:
-        """Get user's analysis history"""
-        with self.get_session() as session:
-            analyses = session.query(AnalysisHistory).filter_by(
-                user_id=user_id
-            ).order_by(AnalysisHistory.analysis_timestamp.desc()).limit(limit).all()
+        """Get user's analysis history (most recent first)"""
+        return self.get_user_history_page(user_id, limit=limit)['history']
+    
+    def get_user_history_page(self, user_id: int, limit: int = 20, cursor: str = None) -> Dict[str, Any]:
+        """One keyset page of the user's analysis history (single projection query, AOI name joined in)"""
+        with self.get_read_session() as session:
+            rows, next_cursor = self._history_page(session, limit, cursor, user_id=user_id, with_aoi_names=True)
             
-            result = []
-            for analysis in analyses:
-                analysis_dict = analysis.to_dict()
-                # Add AOI info if exists
-                if analysis.aoi:
-                    analysis_dict['aoi'] = {
-                        'name': analysis.aoi.name,
-                        'location_name': analysis.aoi.location_name
-                    }
-                result.append(analysis_dict)
-            
-            return result
+            return {
+                'history': [
+                    AnalysisHistory.summary_from_row(row, row.aoi_name, row.aoi_location_name)
+                    for row in rows
+                ],
+                'pagination': page_info(limit, next_cursor)
+            }
+    
+    def get_aoi_history(self, aoi_id: int, user_id: int, limit: int = 20, cursor: str = None) -> Optional[Dict]:
+        """Get analysis history for one of the user's AOIs; None if the AOI is not theirs"""
+        with self.get_read_session() as session:
+            aoi = session.query(
+                AreaOfInterest.name, AreaOfInterest.location_name
+            ).filter(
+                AreaOfInterest.id == aoi_id, AreaOfInterest.user_id == user_id
+            ).first()
+            
+            if not aoi:
+                return None
+            
+            rows, next_cursor = self._history_page(session, limit, cursor, aoi_id=aoi_id)
+            
+            return {
+                'aoi_id': aoi_id,
+                'aoi_name': aoi.name,
+                'analyses': [
+                    AnalysisHistory.summary_from_row(row, aoi.name, aoi.location_name)
+                    for row in rows
+                ],
+                'pagination': page_info(limit, next_cursor)
+            }
+    
+    def get_aoi_change_metrics(self, aoi_id: int, user_id: int, bucket: str = 'day',
+                               since: datetime = None, until: datetime = None) -> Optional[Dict]:
+        """
+        Change-metric series for one of the user's AOIs; None if the AOI is not theirs.
+        
+        bucket 'day', 'week' or 'month' aggregates in the database: count and
+        min/max/avg of every metric per bucket, one index range scan on
+        (aoi_id, measured_at). 'raw' returns the points themselves, the most
+        recent CHANGE_METRICS_MAX_POINTS in the range.
+        """
+        with self.get_read_session() as session:
+            owned = session.query(AreaOfInterest.id).filter(
+                AreaOfInterest.id == aoi_id, AreaOfInterest.user_id == user_id
+            ).first()
+            if not owned:
+                return None
+            
+            filters = [AOIChangeMetric.aoi_id == aoi_id]
+            if since is not None:
+                filters.append(AOIChangeMetric.measured_at >= since)
+            if until is not None:
+                filters.append(AOIChangeMetric.measured_at < until)
+            metric_columns = [getattr(AOIChangeMetric, name) for name in AOIChangeMetric.METRICS]
+            
+            if bucket == 'raw':
+                rows = session.query(AOIChangeMetric.measured_at, *metric_columns).filter(
+                    *filters
+                ).order_by(AOIChangeMetric.measured_at.desc()).limit(Config.CHANGE_METRICS_MAX_POINTS).all()
+                series = [
+                    dict(zip(AOIChangeMetric.METRICS, row[1:]), timestamp=row[0].isoformat())
+                    for row in reversed(rows)
+                ]
+            else:
+                period = bucket_start(AOIChangeMetric.measured_at, bucket, session.get_bind().dialect.name)
+                aggregates = []
+                for metric_column in metric_columns:
+                    aggregates += [func.min(metric_column), func.max(metric_column), func.avg(metric_column)]
+                rows = session.query(period, func.count(), *aggregates).filter(
+                    *filters
+                ).group_by(period).order_by(period).all()
+                series = []
+                for row in rows:
+                    point = {'period': bucket_label(row[0]), 'count': row[1]}
+                    for i, name in enumerate(AOIChangeMetric.METRICS):
+                        low, high, mean = row[2 + 3 * i:5 + 3 * i]
+                        point[name] = {'min': low, 'max': high,
+                                       'avg': float(mean) if mean is not None else None}
+                    series.append(point)
+            
+            return {
+                'aoi_id': aoi_id,
+                'bucket': bucket,
+                'since': since.isoformat() if since else None,
+                'until': until.isoformat() if until else None,
+                'metrics': list(AOIChangeMetric.METRICS),
+                'series': series
+            }
+    
+    def _history_page(self, session, limit: int, cursor: str = None, user_id: int = None,
+                      aoi_id: int = None, with_aoi_names: bool = False) -> Tuple[List[Any], Optional[str]]:
+        """
+        One keyset page of analyses read across both history tiers: the same
+        indexed top-N query on analysis_history and analysis_history_archive,
+        merged in (analysis_timestamp, id) order. Rows carry SUMMARY_COLUMNS
+        (plus aoi_name / aoi_location_name with with_aoi_names).
+        """
+        pages = []
+        for model in (AnalysisHistory, AnalysisHistoryArchive):
+            columns = model.summary_query_columns()
+            if with_aoi_names:
+                columns += [AreaOfInterest.name.label('aoi_name'), AreaOfInterest.location_name.label('aoi_location_name')]
+            query = session.query(*columns)
+            if with_aoi_names:
+                query = query.outerjoin(AreaOfInterest, AreaOfInterest.id == model.aoi_id)
+            if user_id is not None:
+                query = query.filter(model.user_id == user_id)
+            if aoi_id is not None:
+                query = query.filter(model.aoi_id == aoi_id)
+            pages.append(keyset_page(query, model.analysis_timestamp, model.id, limit, cursor))
+        return merge_keyset_pages(pages, limit, 'analysis_timestamp', 'id')
+    
+    def archive_analysis_history(self, older_than: datetime, batch_size: int = 1000) -> int:
+        """
+        Move analyses older than `older_than` to analysis_history_archive, oldest
+        first, one transaction per batch (copy, detach analysis_jobs, delete) so
+        every analysis is visible in exactly one tier. Returns the rows moved.
+        """
+        moved = 0
+        while True:
+            with self.get_session() as session:
+                rows = session.query(
+                    *AnalysisHistory.summary_query_columns()
+                ).filter(
+                    AnalysisHistory.analysis_timestamp < older_than
+                ).order_by(
+                    AnalysisHistory.analysis_timestamp, AnalysisHistory.id
+                ).limit(batch_size).with_for_update(skip_locked=True).all()
+                
+                if not rows:
+                    break
+                ids = [row.id for row in rows]
+                
+                session.execute(insert(AnalysisHistoryArchive.__table__), [
+                    dict(row._mapping, meta=AnalysisHistoryArchive.compact_meta(row.meta))
+                    for row in rows
+                ])
+                session.query(AnalysisJob).filter(
+                    AnalysisJob.analysis_id.in_(ids)
+                ).update({'analysis_id': None}, synchronize_session=False)
+                session.query(AnalysisHistory).filter(
+                    AnalysisHistory.id.in_(ids)
+                ).delete(synchronize_session=False)
+            
+            moved += len(rows)
+            if len(rows) < batch_size:
+                break
+        
+        if moved:
+            logger.info(f"🗄️ Archived {moved} analyses older than {older_than.isoformat()}")
+        return moved
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
         """Get user by ID"""
-        with self.get_session() as session:
+        with self.get_read_session() as session:
             user = session.query(User).filter_by(id=user_id).first()
             return user.to_dict() if user else None
     
     def log_activity(self, user_id: int, activity_type: str, activity_data: Dict, description: str = None):
         """Log user activity"""
-        with self.get_session() as session:
-            activity = UserActivity(
-                user_id=user_id,
-                activity_type=activity_type,
-                activity_data=activity_data,
-                description=description
-            )
-            session.add(activity)
-            logger.debug(f"Logged activity: {activity_type} for user {user_id}")
+        if description:
+            # UserActivity has no description column; keep it with the data
+            activity_data = dict(activity_data or {}, description=description)
+        
+        if self.activity_sink is not None:
+            self.activity_sink.record(user_id, activity_type, activity_data)
+        else:
+            with self.get_session() as session:
+                session.add(UserActivity(user_id=user_id, activity_type=activity_type, activity_data=activity_data))
+        logger.debug(f"Logged activity: {activity_type} for user {user_id}")
+    
+    def _add_activity(self, session, user_id: int, activity_type: str, activity_data: Dict):
+        """
+        Record activity as part of `session`'s transaction.
+        
+        With the activity sink enabled the row is buffered once the transaction
+        commits (and dropped if it rolls back) instead of being inserted inline.
+        """
+        if self.activity_sink is None:
+            session.add(UserActivity(user_id=user_id, activity_type=activity_type, activity_data=activity_data))
+            return
+        session.info.setdefault('pending_activity', []).append(
+            (user_id, activity_type, activity_data, datetime.utcnow())
+        )
+    
+    @staticmethod
+    def _touch_user(session, user_id: int):
+        """Mark a user as changed by a bulk statement so its cache entry is dropped on commit"""
+        session.info.setdefault('changed_users', set()).add(user_id)
+    
+    @staticmethod
+    def _track_user_changes(session, flush_context, instances):
+        """before_flush: note users whose tokens, role or profile are about to change"""
+        for obj in list(session.dirty) + list(session.deleted):
+            if isinstance(obj, User) and obj.id is not None and session.is_modified(obj):
+                session.info.setdefault('changed_users', set()).add(obj.id)
     
-    def get_aois_for_analysis(self) -> List[Dict]:
+    @staticmethod
+    def _note_flush(session, flush_context):
+        """after_flush: the transaction wrote something"""
+        session.info['wrote'] = True
+    
+    @staticmethod
+    def _note_statement(orm_execute_state):
+        """do_orm_execute: so do UPDATE/INSERT/DELETE statements run outside the unit of work"""
+        if getattr(orm_execute_state.statement, 'is_dml', False):
+            orm_execute_state.session.info['wrote'] = True
+    
+    def _after_commit(self, session):
+        """after_commit: hand activity to the sink, drop changed users from the cache, pin reads to the primary"""
+        if session.info.pop('wrote', False):
+            pin_reads()
+        for user_id, activity_type, activity_data, timestamp in session.info.pop('pending_activity', ()):
+            self.activity_sink.record(user_id, activity_type, activity_data, timestamp)
+        for user_id in session.info.pop('changed_users', ()):
+            user_cache.invalidate(user_id)
+    
+    @staticmethod
+    def _after_rollback(session):
+        """after_rollback: the changes never happened"""
+        session.info.pop('pending_activity', None)
+        session.info.pop('changed_users', None)
+        session.info.pop('wrote', None)
+    
+    def get_aois_for_analysis(self, limit: int = None) -> List[Dict]:
         """Get AOIs that need automatic analysis"""
-        from datetime import datetime, timedelta
+        result = []
+        for batch in self.iter_aois_for_analysis():
+            result.extend(batch)
+            if limit is not None and len(result) >= limit:
+                return result[:limit]
+        return result
+    
+    def iter_aois_for_analysis(self, batch_size: int = 1000, now: datetime = None):
+        """
+        Yield due AOIs (owner has tokens left) in batches of batch_size.
         
-        with self.get_session() as session:
-            # Get AOIs with monitoring enabled that are due for analysis
-            current_time = datetime.utcnow()
-            
-            aois = session.query(AreaOfInterest).filter(
+        One joined query per batch served by ix_aoi_due. Batches are keyset
+        paginated on (next_run_at, id): never-scheduled AOIs (NULL next_run_at)
+        first, then overdue ones oldest first, so huge due sets never load at once.
+        """
+        current_time = now or datetime.utcnow()
+        
+        base = [
+            AreaOfInterest.is_active == True,
+            AreaOfInterest.baseline_status == 'completed',  # Only analyze AOIs with completed baselines
+            AreaOfInterest.monitoring_frequency.isnot(None),
+            User.tokens_remaining > 0
+        ]
+        columns = (
+            AreaOfInterest.id, AreaOfInterest.user_id, AreaOfInterest.name, AreaOfInterest.location_name,
+            AreaOfInterest.bbox_coordinates, AreaOfInterest.monitoring_frequency, AreaOfInterest.priority,
+            AreaOfInterest.next_run_at, User.tokens_remaining
+        )
+        
+        # Phase 1: never scheduled
+        last_id = 0
+        while True:
+            with self.get_session() as session:
+                rows = session.query(*columns).join(User, User.id == AreaOfInterest.user_id).filter(
+                    *base,
+                    AreaOfInterest.next_run_at.is_(None),
+                    AreaOfInterest.id > last_id
+                ).order_by(AreaOfInterest.id).limit(batch_size).all()
+            if not rows:
+                break
+            yield [self._due_aoi_dict(row) for row in rows]
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1].id
+        
+        # Phase 2: overdue - respect monitoring frequency
+        last_run_at, last_id = None, 0
+        while True:
+            with self.get_session() as session:
+                query = session.query(*columns).join(User, User.id == AreaOfInterest.user_id).filter(
+                    *base,
+                    AreaOfInterest.next_run_at <= current_time
+                )
+                if last_run_at is not None:
+                    query = query.filter(or_(
+                        AreaOfInterest.next_run_at > last_run_at,
+                        and_(AreaOfInterest.next_run_at == last_run_at, AreaOfInterest.id > last_id)
+                    ))
+                rows = query.order_by(AreaOfInterest.next_run_at, AreaOfInterest.id).limit(batch_size).all()
+            if not rows:
+                break
+            yield [self._due_aoi_dict(row) for row in rows]
+            if len(rows) < batch_size:
+                break
+            last_run_at, last_id = rows[-1].next_run_at, rows[-1].id
+    
+    @staticmethod
+    def _due_aoi_dict(row) -> Dict:
+        return {
+            'aoi_id': row.id,
+            'user_db_id': row.user_id,
+            'name': row.name,
+            'location_name': row.location_name,
+            'bbox_coordinates': row.bbox_coordinates,
+            'monitoring_frequency': row.monitoring_frequency,
+            'priority': row.priority,
+            'next_run_at': row.next_run_at,
+            'analysis_type': 'baseline_comparison',
+            'user_tokens': row.tokens_remaining
+        }
+    
+    def get_schedule_latency_stats(self, hours: int = 24) -> Dict[str, Any]:
+        """Per-priority delay between scheduled time and run start for recent automatic analyses"""
+        from services.priority_service import normalize_priority, summarize_latencies
+        
+        since = datetime.utcnow() - timedelta(hours=hours)
+        with self.get_read_session() as session:
+            rows = session.query(AnalysisHistory.meta).filter(
+                AnalysisHistory.aoi_id.isnot(None),
+                AnalysisHistory.analysis_timestamp >= since
+            ).all()
+        
+        latencies = {}
+        for (meta,) in rows:
+            latency = (meta or {}).get('schedule_latency_seconds')
+            if latency is None:
+                continue
+            latencies.setdefault(normalize_priority(meta.get('priority')), []).append(float(latency))
+        
+        return {
+            'window_hours': hours,
+            'priorities': summarize_latencies(latencies)
+        }
+    
+    def get_catchup_progress(self) -> Dict[str, Any]:
+        """Overdue scheduled runs, how many are already dispatched, and the expected drain time"""
+        from services.priority_service import normalize_priority
+
+        now = datetime.utcnow()
+        with self.get_read_session() as session:
+            rows = session.query(
+                AreaOfInterest.priority,
+                func.count(AreaOfInterest.id),
+                func.count(AreaOfInterest.scheduled_task_id),
+                func.min(AreaOfInterest.next_run_at)
+            ).filter(
                 AreaOfInterest.monitoring_frequency.isnot(None),
                 AreaOfInterest.is_active == True,
-                AreaOfInterest.baseline_status == 'completed',  # Only analyze AOIs with completed baselines
-                # Check if it's time for analysis - respect monitoring frequency
-                func.coalesce(AreaOfInterest.next_run_at, current_time - timedelta(days=1)) <= current_time
+                AreaOfInterest.baseline_status == 'completed',
+                AreaOfInterest.next_run_at <= now
+            ).group_by(AreaOfInterest.priority).all()
+
+        by_priority = {}
+        overdue = dispatched = 0
+        oldest = None
+        for priority, count, with_task, earliest in rows:
+            key = normalize_priority(priority)
+            by_priority[key] = by_priority.get(key, 0) + count
+            overdue += count
+            dispatched += with_task
+            if earliest and (oldest is None or earliest < oldest):
+                oldest = earliest
+
+        rate = Config.CATCHUP_MAX_PER_MINUTE
+        waiting = overdue - dispatched
+        return {
+            'active': waiting > 0,
+            'overdue': overdue,
+            'dispatched': dispatched,
+            'waiting': waiting,
+            'by_priority': by_priority,
+            'oldest_overdue_seconds': int((now - oldest).total_seconds()) if oldest else 0,
+            'drain_rate_per_minute': rate,
+            'estimated_minutes_remaining': round(waiting / rate, 1) if rate > 0 else None,
+            'collapse_missed_slots': Config.CATCHUP_COLLAPSE_MISSED
+        }
+
+    def get_schedule_load_histogram(self, hours: int = 48) -> Dict[str, Any]:
+        """Scheduled runs per UTC hour over the next `hours`, projecting recurring schedules"""
+        window_start = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        window_end = window_start + timedelta(hours=hours)
+
+        with self.get_read_session() as session:
+            rows = session.query(AreaOfInterest.monitoring_frequency, AreaOfInterest.next_run_at).filter(
+                AreaOfInterest.monitoring_frequency.isnot(None),
+                AreaOfInterest.is_active == True,
+                AreaOfInterest.next_run_at.isnot(None),
+                AreaOfInterest.next_run_at < window_end
             ).all()
-            
-            result = []
-            for aoi in aois:
-                # Get user info for token checking
-                user = session.query(User).filter_by(id=aoi.user_id).first()
-                if user and user.tokens_remaining > 0:
-                    result.append({
-                        'aoi_id': aoi.id,
-                        'user_db_id': aoi.user_id,
-                        'name': aoi.name,
-                        'location_name': aoi.location_name,
-                        'bbox_coordinates': aoi.bbox_coordinates,
-                        'monitoring_frequency': aoi.monitoring_frequency,
-                        'analysis_type': 'baseline_comparison',
-                        'user_tokens': user.tokens_remaining
-                    })
-            
-            return result
-    
+
+        counts = [0] * hours
+        overdue = 0
+        for frequency, run_at in rows:
+            if run_at < window_start:
+                overdue += 1
+                continue
+            interval = frequency_interval(frequency)
+            while run_at < window_end:
+                counts[int((run_at - window_start).total_seconds() // 3600)] += 1
+                if interval is None:
+                    break
+                run_at += interval
+
+        return {
+            'window_start': window_start.isoformat(),
+            'hours': hours,
+            'buckets': [
+                {'hour': (window_start + timedelta(hours=index)).isoformat(), 'runs': count}
+                for index, count in enumerate(counts)
+            ],
+            'total_runs': sum(counts),
+            'peak_runs': max(counts) if counts else 0,
+            'average_runs': round(sum(counts) / hours, 2) if hours else 0,
+            'overdue': overdue
+        }
+
     def update_aoi_analysis_date(self, aoi_id: int, increment_total: bool = False):
         """Update AOI analysis date and optionally increment analysis count"""
-        from datetime import datetime, timedelta
-        
         with self.get_session() as session:
             aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
             if aoi:
-                # Set next analysis date based on frequency with minimum intervals
-                if aoi.monitoring_frequency == 'daily':
-                    aoi.next_run_at = datetime.utcnow() + timedelta(days=1)
-                elif aoi.monitoring_frequency == 'weekly' or aoi.monitoring_frequency == 'WEEKLY':
-                    aoi.next_run_at = datetime.utcnow() + timedelta(days=7)
-                elif aoi.monitoring_frequency == 'monthly' or aoi.monitoring_frequency == 'MONTHLY':
-                    aoi.next_run_at = datetime.utcnow() + timedelta(days=30)
+                if (aoi.monitoring_frequency or '').lower() == 'once':
+                    # One-time monitoring is done: disable it, like a finished scheduled run
+                    aoi.monitoring_frequency = None
+                    aoi.next_run_at = None
                 else:
-                    # Default to weekly if frequency is unknown
-                    aoi.next_run_at = datetime.utcnow() + timedelta(days=7)
+                    # Next slot for the AOI's frequency; weekly when it has no interval of its own
+                    aoi.next_run_at = (
+                        following_slot(aoi.id, aoi.monitoring_frequency or 'weekly',
+                                       aoi.next_run_at, aoi.schedule_anchor_at)
+                        or following_slot(aoi.id, 'weekly', aoi.next_run_at, aoi.schedule_anchor_at)
+                    )
                 
                 # Optionally increment analysis count (could add a field if needed)
                 if increment_total:
@@ -418,15 +1256,14 @@ class DatabaseManager:
                           payment_intent_id: str = None, price_per_token: float = None) -> Dict:
         """Add tokens to user account with full transaction tracking"""
         with self.get_session() as session:
-            from models import User, TokenTransaction
+            from models import TokenTransaction
             
-            user = session.query(User).filter_by(id=user_id).first()
-            if not user:
+            # Relative update, so a concurrent debit is never overwritten
+            balances = self._adjust_token_balance(session, user_id, amount)
+            if balances is None:
                 return {'success': False, 'message': 'User not found'}
             
-            balance_before = user.tokens_remaining
-            user.tokens_remaining += amount
-            balance_after = user.tokens_remaining
+            balance_before, balance_after = balances
             
             # Create transaction record
             transaction = TokenTransaction(
@@ -457,9 +1294,153 @@ class DatabaseManager:
                 'transaction_id': transaction.id
             }
     
+    # Rows per statement for bulk grants (keeps bind parameters well under driver limits)
+    BULK_GRANT_CHUNK = 1000
+    
+    def bulk_add_tokens(self, grants: List[Dict], transaction_type: str = 'admin_grant',
+                        admin_user_id: int = None, admin_note: str = None) -> List[Dict]:
+        """
+        Grant tokens to many users in one transaction.
+        
+        grants: [{'email': ..., 'amount': ...}, ...]. Emails are resolved with one
+        IN query per chunk, balances are updated set-wise and the ledger rows are
+        bulk-inserted. Returns one outcome per input row, in input order; if any
+        statement fails nothing is applied.
+        """
+        from models import TokenTransaction
+        
+        outcomes = []
+        valid = []
+        for row, grant in enumerate(grants):
+            email = grant.get('email')
+            amount = grant.get('amount')
+            outcome = {'row': row, 'email': email or 'missing', 'amount': amount, 'success': False}
+            outcomes.append(outcome)
+            
+            if not email:
+                outcome['error'] = 'Email required'
+            elif not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+                outcome['error'] = 'Amount must be a positive integer'
+            else:
+                valid.append(outcome)
+        
+        if not valid:
+            return outcomes
+        
+        with self.get_session() as session:
+            # 1. Resolve emails (lowest id wins if an email is shared, like get_user_by_email's first match)
+            user_ids = {}
+            emails = sorted({outcome['email'] for outcome in valid})
+            for start in range(0, len(emails), self.BULK_GRANT_CHUNK):
+                chunk = emails[start:start + self.BULK_GRANT_CHUNK]
+                for user_id, email in session.query(User.id, User.email).filter(
+                    User.email.in_(chunk)
+                ).order_by(User.id.desc()):
+                    user_ids[email] = user_id
+            
+            credits = {}
+            for outcome in valid:
+                user_id = user_ids.get(outcome['email'])
+                if user_id is None:
+                    outcome['error'] = 'User not found'
+                    continue
+                outcome['user_id'] = user_id
+                credits[user_id] = credits.get(user_id, 0) + outcome['amount']
+            
+            if not credits:
+                return outcomes
+            
+            # 2. Apply every user's total credit set-wise
+            balances_after = self._apply_bulk_credits(session, credits)
+            
+            # 3. Ledger rows: walk each user's grants in input order from the pre-grant balance
+            running = {user_id: balances_after[user_id] - total for user_id, total in credits.items()}
+            ledger = []
+            for outcome in valid:
+                user_id = outcome.get('user_id')
+                if user_id is None:
+                    continue
+                balance_before = running[user_id]
+                running[user_id] = balance_before + outcome['amount']
+                outcome.update({
+                    'success': True,
+                    'balance_before': balance_before,
+                    'new_balance': running[user_id]
+                })
+                ledger.append({
+                    'user_id': user_id,
+                    'transaction_type': transaction_type,
+                    'amount': outcome['amount'],
+                    'balance_before': balance_before,
+                    'balance_after': running[user_id],
+                    'admin_user_id': admin_user_id,
+                    'admin_note': admin_note,
+                    'status': 'completed'
+                })
+            
+            # (user_id, balance_after) is unique within a grant, so it identifies each inserted row
+            transaction_ids = self._insert_ledger_rows(session, TokenTransaction, ledger)
+            for outcome in valid:
+                if outcome['success']:
+                    outcome['transaction_id'] = transaction_ids.get((outcome['user_id'], outcome['new_balance']))
+            
+            logger.info(f"Bulk granted tokens to {len(credits)} users ({len(ledger)} grants)")
+        
+        return outcomes
+    
+    def _apply_bulk_credits(self, session, credits: Dict[int, int]) -> Dict[int, int]:
+        """Add credits {user_id: amount} to balances; returns {user_id: balance_after}"""
+        items = list(credits.items())
+        balances_after = {}
+        for user_id, _ in items:
+            self._touch_user(session, user_id)
+        
+        if session.get_bind().dialect.name == 'postgresql':
+            # UPDATE users ... FROM (VALUES (id, amount), ...) RETURNING id, tokens_remaining
+            for start in range(0, len(items), self.BULK_GRANT_CHUNK):
+                grant_values = values(
+                    column('id', Integer), column('amount', Integer), name='grants'
+                ).data(items[start:start + self.BULK_GRANT_CHUNK])
+                statement = update(User).where(User.id == grant_values.c.id).values(
+                    tokens_remaining=User.tokens_remaining + grant_values.c.amount
+                ).returning(User.id, User.tokens_remaining).execution_options(synchronize_session=False)
+                balances_after.update(session.execute(statement).all())
+            return balances_after
+        
+        # Other dialects: one executemany UPDATE, then read the balances back inside the same transaction
+        session.execute(
+            update(User).where(User.id == bindparam('user_id')).values(
+                tokens_remaining=User.tokens_remaining + bindparam('amount')
+            ).execution_options(synchronize_session=False),
+            [{'user_id': user_id, 'amount': amount} for user_id, amount in items]
+        )
+        user_ids = [user_id for user_id, _ in items]
+        for start in range(0, len(user_ids), self.BULK_GRANT_CHUNK):
+            balances_after.update(session.query(User.id, User.tokens_remaining).filter(
+                User.id.in_(user_ids[start:start + self.BULK_GRANT_CHUNK])
+            ).all())
+        return balances_after
+    
+    def _insert_ledger_rows(self, session, model, rows: List[Dict]) -> Dict[Tuple[int, int], int]:
+        """Bulk-insert ledger rows; returns {(user_id, balance_after): transaction id}"""
+        ids = {}
+        if session.get_bind().dialect.implicit_returning:
+            for start in range(0, len(rows), self.BULK_GRANT_CHUNK):
+                statement = insert(model).values(rows[start:start + self.BULK_GRANT_CHUNK]).returning(
+                    model.id, model.user_id, model.balance_after
+                )
+                for transaction_id, user_id, balance_after in session.execute(statement):
+                    ids[(user_id, balance_after)] = transaction_id
+            return ids
+        
+        session.bulk_insert_mappings(model, rows, return_defaults=True)
+        for row in rows:
+            ids[(row['user_id'], row['balance_after'])] = row.get('id')
+        return ids
+    
     def get_user_token_transactions(self, user_id: int, limit: int = 50) -> List[Dict]:
         """Get user's token transaction history"""
-        with self.get_session() as session:
+        with self.get_read_session() as session:
             from models import TokenTransaction
             
             transactions = session.query(TokenTransaction)\
@@ -471,75 +1452,140 @@ class DatabaseManager:
     
     def get_all_token_transactions(self, limit: int = 100) -> List[Dict]:
         """Get all token transactions (admin view)"""
-        with self.get_session() as session:
-            from models import TokenTransaction, User
+        return self.get_token_transactions_page(limit=limit)['transactions']
+    
+    def get_token_transactions_page(self, limit: int = 100, cursor: str = None, user_id: int = None,
+                                    total: str = 'none') -> Dict[str, Any]:
+        """
+        One keyset page of token transactions (admin view), optionally for a single user.
+        
+        total: 'none', 'estimate' (planner row estimate, all users only) or 'exact'
+        """
+        with self.get_read_session() as session:
+            from models import TokenTransaction
             
-            transactions = session.query(TokenTransaction)\
-                .join(User, TokenTransaction.user_id == User.id)\
-                .order_by(TokenTransaction.created_at.desc())\
-                .limit(limit).all()
+            query = session.query(TokenTransaction).options(
+                joinedload(TokenTransaction.user).load_only(User.email)
+            )
+            if user_id is not None:
+                query = query.filter(TokenTransaction.user_id == user_id)
+                if total == 'estimate':
+                    total = 'exact'
+            
+            transactions, next_cursor = keyset_page(
+                query, TokenTransaction.created_at, TokenTransaction.id, limit, cursor
+            )
             
             result = []
             for tx in transactions:
                 tx_dict = tx.to_dict()
-                tx_dict['user_email'] = tx.user.email
+                tx_dict['user_email'] = tx.user.email if tx.user else None
                 result.append(tx_dict)
             
-            return result
+            return {
+                'transactions': result,
+                'pagination': page_info(limit, next_cursor,
+                                        count_rows(session, query, 'token_transactions', total))
+            }
             
+    def _adjust_token_balance(self, session, user_id: int, delta: int,
+                              tokens_used: int = 0) -> Optional[Tuple[int, int]]:
+        """
+        Atomically change a user's balance by `delta` in the database.
+        
+        Debits (negative delta) are conditional on the balance covering them, so
+        concurrent requests can never drive it below zero. Returns
+        (balance_before, balance_after), or None when no row matched (unknown
+        user or insufficient tokens).
+        """
+        from models import User
+        
+        condition = [User.id == user_id]
+        if delta < 0:
+            condition.append(User.tokens_remaining >= -delta)
+        
+        values = {User.tokens_remaining: User.tokens_remaining + delta}
+        if tokens_used:
+            values[User.total_tokens_used] = func.coalesce(User.total_tokens_used, 0) + tokens_used
+        
+        statement = update(User).where(*condition).values(values).execution_options(synchronize_session=False)
+        self._touch_user(session, user_id)
+        
+        if session.get_bind().dialect.implicit_returning:
+            # UPDATE ... RETURNING: the check, the write and the new balance in one round-trip
+            balance_after = session.execute(statement.returning(User.tokens_remaining)).scalar()
+            if balance_after is None:
+                return None
+        else:
+            # No RETURNING support (SQLite on SQLAlchemy 1.4): the UPDATE holds the write
+            # lock until commit, so reading the row back in this transaction is consistent
+            if session.execute(statement).rowcount != 1:
+                return None
+            balance_after = session.query(User.tokens_remaining).filter(User.id == user_id).scalar()
+        
+        return balance_after - delta, balance_after
+    
     def update_token_usage_with_transaction(self, user_id: int, tokens_used: int, reference_id: str = None) -> Dict:
         """Record token usage with transaction tracking (for AOI creation, etc.)"""
         with self.get_session() as session:
-            from models import User, TokenTransaction
-            
-            user = session.query(User).filter_by(id=user_id).first()
-            if not user:
+            return self._debit_tokens(session, user_id, tokens_used, reference_id)
+    
+    def _debit_tokens(self, session, user_id: int, tokens_used: int, reference_id: str = None) -> Dict:
+        """Debit tokens and add the usage ledger row in the caller's transaction"""
+        from models import User, TokenTransaction
+        
+        balances = self._adjust_token_balance(session, user_id, -tokens_used, tokens_used=tokens_used)
+        if balances is None:
+            if not session.query(User.id).filter_by(id=user_id).first():
                 return {'success': False, 'message': 'User not found'}
-            
-            if user.tokens_remaining < tokens_used:
-                return {'success': False, 'message': 'Insufficient tokens'}
-            
-            balance_before = user.tokens_remaining
-            user.tokens_remaining -= tokens_used
-            user.total_tokens_used += tokens_used
-            balance_after = user.tokens_remaining
-            
-            # Create usage transaction record
-            transaction = TokenTransaction(
-                user_id=user_id,
-                transaction_type='usage',
-                amount=-tokens_used,  # negative for usage
-                balance_before=balance_before,
-                balance_after=balance_after,
-                reference_id=reference_id,
-                status='completed'
-            )
-            session.add(transaction)
-            session.flush()
-            
-            logger.info(f"Recorded {tokens_used} token usage for user {user_id}: {balance_before} -> {balance_after}")
-            
-            return {
-                'success': True,
-                'message': f'Used {tokens_used} tokens',
-                'user_id': user_id,
-                'tokens_used': tokens_used,
-                'balance_before': balance_before,
-                'balance_after': balance_after,
-                'transaction_id': transaction.id
-            }
+            return {'success': False, 'message': 'Insufficient tokens'}
+        
+        balance_before, balance_after = balances
+        
+        # Create usage transaction record (committed together with the debit)
+        transaction = TokenTransaction(
+            user_id=user_id,
+            transaction_type='usage',
+            amount=-tokens_used,  # negative for usage
+            balance_before=balance_before,
+            balance_after=balance_after,
+            reference_id=reference_id,
+            status='completed'
+        )
+        session.add(transaction)
+        session.flush()
+        
+        logger.info(f"Recorded {tokens_used} token usage for user {user_id}: {balance_before} -> {balance_after}")
+        
+        return {
+            'success': True,
+            'message': f'Used {tokens_used} tokens',
+            'user_id': user_id,
+            'tokens_used': tokens_used,
+            'balance_before': balance_before,
+            'balance_after': balance_after,
+            'transaction_id': transaction.id
+        }
     
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email address"""
-        with self.get_session() as session:
+        with self.get_read_session() as session:
             user = session.query(User).filter_by(email=email).first()
             return user.to_dict() if user else None
     
-    def list_all_users(self, limit: int = 50, offset: int = 0) -> List[Dict]:
-        """List all users with pagination"""
-        with self.get_session() as session:
+    def list_all_users(self, limit: int = 50, offset: int = 0, cursor: str = None) -> List[Dict]:
+        """
+        List all users, newest first.
+        
+        Pass the previous page's cursor (see get_all_users_paginated) for keyset
+        paging; offset is kept for existing callers and gets slower with depth.
+        """
+        if cursor or not offset:
+            return self.get_all_users_paginated(per_page=limit, cursor=cursor)['users']
+        
+        with self.get_read_session() as session:
             users = session.query(User)\
-                .order_by(User.created_at.desc())\
+                .order_by(User.created_at.desc(), User.id.desc())\
                 .offset(offset)\
                 .limit(limit)\
                 .all()
@@ -548,81 +1594,91 @@ class DatabaseManager:
     
     def get_user_count(self) -> int:
         """Get total number of users"""
-        with self.get_session() as session:
+        with self.get_read_session() as session:
             return session.query(User).count()
     
-    def get_admin_stats(self) -> Dict[str, Any]:
-        """Get comprehensive admin statistics"""
-        with self.get_session() as session:
-            from datetime import datetime, timedelta
-            
-            # Basic counts
-            total_users = session.query(User).count()
-            admin_users = session.query(User).filter(
-                (User.is_admin == True) | (User.role.in_(['admin', 'super_admin']))
-            ).count()
-            
-            total_aois = session.query(AreaOfInterest).count()
-            active_aois = session.query(AreaOfInterest).filter_by(is_active=True).count()
-            
-            total_analyses = session.query(AnalysisHistory).count()
-            
-            # Token usage statistics
-            total_tokens_used = session.query(func.sum(User.total_tokens_used)).scalar() or 0
-            total_tokens_remaining = session.query(func.sum(User.tokens_remaining)).scalar() or 0
-            
-            # Recent activity (last 7 days)
-            week_ago = datetime.now() - timedelta(days=7)
-            recent_users = session.query(User).filter(User.created_at >= week_ago).count()
-            recent_analyses = session.query(AnalysisHistory).filter(
-                AnalysisHistory.created_at >= week_ago
-            ).count()
-            recent_aois = session.query(AreaOfInterest).filter(
-                AreaOfInterest.created_at >= week_ago
-            ).count()
-            
-            return {
-                'users': {
-                    'total': total_users,
-                    'admins': admin_users,
-                    'recent_7_days': recent_users
-                },
-                'aois': {
-                    'total': total_aois,
-                    'active': active_aois,
-                    'recent_7_days': recent_aois
-                },
-                'analyses': {
-                    'total': total_analyses,
-                    'recent_7_days': recent_analyses
-                },
-                'tokens': {
-                    'total_used': total_tokens_used,
-                    'total_remaining': total_tokens_remaining
-                },
-                'system': {
-                    'timestamp': datetime.now().isoformat(),
-                    'status': 'operational'
-                }
+    def get_admin_stats(self, refresh: bool = False) -> Dict[str, Any]:
+        """Admin statistics snapshot, cached for ADMIN_STATS_TTL_SECONDS (refresh=True recomputes)"""
+        stats = dict(self.admin_stats_cache.get(force=refresh))
+        snapshot = self.admin_stats_cache.info()
+        stats['system'] = dict(
+            stats['system'],
+            cache={'age_seconds': snapshot['age_seconds'], 'ttl_seconds': snapshot['ttl_seconds']}
+        )
+        return stats
+    
+    def _compute_admin_stats(self) -> Dict[str, Any]:
+        """All admin counts in one statement: one aggregate per table, split with FILTER"""
+        week_ago = datetime.now() - timedelta(days=7)
+        is_admin = (User.is_admin == True) | (User.role.in_(['admin', 'super_admin']))
+        
+        users = select(
+            func.count().label('total'),
+            func.count().filter(is_admin).label('admins'),
+            func.count().filter(User.created_at >= week_ago).label('recent'),
+            func.coalesce(func.sum(User.total_tokens_used), 0).label('tokens_used'),
+            func.coalesce(func.sum(User.tokens_remaining), 0).label('tokens_remaining')
+        ).select_from(User).subquery()
+        aois = select(
+            func.count().label('total'),
+            func.count().filter(AreaOfInterest.is_active == True).label('active'),
+            func.count().filter(AreaOfInterest.created_at >= week_ago).label('recent')
+        ).select_from(AreaOfInterest).subquery()
+        analyses = select(
+            func.count().label('total'),
+            func.count().filter(AnalysisHistory.analysis_timestamp >= week_ago).label('recent')
+        ).select_from(AnalysisHistory).subquery()
+        archived = select(
+            func.count().label('archived')
+        ).select_from(AnalysisHistoryArchive).subquery()
+        
+        with self.get_read_session() as session:
+            # Each subquery is a single row; join them side by side
+            row = session.execute(
+                select(users, aois, analyses, archived).select_from(
+                    users.join(aois, true()).join(analyses, true()).join(archived, true())
+                )
+            ).one()
+        
+        u, a, h = row[:5], row[5:8], row[8:]
+        return {
+            'users': {
+                'total': u[0],
+                'admins': u[1],
+                'recent_7_days': u[2]
+            },
+            'aois': {
+                'total': a[0],
+                'active': a[1],
+                'recent_7_days': a[2]
+            },
+            'analyses': {
+                'total': h[0] + h[2],
+                'archived': h[2],
+                'recent_7_days': h[1]
+            },
+            'tokens': {
+                'total_used': int(u[3]),
+                'total_remaining': int(u[4])
+            },
+            'system': {
+                'timestamp': datetime.now().isoformat(),
+                'status': 'operational'
             }
+        }
     
-    def get_all_users_paginated(self, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
-        """Get paginated list of all users for admin panel"""
-        with self.get_session() as session:
-            offset = (page - 1) * per_page
-            
-            users_query = session.query(User).order_by(User.created_at.desc())
-            total_users = users_query.count()
-            users = users_query.offset(offset).limit(per_page).all()
+    def get_all_users_paginated(self, per_page: int = 10, cursor: str = None, total: str = 'none') -> Dict[str, Any]:
+        """
+        Keyset page of all users for admin panel (newest first).
+        
+        total: 'none', 'estimate' (planner row estimate) or 'exact' (COUNT(*))
+        """
+        with self.get_read_session() as session:
+            users_query = session.query(User)
+            users, next_cursor = keyset_page(users_query, User.created_at, User.id, per_page, cursor)
             
             return {
                 'users': [user.to_dict() for user in users],
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total_users,
-                    'pages': (total_users + per_page - 1) // per_page,
-                    'has_next': offset + per_page < total_users,
-                    'has_prev': page > 1
-                }
-            }
\ No newline at end of file
+                'pagination': page_info(per_page, next_cursor,
+                                        count_rows(session, users_query, 'users', total))
+            }
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the numeric bbox columns and spatial indexes to areas_of_interest
+
+Adds min_lon / min_lat / max_lon / max_lat, fills them from bbox_coordinates
+([lon_min, lat_min, lon_max, lat_max]) and builds the B-tree indexes used by
+the spatial AOI queries. When the PostGIS extension is installed it also
+builds a GiST index on the bbox envelope, which the queries then use instead.
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK = 5000  # AOI ids per transaction
+
+INDEXES = [
+    ('ix_aoi_bbox', 'areas_of_interest (min_lon, max_lon, min_lat, max_lat)'),
+    ('ix_aoi_lon_span', 'areas_of_interest ((max_lon - min_lon))'),
+]
+GIST_INDEX = ('ix_aoi_bbox_gist',
+              'areas_of_interest USING gist (ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326))')
+
+def migrate_aoi_bbox():
+    """Add and backfill the bbox columns, then create the spatial indexes without blocking writes"""
+
+    try:
+        logger.info("Starting AOI bbox migration...")
+        with db_manager.engine.begin() as connection:
+            connection.execute(text("""
+                ALTER TABLE areas_of_interest
+                ADD COLUMN IF NOT EXISTS min_lon DOUBLE PRECISION,
+                ADD COLUMN IF NOT EXISTS min_lat DOUBLE PRECISION,
+                ADD COLUMN IF NOT EXISTS max_lon DOUBLE PRECISION,
+                ADD COLUMN IF NOT EXISTS max_lat DOUBLE PRECISION;
+            """))
+            max_id = connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM areas_of_interest")).scalar()
+        logger.info("✅ Added bbox columns to areas_of_interest")
+
+        filled = 0
+        for first_id in range(1, max_id + 1, BACKFILL_CHUNK):
+            with db_manager.engine.begin() as connection:
+                filled += connection.execute(text("""
+                    UPDATE areas_of_interest SET
+                        min_lon = LEAST((bbox_coordinates->>0)::float, (bbox_coordinates->>2)::float),
+                        min_lat = LEAST((bbox_coordinates->>1)::float, (bbox_coordinates->>3)::float),
+                        max_lon = GREATEST((bbox_coordinates->>0)::float, (bbox_coordinates->>2)::float),
+                        max_lat = GREATEST((bbox_coordinates->>1)::float, (bbox_coordinates->>3)::float)
+                    WHERE id BETWEEN :first_id AND :last_id
+                      AND min_lon IS NULL
+                      AND json_typeof(bbox_coordinates) = 'array'
+                      AND json_array_length(bbox_coordinates) = 4
+                """), {'first_id': first_id, 'last_id': first_id + BACKFILL_CHUNK - 1}).rowcount
+        logger.info(f"✅ Filled bbox columns for {filled} AOIs")
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            indexes = list(INDEXES)
+            if connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).scalar():
+                indexes.append(GIST_INDEX)
+            else:
+                logger.info("PostGIS is not installed; spatial queries use the B-tree indexes "
+                            "(CREATE EXTENSION postgis and re-run to add the GiST index)")
+
+            for index_name, definition in indexes:
+                connection.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {definition};"))
+                logger.info(f"✅ Created {index_name}")
+
+            connection.execute(text("ANALYZE areas_of_interest;"))
+
+        logger.info("✅ Successfully migrated AOI bbox columns and spatial indexes")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running AOI bbox migration...")
+    success = migrate_aoi_bbox()
+
+    if success:
+        print("✅ Migration completed! Restart the API so it detects the PostGIS index.")
+    else:
+        print("❌ Migration failed. Check the logs above.")
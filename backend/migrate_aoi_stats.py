@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Database migration to create aoi_stats and backfill it from analysis_history
+
+Safe to re-run: every AOI's row is recomputed from its full history.
+"""
+import logging
+from sqlalchemy import text, select, delete, insert
+from config import Config
+from shared_db import db_manager
+from models import AreaOfInterest, AnalysisHistory, AOIStats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK = 500  # AOIs per transaction
+
+
+def summarize(aoi_id, analyses):
+    """aoi_stats row for one AOI from its (analysis_timestamp, id)-ordered history"""
+    row = {
+        'aoi_id': aoi_id,
+        'total_analyses': 0,
+        'total_tokens_used': 0,
+        'last_analysis_id': None,
+        'last_analysis_at': None,
+        'last_change_percentage': None,
+        'change_samples': 0,
+        'avg_change_percentage': None,
+        'ewma_change_percentage': None
+    }
+    alpha = Config.AOI_STATS_EWMA_ALPHA
+    change_sum = 0.0
+    for analysis_id, timestamp, tokens_used, change_percentage in analyses:
+        row['total_analyses'] += 1
+        row['total_tokens_used'] += tokens_used or 0
+        row['last_analysis_id'] = analysis_id
+        row['last_analysis_at'] = timestamp
+        if change_percentage is not None:
+            change_sum += change_percentage
+            row['change_samples'] += 1
+            row['last_change_percentage'] = change_percentage
+            previous = row['ewma_change_percentage']
+            row['ewma_change_percentage'] = change_percentage if previous is None else \
+                alpha * change_percentage + (1 - alpha) * previous
+    if row['change_samples']:
+        row['avg_change_percentage'] = change_sum / row['change_samples']
+    return row
+
+
+def migrate_aoi_stats():
+    """Create aoi_stats if needed and recompute it for every AOI"""
+
+    try:
+        logger.info("Starting aoi_stats migration...")
+        AOIStats.__table__.create(bind=db_manager.engine, checkfirst=True)
+
+        with db_manager.engine.connect() as connection:
+            aoi_ids = [row[0] for row in connection.execute(select(AreaOfInterest.id).order_by(AreaOfInterest.id))]
+
+        for start in range(0, len(aoi_ids), BACKFILL_CHUNK):
+            chunk = aoi_ids[start:start + BACKFILL_CHUNK]
+            with db_manager.engine.begin() as connection:
+                if connection.dialect.name == 'postgresql':
+                    # save_analysis updates wait for this chunk; their history rows are counted once
+                    connection.execute(text("LOCK TABLE aoi_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+                history = {aoi_id: [] for aoi_id in chunk}
+                result = connection.execute(
+                    select(
+                        AnalysisHistory.aoi_id, AnalysisHistory.id, AnalysisHistory.analysis_timestamp,
+                        AnalysisHistory.tokens_used, AnalysisHistory.change_percentage
+                    ).where(
+                        AnalysisHistory.aoi_id.in_(chunk)
+                    ).order_by(AnalysisHistory.aoi_id, AnalysisHistory.analysis_timestamp, AnalysisHistory.id)
+                )
+                for aoi_id, *analysis in result:
+                    history[aoi_id].append(analysis)
+
+                connection.execute(delete(AOIStats.__table__).where(AOIStats.aoi_id.in_(chunk)))
+                connection.execute(
+                    insert(AOIStats.__table__),
+                    [summarize(aoi_id, analyses) for aoi_id, analyses in history.items()]
+                )
+            logger.info(f"Backfilled aoi_stats for {start + len(chunk)}/{len(aoi_ids)} AOIs")
+
+        with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            if connection.dialect.name == 'postgresql':
+                connection.execute(text("ANALYZE aoi_stats;"))
+
+        logger.info("✅ Successfully created and backfilled aoi_stats")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running aoi_stats migration...")
+    success = migrate_aoi_stats()
+
+    if success:
+        print("✅ Migration completed!")
+    else:
+        print("❌ Migration failed. Check the logs above.")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the baseline_started_at column to areas_of_interest
+
+A baseline worker records when it claimed the row ('pending' -> 'processing');
+on start and on every sweep only claims older than BASELINE_STALE_MINUTES are
+returned to 'pending', so baselines other processes are building are left alone.
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_baseline_claim():
+    """Add baseline_started_at column to areas_of_interest table"""
+    
+    migration_sql = """
+    ALTER TABLE areas_of_interest 
+    ADD COLUMN IF NOT EXISTS baseline_started_at TIMESTAMP;
+    """
+    
+    try:
+        with db_manager.get_session() as session:
+            logger.info("Starting baseline_started_at migration...")
+            
+            session.execute(text(migration_sql))
+            session.commit()
+            
+            logger.info("✅ Successfully added baseline_started_at to areas_of_interest table")
+            return True
+                
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running baseline_started_at migration...")
+    success = migrate_baseline_claim()
+    
+    if success:
+        print("✅ Migration completed! Restart the API.")
+    else:
+        print("❌ Migration failed. Check the logs above.")
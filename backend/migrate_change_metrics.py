@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Database migration to create aoi_change_metrics and backfill it from analysis history
+
+Older analyses only stored change_percentage, so backfilled points carry
+overall_change alone. Both history tiers are read; analyses that already have
+a point are skipped, so the migration is safe to re-run.
+"""
+import logging
+from sqlalchemy import text, select, insert, exists, func
+from shared_db import db_manager
+from models import AreaOfInterest, AnalysisHistory, AnalysisHistoryArchive, AOIChangeMetric
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK = 10000  # analysis ids per transaction
+
+
+def backfill_statement(model, first_id, last_id):
+    """INSERT ... SELECT of the missing points for analyses first_id..last_id of one tier"""
+    return insert(AOIChangeMetric.__table__).from_select(
+        ['aoi_id', 'analysis_id', 'measured_at', 'overall_change'],
+        select(
+            model.aoi_id, model.id, func.coalesce(model.analysis_timestamp, func.now()), model.change_percentage
+        ).where(
+            model.id.between(first_id, last_id),
+            model.change_percentage.isnot(None),
+            exists().where(AreaOfInterest.id == model.aoi_id),
+            ~exists().where(AOIChangeMetric.analysis_id == model.id)
+        )
+    )
+
+
+def migrate_change_metrics():
+    """Create aoi_change_metrics if needed and add a point for every AOI analysis without one"""
+
+    try:
+        logger.info("Starting change metrics migration...")
+        AOIChangeMetric.__table__.create(bind=db_manager.engine, checkfirst=True)
+
+        for model in (AnalysisHistory, AnalysisHistoryArchive):
+            with db_manager.engine.connect() as connection:
+                max_id = connection.execute(select(func.max(model.id))).scalar() or 0
+
+            added = 0
+            for first_id in range(1, max_id + 1, BACKFILL_CHUNK):
+                with db_manager.engine.begin() as connection:
+                    added += connection.execute(
+                        backfill_statement(model, first_id, first_id + BACKFILL_CHUNK - 1)
+                    ).rowcount
+            logger.info(f"Backfilled {added} points from {model.__tablename__}")
+
+        with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            if connection.dialect.name == 'postgresql':
+                connection.execute(text("ANALYZE aoi_change_metrics;"))
+
+        logger.info("✅ Successfully created and backfilled aoi_change_metrics")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running change metrics migration...")
+    success = migrate_change_metrics()
+
+    if success:
+        print("✅ Migration completed!")
+    else:
+        print("❌ Migration failed. Check the logs above.")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the partial due-AOI index (ix_aoi_due) to areas_of_interest
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_due_index():
+    """Create ix_aoi_due without blocking writes to areas_of_interest"""
+    
+    migration_sql = """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_aoi_due
+    ON areas_of_interest (is_active, baseline_status, next_run_at)
+    WHERE monitoring_frequency IS NOT NULL;
+    """
+    
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            logger.info("Starting ix_aoi_due migration...")
+            
+            connection.execute(text(migration_sql))
+            connection.execute(text("ANALYZE areas_of_interest;"))
+            
+            logger.info("✅ Successfully created ix_aoi_due on areas_of_interest")
+            return True
+                
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running ix_aoi_due migration...")
+    success = migrate_due_index()
+    
+    if success:
+        print("✅ Migration completed!")
+    else:
+        print("❌ Migration failed. Check the logs above.")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Database migration to create the analysis_history_archive tier
+
+Creates the archive table with its indexes and indexes analysis_jobs.analysis_id,
+which the retention job clears for every archived analysis. Moving rows is left
+to the tasks.archive_analysis_history beat task (HISTORY_RETENTION_DAYS).
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+from models import AnalysisHistoryArchive
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_history_archive():
+    """Create analysis_history_archive and the analysis_jobs.analysis_id index"""
+
+    try:
+        logger.info("Starting history archive migration...")
+        AnalysisHistoryArchive.__table__.create(bind=db_manager.engine, checkfirst=True)
+        logger.info("✅ Created analysis_history_archive")
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            concurrently = "CONCURRENTLY " if connection.dialect.name == 'postgresql' else ""
+            connection.execute(text(
+                f"CREATE INDEX {concurrently}IF NOT EXISTS ix_analysis_jobs_analysis_id ON analysis_jobs (analysis_id);"
+            ))
+            logger.info("✅ Created ix_analysis_jobs_analysis_id on analysis_jobs (analysis_id)")
+
+        logger.info("✅ Successfully created the history archive tier")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running history archive migration...")
+    success = migrate_history_archive()
+
+    if success:
+        print("✅ Migration completed!")
+    else:
+        print("❌ Migration failed. Check the logs above.")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Database migration to add composite indexes for the newest-first history and ledger queries
+
+Replaces the single-column user_id / aoi_id indexes on analysis_history and
+token_transactions, which the composite indexes cover as their leading column.
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (index, table, columns, single-column index it makes redundant)
+INDEXES = [
+    ('ix_history_aoi_ts', 'analysis_history', 'aoi_id, analysis_timestamp, id', 'ix_analysis_history_aoi_id'),
+    ('ix_history_user_ts', 'analysis_history', 'user_id, analysis_timestamp, id', 'ix_analysis_history_user_id'),
+    ('ix_token_tx_user_created', 'token_transactions', 'user_id, created_at, id', 'ix_token_transactions_user_id'),
+]
+
+def migrate_hot_query_indexes():
+    """Create the composite indexes, then drop the indexes they replace, without blocking writes"""
+    
+    try:
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+        with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            logger.info("Starting hot query index migration...")
+            
+            for index_name, table, columns, _ in INDEXES:
+                connection.execute(text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {table} ({columns});"
+                ))
+                logger.info(f"✅ Created {index_name} on {table} ({columns})")
+            
+            for _, _, _, replaced in INDEXES:
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {replaced};"))
+                logger.info(f"✅ Dropped {replaced}")
+            
+            connection.execute(text("ANALYZE analysis_history;"))
+            connection.execute(text("ANALYZE token_transactions;"))
+            
+            logger.info("✅ Successfully migrated hot query indexes")
+            return True
+                
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running hot query index migration...")
+    success = migrate_hot_query_indexes()
+    
+    if success:
+        print("✅ Migration completed!")
+    else:
+        print("❌ Migration failed. Check the logs above.")
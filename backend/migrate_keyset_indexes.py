@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the users (created_at, id) index used by keyset pagination
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_keyset_indexes():
+    """Create ix_users_created_id without blocking writes to users"""
+    
+    migration_sql = """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_id
+    ON users (created_at, id);
+    """
+    
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            logger.info("Starting ix_users_created_id migration...")
+            
+            connection.execute(text(migration_sql))
+            connection.execute(text("ANALYZE users;"))
+            
+            logger.info("✅ Successfully created ix_users_created_id on users")
+            return True
+                
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running keyset pagination index migration...")
+    success = migrate_keyset_indexes()
+    
+    if success:
+        print("✅ Migration completed!")
+    else:
+        print("❌ Migration failed. Check the logs above.")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the schedule_anchor_at column to areas_of_interest
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_schedule_anchor():
+    """Add schedule_anchor_at column to areas_of_interest table"""
+    
+    migration_sql = """
+    ALTER TABLE areas_of_interest 
+    ADD COLUMN IF NOT EXISTS schedule_anchor_at TIMESTAMP;
+    """
+    
+    try:
+        with db_manager.get_session() as session:
+            logger.info("Starting schedule_anchor_at migration...")
+            
+            session.execute(text(migration_sql))
+            session.commit()
+            
+            logger.info("✅ Successfully added schedule_anchor_at to areas_of_interest table")
+            return True
+                
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running schedule_anchor_at migration...")
+    success = migrate_schedule_anchor()
+    
+    if success:
+        print("✅ Migration completed! Existing schedules keep their next_run_at; new ones get jittered slots.")
+    else:
+        print("❌ Migration failed. Check the logs above.")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the run_started_at and schedule_failures columns
+to areas_of_interest
+
+A scheduled run keeps its scheduled_task_id while it executes and marks
+run_started_at; the sweeper skips such AOIs until the run finishes (or the
+claim goes stale after SCHEDULE_RUN_TIMEOUT_MINUTES). schedule_failures
+counts consecutive failed runs for the retry backoff.
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_schedule_run_claim():
+    """Add run_started_at and schedule_failures columns to areas_of_interest table"""
+    
+    migration_sql = """
+    ALTER TABLE areas_of_interest 
+    ADD COLUMN IF NOT EXISTS run_started_at TIMESTAMP,
+    ADD COLUMN IF NOT EXISTS schedule_failures INTEGER NOT NULL DEFAULT 0;
+    """
+    
+    try:
+        with db_manager.get_session() as session:
+            logger.info("Starting run_started_at/schedule_failures migration...")
+            
+            session.execute(text(migration_sql))
+            session.commit()
+            
+            logger.info("✅ Successfully added run_started_at and schedule_failures to areas_of_interest table")
+            return True
+                
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running run_started_at/schedule_failures migration...")
+    success = migrate_schedule_run_claim()
+    
+    if success:
+        print("✅ Migration completed! Restart the Celery worker and beat.")
+    else:
+        print("❌ Migration failed. Check the logs above.")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Database migration to add the scheduled_task_id column to areas_of_interest
+"""
+import logging
+from sqlalchemy import text
+from shared_db import db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_scheduled_task_id():
+    """Add scheduled_task_id column to areas_of_interest table"""
+    
+    migration_sql = """
+    ALTER TABLE areas_of_interest 
+    ADD COLUMN IF NOT EXISTS scheduled_task_id VARCHAR(255);
+    """
+    
+    try:
+        with db_manager.get_session() as session:
+            logger.info("Starting scheduled_task_id migration...")
+            
+            session.execute(text(migration_sql))
+            session.commit()
+            
+            logger.info("✅ Successfully added scheduled_task_id to areas_of_interest table")
+            return True
+                
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Running scheduled_task_id migration...")
+    success = migrate_scheduled_task_id()
+    
+    if success:
+        print("✅ Migration completed! Restart the API and Celery worker/beat.")
+    else:
+        print("❌ Migration failed. Check the logs above.")
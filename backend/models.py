@@ -1,14 +1,24 @@
 # models.py - מתוקן
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, JSON, Index, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.orm import sessionmaker, relationship, Session, validates
 from sqlalchemy.sql import func
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 import json
 
+from utils.bbox import bbox_bounds
+
 Base = declarative_base()
 
+def _s3_enabled() -> bool:
+    """Whether images can be served from S3 (the service checks the bucket once, at import)"""
+    try:
+        from services.s3_service import s3_service
+    except ImportError:
+        return False
+    return bool(s3_service and s3_service.enabled)
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -30,6 +40,11 @@ class User(Base):
     user_activity = relationship("UserActivity", back_populates="user", cascade="all, delete-orphan")
     token_transactions = relationship("TokenTransaction", back_populates="user", foreign_keys="[TokenTransaction.user_id]", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Keyset pagination of the admin user list (created_at DESC, id DESC)
+        Index('ix_users_created_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
@@ -58,6 +73,18 @@ class User(Base):
 
 class AreaOfInterest(Base):
     __tablename__ = 'areas_of_interest'
+    __table_args__ = (
+        # Due-AOI lookup for the schedulers (partial: only AOIs with monitoring enabled)
+        Index(
+            'ix_aoi_due', 'is_active', 'baseline_status', 'next_run_at',
+            postgresql_where=text('monitoring_frequency IS NOT NULL'),
+            sqlite_where=text('monitoring_frequency IS NOT NULL')
+        ),
+        # Spatial lookups (see DatabaseManager.find_aois_by_bbox): range on min_lon, the other bounds
+        # checked in the index; the span index gives the widest AOI, which bounds that range from below
+        Index('ix_aoi_bbox', 'min_lon', 'max_lon', 'min_lat', 'max_lat'),
+        Index('ix_aoi_lon_span', text('(max_lon - min_lon)')),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
@@ -65,15 +92,25 @@ class AreaOfInterest(Base):
     description = Column(Text)
     location_name = Column(String(255))
     bbox_coordinates = Column(JSON, nullable=False)
+    # Numeric copy of bbox_coordinates for indexing, kept in sync by _sync_bbox_bounds
+    min_lon = Column(Float, nullable=True)
+    min_lat = Column(Float, nullable=True)
+    max_lon = Column(Float, nullable=True)
+    max_lat = Column(Float, nullable=True)
     classification = Column(String(50), default='CONFIDENTIAL')
     priority = Column(String(20), default='MEDIUM')
     color_code = Column(String(7), default='#3B82F6')
     monitoring_frequency = Column(String(20), default='WEEKLY')
     is_active = Column(Boolean, default=True, index=True)
     next_run_at = Column(DateTime, nullable=True, index=True)  # For scheduled monitoring
+    scheduled_task_id = Column(String(255), nullable=True)  # Celery ETA task currently scheduled for next_run_at
+    run_started_at = Column(DateTime, nullable=True)  # set while that task runs; the sweeper skips claimed AOIs
+    schedule_failures = Column(Integer, default=0, nullable=False)  # consecutive failed scheduled runs (retry backoff)
+    schedule_anchor_at = Column(DateTime, nullable=True)  # User-chosen run time; recurring runs keep its phase
     
     # Add baseline-related fields
     baseline_status = Column(String(20), default='pending')  # pending, processing, completed, failed
+    baseline_started_at = Column(DateTime, nullable=True)  # when the current 'processing' claim was taken
     baseline_date = Column(DateTime, nullable=True)
     baseline_image_filename = Column(String(255), nullable=True)
     
@@ -84,6 +121,11 @@ class AreaOfInterest(Base):
     user = relationship("User", back_populates="areas_of_interest")
     analysis_history = relationship("AnalysisHistory", back_populates="aoi", cascade="all, delete-orphan")
     
+    @validates('bbox_coordinates')
+    def _sync_bbox_bounds(self, key, coordinates):
+        self.min_lon, self.min_lat, self.max_lon, self.max_lat = bbox_bounds(coordinates) or (None,) * 4
+        return coordinates
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
@@ -108,10 +150,18 @@ class AreaOfInterest(Base):
 # תוקן - שימוש בטבלה הקיימת
 class AnalysisHistory(Base):
     __tablename__ = 'analysis_history'
+    __table_args__ = (
+        # Newest-first history per AOI and per user (keyset order: analysis_timestamp DESC, id DESC);
+        # the leading column also serves plain aoi_id / user_id lookups
+        Index('ix_history_aoi_ts', 'aoi_id', 'analysis_timestamp', 'id'),
+        Index('ix_history_user_ts', 'user_id', 'analysis_timestamp', 'id'),
+        # Ids stay unique across the hot and archive tiers: SQLite must not reuse archived rowids
+        {'sqlite_autoincrement': True},
+    )
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
-    aoi_id = Column(Integer, ForeignKey('areas_of_interest.id'), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    aoi_id = Column(Integer, ForeignKey('areas_of_interest.id'), nullable=True)
     process_id = Column(String(50), nullable=False, unique=True)
     operation_name = Column(String(255))
     location_description = Column(Text)
@@ -134,32 +184,58 @@ class AnalysisHistory(Base):
     user = relationship("User", back_populates="analysis_history")
     aoi = relationship("AreaOfInterest", back_populates="analysis_history")
     
+    # Columns needed to render a history entry (no relationship loads, no S3 calls)
+    SUMMARY_COLUMNS = (
+        'id', 'user_id', 'aoi_id', 'process_id', 'operation_name', 'location_description',
+        'bbox_coordinates', 'analysis_timestamp', 'change_percentage',
+        'image1_filename', 'image2_filename', 'heatmap_filename',
+        'image1_s3_key', 'image2_s3_key', 'heatmap_s3_key',
+        'status', 'tokens_used', 'meta'
+    )
+    
+    @staticmethod
+    def image_url(s3_key: Optional[str], filename: Optional[str]) -> Optional[str]:
+        """
+        URL for an analysis image. S3 images go through /api/image/s3/<key>,
+        which signs on request, so listing analyses never calls S3. When S3 is
+        not available the local file API endpoint is used instead.
+        """
+        if s3_key and _s3_enabled():
+            return f"/api/image/s3/{s3_key}"
+        if filename:
+            return f"/api/image/{filename}"
+        return None
+    
     def get_image_url(self, image_type: str) -> str:
         """
-        Get the appropriate image URL (S3 signed URL or local file URL)
+        Get the appropriate image URL (S3 via the signing redirect, or local file URL)
         
         Args:
             image_type: 'image1', 'image2', or 'heatmap'
         """
-        s3_key = getattr(self, f"{image_type}_s3_key", None)
-        filename = getattr(self, f"{image_type}_filename", None)
-        
-        # Prefer S3 if available
-        if s3_key:
-            try:
-                from services.s3_service import s3_service
-                if s3_service and s3_service.enabled:
-                    signed_url = s3_service.generate_signed_url(s3_key)
-                    if signed_url:
-                        return signed_url
-            except ImportError:
-                pass
-        
-        # Fall back to local file API endpoint
-        if filename:
-            return f"/api/image/{filename}"
-        
-        return None
+        return self.image_url(getattr(self, f"{image_type}_s3_key", None),
+                              getattr(self, f"{image_type}_filename", None))
+    
+    @classmethod
+    def summary_query_columns(cls):
+        """Column attributes for a projection query returning SUMMARY_COLUMNS"""
+        return [getattr(cls, name) for name in cls.SUMMARY_COLUMNS]
+    
+    @classmethod
+    def summary_from_row(cls, row, aoi_name: str = None, aoi_location_name: str = None) -> Dict[str, Any]:
+        """to_dict-compatible dict from a projection row (AOI reduced to id/name/location)"""
+        values = {name: getattr(row, name) for name in cls.SUMMARY_COLUMNS}
+        timestamp = values['analysis_timestamp']
+        values['analysis_timestamp'] = timestamp.isoformat() if timestamp else None
+        for image_type in ('image1', 'image2', 'heatmap'):
+            values[f'{image_type}_url'] = cls.image_url(values[f'{image_type}_s3_key'],
+                                                        values[f'{image_type}_filename'])
+        values['aoi'] = {
+            'id': values['aoi_id'],
+            'name': aoi_name,
+            'location_name': aoi_location_name
+        } if values['aoi_id'] else None
+        return values
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -194,6 +270,110 @@ class AnalysisHistory(Base):
             'aoi': self.aoi.to_dict() if self.aoi else None
         }
 
+class AnalysisHistoryArchive(Base):
+    """
+    Cold tier of analysis_history: analyses older than HISTORY_RETENTION_DAYS,
+    moved here by DatabaseManager.archive_analysis_history with their original
+    ids. Same summary columns, no foreign keys, meta compacted.
+    """
+    __tablename__ = 'analysis_history_archive'
+    __table_args__ = (
+        Index('ix_history_archive_aoi_ts', 'aoi_id', 'analysis_timestamp', 'id'),
+        Index('ix_history_archive_user_ts', 'user_id', 'analysis_timestamp', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # analysis_history.id
+    user_id = Column(Integer, nullable=False)
+    aoi_id = Column(Integer, nullable=True)
+    process_id = Column(String(50), nullable=False, unique=True)
+    operation_name = Column(String(255))
+    location_description = Column(Text)
+    bbox_coordinates = Column(JSON)
+    analysis_timestamp = Column(DateTime)
+    image1_filename = Column(String(255))
+    image2_filename = Column(String(255))
+    heatmap_filename = Column(String(255))
+    image1_s3_key = Column(String(512))
+    image2_s3_key = Column(String(512))
+    heatmap_s3_key = Column(String(512))
+    status = Column(String(50))
+    tokens_used = Column(Integer)
+    change_percentage = Column(Float, nullable=True)
+    meta = Column(JSON)  # top-level scalars only (see compact_meta)
+    archived_at = Column(DateTime, default=func.now())
+
+    SUMMARY_COLUMNS = AnalysisHistory.SUMMARY_COLUMNS
+
+    @classmethod
+    def summary_query_columns(cls):
+        """Column attributes for a projection query returning SUMMARY_COLUMNS"""
+        return [getattr(cls, name) for name in cls.SUMMARY_COLUMNS]
+
+    @staticmethod
+    def compact_meta(meta: Optional[Dict]) -> Optional[Dict]:
+        """Drop nested values (stage timings, raw provider payloads) and keep the scalar fields"""
+        if not isinstance(meta, dict):
+            return None
+        return {
+            key: value for key, value in meta.items()
+            if value is None or isinstance(value, (str, int, float, bool))
+        } or None
+
+class AOIStats(Base):
+    """Per-AOI analysis summary, maintained by DatabaseManager.save_analysis in the same transaction"""
+    __tablename__ = 'aoi_stats'
+
+    aoi_id = Column(Integer, ForeignKey('areas_of_interest.id', ondelete='CASCADE'), primary_key=True)
+    total_analyses = Column(Integer, nullable=False, default=0)
+    total_tokens_used = Column(Integer, nullable=False, default=0)
+    last_analysis_id = Column(Integer, nullable=True)
+    last_analysis_at = Column(DateTime, nullable=True)
+    last_change_percentage = Column(Float, nullable=True)  # most recent analysis that measured a change
+    change_samples = Column(Integer, nullable=False, default=0)  # analyses with a change_percentage
+    avg_change_percentage = Column(Float, nullable=True)  # mean over change_samples
+    ewma_change_percentage = Column(Float, nullable=True)  # rolling, recent analyses weigh most (AOI_STATS_EWMA_ALPHA)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'aoi_id': self.aoi_id,
+            'total_analyses': self.total_analyses or 0,
+            'total_tokens_used': self.total_tokens_used or 0,
+            'last_analysis_id': self.last_analysis_id,
+            'last_analysis_at': self.last_analysis_at.isoformat() if self.last_analysis_at else None,
+            'last_change_percentage': self.last_change_percentage,
+            'avg_change_percentage': self.avg_change_percentage,
+            'rolling_change_percentage': self.ewma_change_percentage
+        }
+
+class AOIChangeMetric(Base):
+    """
+    Append-only change-metric series per AOI, one narrow row per analysis,
+    written by DatabaseManager.save_analysis. Trend charts read it through
+    get_aoi_change_metrics instead of loading analysis_history rows and meta.
+    """
+    __tablename__ = 'aoi_change_metrics'
+    __table_args__ = (
+        Index('ix_change_metrics_aoi_ts', 'aoi_id', 'measured_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    aoi_id = Column(Integer, ForeignKey('areas_of_interest.id', ondelete='CASCADE'), nullable=False)
+    analysis_id = Column(Integer, nullable=True, unique=True)  # analysis_history or analysis_history_archive id
+    measured_at = Column(DateTime, nullable=False, default=func.now())
+    overall_change = Column(Float)
+    color_change = Column(Float)
+    structural_change = Column(Float)
+    area_changed = Column(Float)  # percent of usable pixels that changed
+    cloud_coverage = Column(Float)
+    usable_area_percent = Column(Float)
+
+    # Same names as the keys of SatelliteServiceOpenCV.calculate_change_percentage_enhanced
+    METRICS = (
+        'overall_change', 'color_change', 'structural_change',
+        'area_changed', 'cloud_coverage', 'usable_area_percent'
+    )
+
 class UserActivity(Base):
     __tablename__ = 'user_activity'
     
@@ -217,9 +397,13 @@ class UserActivity(Base):
 
 class TokenTransaction(Base):
     __tablename__ = 'token_transactions'
+    __table_args__ = (
+        # Newest-first ledger per user (keyset order: created_at DESC, id DESC)
+        Index('ix_token_tx_user_created', 'user_id', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     transaction_type = Column(String(50), nullable=False)  # 'purchase', 'admin_grant', 'usage', 'refund'
     amount = Column(Integer, nullable=False)  # positive for credits, negative for debits
     balance_before = Column(Integer, nullable=False)
@@ -272,3 +456,47 @@ class TokenTransaction(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+class AnalysisJob(Base):
+    __tablename__ = 'analysis_jobs'
+    
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(36), unique=True, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    aoi_id = Column(Integer, ForeignKey('areas_of_interest.id'), nullable=True, index=True)
+    job_type = Column(String(50), nullable=False)  # 'baseline_comparison', 'time_range', 'manual_comparison'
+    status = Column(String(20), default='queued', nullable=False)  # queued, running, completed, failed
+    stage = Column(String(50), default='queued')  # current pipeline stage
+    stage_timings = Column(JSON)  # {stage_name: milliseconds}
+    params = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    error_code = Column(String(50))
+    analysis_id = Column(Integer, ForeignKey('analysis_history.id'), nullable=True, index=True)
+    tokens_used = Column(Integer, default=0)
+    
+    created_at = Column(DateTime, default=func.now(), index=True)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'user_id': self.user_id,
+            'aoi_id': self.aoi_id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'stage': self.stage,
+            'stage_timings': self.stage_timings or {},
+            'result': self.result,
+            'error': self.error,
+            'error_code': self.error_code,
+            # The column is cleared when the analysis moves to the archive tier; the result keeps the id
+            'analysis_id': self.analysis_id if self.analysis_id is not None else (self.result or {}).get('analysis_id'),
+            'tokens_used': self.tokens_used,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Per-task setup latency: building services for every task (previous behavior)
+versus reusing the worker-resident service graph.
+
+    python scripts/benchmark_task_setup.py --iterations 50
+    python scripts/benchmark_task_setup.py --with-auth   # include the Sentinel Hub token fetch
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shared_db
+from shared_db import get_db_manager
+from services.worker_services import build_satellite_service, get_worker_services
+
+
+def _time_ms(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(f"{label:<28} p50 {statistics.median(samples):9.2f} ms   p95 {p95:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-task service setup latency")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--with-auth', action='store_true', help="Fetch a provider token per task (needs credentials)")
+    args = parser.parse_args()
+
+    shared_db.configure('script')
+    db_manager = get_db_manager()
+
+    def per_task_setup():
+        service = build_satellite_service()
+        if args.with_auth:
+            service.get_access_token()
+
+    def resident_setup():
+        services = get_worker_services(db_manager)
+        services.new_pipeline()
+        if args.with_auth:
+            services.satellite_service._strategy._ensure_token()
+
+    print(f"⏱️  Task setup latency over {args.iterations} tasks")
+    _report("before (per task)", _time_ms(per_task_setup, args.iterations))
+    _report("after (worker-resident)", _time_ms(resident_setup, args.iterations))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,8 +8,8 @@ import os
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import DatabaseManager
-from config import Config
+import shared_db
+from shared_db import get_db_manager
 from models import AreaOfInterest
 
 def clean_aoi_schedule():
@@ -17,7 +17,7 @@ def clean_aoi_schedule():
     print("🧹 Cleaning AOI 14 Schedule")
     print("=" * 50)
     
-    db_manager = DatabaseManager(Config.DATABASE_URL, Config.SQLALCHEMY_ENGINE_OPTIONS)
+    db_manager = get_db_manager()
     
     try:
         with db_manager.get_session() as session:
@@ -51,4 +51,5 @@ def clean_aoi_schedule():
         print(f"❌ Cleanup error: {e}")
 
 if __name__ == '__main__':
+    shared_db.configure('script')
     clean_aoi_schedule()
\ No newline at end of file
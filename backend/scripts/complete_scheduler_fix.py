@@ -40,18 +40,20 @@ def complete_scheduler_fix():
             return
             
         # Schedule a simple test task for immediate execution
-        from tasks import run_scheduled_analysis
+        from tasks import reschedule_aoi
         
         # Try to schedule the task to run in 30 seconds
         test_time = datetime.utcnow() + timedelta(seconds=30)
         
-        # Direct Celery task scheduling
-        task = run_scheduled_analysis.apply_async(
-            args=[13],  # AOI 13 
-            eta=test_time
-        )
+        # Go through reschedule_aoi so the task ID is stored in scheduled_task_id;
+        # a task published directly is dropped by the worker as superseded.
+        # This replaces AOI 13's pending scheduled run.
+        task_id = reschedule_aoi(13, test_time)
+        if not task_id:
+            print("   ❌ Failed to schedule task for AOI 13")
+            return
         
-        print(f"   ✅ Direct task scheduled: {task.id}")
+        print(f"   ✅ Direct task scheduled: {task_id}")
         print(f"   ⏰ ETA: {test_time}")
         
         # Check if task appears in scheduled queue
@@ -60,7 +62,7 @@ def complete_scheduler_fix():
             found_task = False
             for worker, tasks in scheduled.items():
                 for celery_task in tasks:
-                    if celery_task.get('request', {}).get('id') == task.id:
+                    if celery_task.get('request', {}).get('id') == task_id:
                         print(f"   ✅ Task found in queue: {worker}")
                         found_task = True
                         break
@@ -8,12 +8,12 @@ from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import DatabaseManager
-from config import Config
+import shared_db
+from shared_db import get_db_manager
 from models import AreaOfInterest
 
 def restore_original_schedule():
-    db_manager = DatabaseManager(Config.DATABASE_URL, Config.SQLALCHEMY_ENGINE_OPTIONS)
+    db_manager = get_db_manager()
     
     with db_manager.get_session() as session:
         aoi = session.query(AreaOfInterest).filter_by(id=14).first()
@@ -31,4 +31,5 @@ def restore_original_schedule():
             print("❌ AOI 14 not found")
 
 if __name__ == '__main__':
+    shared_db.configure('script')
     restore_original_schedule()
\ No newline at end of file
@@ -4,13 +4,13 @@ import sys
 import os
 import argparse
 from typing import Optional
-from database import DatabaseManager
-from config import Config
+import shared_db
+from shared_db import get_db_manager
 from models import User
 
 class TokenCLI:
     def __init__(self):
-        self.db_manager = DatabaseManager(Config.DATABASE_URL)
+        self.db_manager = get_db_manager()
     
     def find_user(self, identifier: str) -> Optional[dict]:
         """Find user by ID or email"""
@@ -134,10 +134,12 @@ class TokenCLI:
         
         page = 0
         page_size = 10
+        cursors = [None]  # cursor that starts each visited page
         
         while True:
             offset = page * page_size
-            users = self.db_manager.list_all_users(limit=page_size, offset=offset)
+            result = self.db_manager.get_all_users_paginated(per_page=page_size, cursor=cursors[page])
+            users = result['users']
             
             if not users:
                 print("No more users to display")
@@ -152,13 +154,16 @@ class TokenCLI:
                 created_date = user['created_at'][:10] if user['created_at'] else 'N/A'
                 print(f"{user['id']:<5} {user['email'][:29]:<30} {user['tokens_remaining']:<8} {user['total_tokens_used']:<8} {created_date:<12}")
             
-            if len(users) < page_size:
+            next_cursor = result['pagination']['next_cursor']
+            if not next_cursor:
                 print("\n(End of list)")
                 break
             
             action = input(f"\n[n]ext page, [p]revious page, [q]uit: ").lower()
             if action == 'n':
                 page += 1
+                del cursors[page:]
+                cursors.append(next_cursor)
             elif action == 'p' and page > 0:
                 page -= 1
             elif action == 'q':
@@ -252,4 +257,5 @@ def main():
             print(f"❌ User '{identifier}' not found")
 
 if __name__ == '__main__':
+    shared_db.configure('script')
     main()
\ No newline at end of file
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
-from database import DatabaseManager
-from config import Config
+import shared_db
+from shared_db import get_db_manager
 from datetime import datetime, timedelta
 
-db_manager = DatabaseManager(Config.DATABASE_URL)
+shared_db.configure('script')
+db_manager = get_db_manager()
 
 print("🕵️ TRACING TOKEN USAGE FOR USER 1")
 print("=" * 80)
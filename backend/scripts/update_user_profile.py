@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 """Update user profile with missing Clerk data"""
 
-from database import DatabaseManager
-from config import Config
+import shared_db
+from shared_db import get_db_manager
 
-db_manager = DatabaseManager(Config.DATABASE_URL)
+shared_db.configure('script')
+db_manager = get_db_manager()
 
 print("🔧 UPDATING USER PROFILE FROM CLERK")
 print("=" * 50)
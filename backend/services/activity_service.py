@@ -0,0 +1,154 @@
+"""
+Activity Service
+Buffered, batched writer for UserActivity rows.
+
+DatabaseManager hands activity to the sink only after the surrounding
+transaction commits, so request paths no longer pay for the extra INSERT.
+A background thread writes the buffer with one multi-row INSERT when it
+reaches ACTIVITY_BATCH_SIZE rows or every ACTIVITY_FLUSH_SECONDS, whichever
+comes first. The buffer is flushed again at interpreter exit (and by the
+Celery worker shutdown hook); activity from a process that is killed
+outright is lost, which is acceptable for an audit trail of user actions.
+"""
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import insert
+
+from models import UserActivity
+
+logger = logging.getLogger(__name__)
+
+
+class ActivitySink:
+    """Per-process buffer of activity rows, flushed in bulk by a background thread"""
+
+    def __init__(self, engine, batch_size: int = 500, flush_interval: float = 2.0, max_buffer: int = 10000):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._buffer = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._closed = False
+
+        self._stats = {
+            'recorded': 0,
+            'written': 0,
+            'dropped': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'last_flush_ms': None
+        }
+        atexit.register(self.close)
+
+    def record(self, user_id: int, activity_type: str, activity_data: Dict = None,
+               timestamp: Optional[datetime] = None) -> None:
+        """Queue one activity row (never blocks on the database)"""
+        row = {
+            'user_id': user_id,
+            'activity_type': activity_type,
+            'activity_data': activity_data,
+            'timestamp': timestamp or datetime.utcnow()
+        }
+        with self._lock:
+            self._ensure_thread()
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self._stats['dropped'] += 1
+                logger.warning("Activity buffer full, dropping the oldest entry")
+            self._buffer.append(row)
+            self._stats['recorded'] += 1
+            full = len(self._buffer) >= self.batch_size
+
+        if full:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        """Start the flusher on first use in each process (threads do not survive fork)"""
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        if self._pid is not None and self._pid != pid:
+            # Rows buffered by the parent are the parent's to write
+            self._buffer.clear()
+        self._pid = pid
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='activity-sink', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Activity flush failed: {e}")
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._buffer or self._pid != os.getpid():
+                        break
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                written += self._write(batch)
+        return written
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        start = time.perf_counter()
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(insert(UserActivity.__table__), batch)
+            written = len(batch)
+        except Exception as e:
+            # Isolate bad rows (e.g. a user deleted meanwhile) so one cannot sink the batch
+            logger.warning(f"Bulk activity insert of {len(batch)} rows failed, retrying row by row: {e}")
+            self._stats['failed_batches'] += 1
+            written = 0
+            for row in batch:
+                try:
+                    with self.engine.begin() as connection:
+                        connection.execute(insert(UserActivity.__table__), [row])
+                    written += 1
+                except Exception as row_error:
+                    self._stats['dropped'] += 1
+                    logger.error(f"Dropping activity {row['activity_type']} for user {row['user_id']}: {row_error}")
+
+        self._stats['written'] += written
+        self._stats['batches'] += 1
+        self._stats['last_flush_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return written
+
+    def close(self) -> None:
+        """Stop the flusher and write what is left (registered with atexit)"""
+        if self._pid != os.getpid():
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Final activity flush failed: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Buffer depth and write counters for this process"""
+        with self._lock:
+            return dict(self._stats, buffered=len(self._buffer))
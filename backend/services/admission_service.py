@@ -0,0 +1,166 @@
+"""
+Admission Service
+Bounds concurrent synchronous analyses in one API process.
+
+Each request needs a global slot, and a user may hold at most
+ANALYSIS_MAX_PER_USER of them. When all slots are busy, up to
+ANALYSIS_MAX_WAITING requests wait briefly for one. Anything beyond that is
+rejected at once with a Retry-After estimate rather than piling more downloads
+and OpenCV pipelines onto the process.
+"""
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Request refused by the admission controller"""
+
+    def __init__(self, message: str, code: str, retry_after: int):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Global and per-user concurrency limits with a bounded wait queue"""
+
+    def __init__(self, max_concurrent: int = 4, max_per_user: int = 1,
+                 max_waiting: int = 8, wait_timeout: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._per_user: Dict[Any, int] = {}
+        self._avg_duration = None  # seconds, exponentially weighted
+
+        self._stats = {
+            'admitted': 0,
+            'admitted_after_wait': 0,
+            'rejected_user_limit': 0,
+            'rejected_queue_full': 0,
+            'rejected_wait_timeout': 0,
+            'peak_in_flight': 0,
+            'peak_waiting': 0,
+            'total_wait_ms': 0.0
+        }
+
+    @contextmanager
+    def admit(self, user_id: Optional[Any]):
+        """Hold a slot for the duration of the block; raises AdmissionRejected when overloaded"""
+        self._acquire(user_id)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(user_id, time.monotonic() - start)
+
+    def _acquire(self, user_id):
+        with self._condition:
+            if self._per_user.get(user_id, 0) >= self.max_per_user:
+                self._stats['rejected_user_limit'] += 1
+                raise AdmissionRejected(
+                    "You already have an analysis running, please wait for it to finish",
+                    "USER_CONCURRENCY_LIMIT", self._retry_after(0)
+                )
+
+            # Reserve the user's share now so their concurrent requests cannot all queue
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+            if self._in_flight >= self.max_concurrent:
+                if self._waiting >= self.max_waiting:
+                    self._unreserve(user_id)
+                    self._stats['rejected_queue_full'] += 1
+                    raise AdmissionRejected(
+                        "Analysis capacity exhausted, please retry later",
+                        "OVERLOADED", self._retry_after(self._waiting)
+                    )
+
+                self._waiting += 1
+                self._stats['peak_waiting'] = max(self._stats['peak_waiting'], self._waiting)
+                wait_start = time.monotonic()
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self._in_flight < self.max_concurrent, timeout=self.wait_timeout
+                    )
+                finally:
+                    self._waiting -= 1
+                    self._stats['total_wait_ms'] += (time.monotonic() - wait_start) * 1000
+
+                if not admitted:
+                    self._unreserve(user_id)
+                    self._stats['rejected_wait_timeout'] += 1
+                    raise AdmissionRejected(
+                        "Analysis capacity exhausted, please retry later",
+                        "OVERLOADED", self._retry_after(self._waiting)
+                    )
+                self._stats['admitted_after_wait'] += 1
+
+            self._in_flight += 1
+            self._stats['admitted'] += 1
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._in_flight)
+
+    def _release(self, user_id, duration: float):
+        with self._condition:
+            self._in_flight -= 1
+            self._unreserve(user_id)
+            self._avg_duration = duration if self._avg_duration is None else 0.8 * self._avg_duration + 0.2 * duration
+            self._condition.notify()
+
+    def _unreserve(self, user_id):
+        remaining = self._per_user.get(user_id, 0) - 1
+        if remaining > 0:
+            self._per_user[user_id] = remaining
+        else:
+            self._per_user.pop(user_id, None)
+
+    def _retry_after(self, queued: int) -> int:
+        """Seconds until a slot is likely to free up for a request behind `queued` others"""
+        avg = self._avg_duration if self._avg_duration is not None else 30.0
+        rounds = math.ceil((queued + 1) / max(1, self.max_concurrent))
+        return max(1, min(300, math.ceil(avg * rounds)))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Limits, current load and admission outcome counters"""
+        with self._condition:
+            stats = dict(self._stats)
+            waited = stats['admitted_after_wait'] + stats['rejected_wait_timeout']
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_per_user': self.max_per_user,
+                'max_waiting': self.max_waiting,
+                'wait_timeout_seconds': self.wait_timeout,
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'active_users': len(self._per_user),
+                'admitted': stats['admitted'],
+                'admitted_after_wait': stats['admitted_after_wait'],
+                'rejected_user_limit': stats['rejected_user_limit'],
+                'rejected_queue_full': stats['rejected_queue_full'],
+                'rejected_wait_timeout': stats['rejected_wait_timeout'],
+                'peak_in_flight': stats['peak_in_flight'],
+                'peak_waiting': stats['peak_waiting'],
+                'avg_wait_ms': round(stats['total_wait_ms'] / waited, 1) if waited else None,
+                'avg_duration_ms': round(self._avg_duration * 1000, 1) if self._avg_duration is not None else None
+            }
+
+
+# Global admission controller for synchronous analysis endpoints
+admission_controller = AdmissionController(
+    max_concurrent=Config.ANALYSIS_MAX_CONCURRENT,
+    max_per_user=Config.ANALYSIS_MAX_PER_USER,
+    max_waiting=Config.ANALYSIS_MAX_WAITING,
+    wait_timeout=Config.ANALYSIS_ADMISSION_WAIT_SECONDS
+)
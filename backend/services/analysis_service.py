@@ -0,0 +1,248 @@
+"""
+Analysis Service
+Runs the download -> save -> heatmap -> change detection pipeline.
+
+Shared by the synchronous analysis endpoints and the Celery job worker so
+both paths produce identical analysis records.
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisError(Exception):
+    """Pipeline failure that maps onto an API error response"""
+
+    def __init__(self, message: str, code: str = "ANALYSIS_ERROR", status_code: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.status_code = status_code
+
+
+class AnalysisPipeline:
+    """
+    Executes a single analysis and records per-stage timings.
+
+    Every run_* method returns a dict with:
+        record: keyword arguments for DatabaseManager.save_analysis
+        images: URLs returned to the client
+        change_percentage: overall change
+    """
+
+    def __init__(self, satellite_service, on_stage: Optional[Callable[[str, Dict[str, float]], None]] = None):
+        self.satellite_service = satellite_service
+        self.on_stage = on_stage
+        self.stage_timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage (milliseconds) and notify the stage callback"""
+        if self.on_stage:
+            try:
+                self.on_stage(name, dict(self.stage_timings))
+            except Exception as e:
+                logger.warning(f"Stage callback failed for '{name}': {e}")
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def measure_change(self, image1, image2) -> Tuple[float, Dict[str, float]]:
+        """Overall change plus the per-component metrics when the satellite service computes them"""
+        enhanced = getattr(self.satellite_service, 'calculate_change_percentage_enhanced', None)
+        if enhanced is None:
+            change_percentage = self.satellite_service.calculate_change_percentage(image1, image2)
+            return change_percentage, {'overall_change': change_percentage}
+
+        change_metrics = enhanced(image1, image2)
+        return change_metrics['overall_change'], change_metrics
+
+    def run_baseline_comparison(self, aoi: Dict[str, Any], process_id: str, dates: Dict[str, str]) -> Dict[str, Any]:
+        """Compare the current image of an AOI against its stored baseline"""
+        with self.stage('download'):
+            current_image = self.satellite_service.download_image(
+                bbox=aoi['bbox_coordinates'],
+                date_from=dates['current_from'],
+                date_to=dates['current_to']
+            )
+            if not current_image:
+                raise AnalysisError("Failed to download current image", "DOWNLOAD_ERROR")
+
+            baseline_image = self.satellite_service.load_baseline_image(aoi['baseline_image_filename'])
+            if not baseline_image:
+                raise AnalysisError("Baseline image not found", "BASELINE_ERROR")
+
+        current_filename = f"aoi_{aoi['id']}_current_{process_id}.jpg"
+        heatmap_filename = f"aoi_{aoi['id']}_heatmap_{process_id}.png"
+
+        with self.stage('save_images'):
+            current_result = self.satellite_service.save_image(current_image, current_filename, aoi['id'])
+
+        with self.stage('heatmap'):
+            heatmap_path = os.path.join(Config.IMAGES_DIR, heatmap_filename)
+            heatmap_result = self.satellite_service.create_heatmap(baseline_image, current_image, heatmap_path, aoi['id'])
+
+        with self.stage('change_detection'):
+            change_percentage, change_metrics = self.measure_change(baseline_image, current_image)
+
+        return {
+            'change_percentage': change_percentage,
+            'record': {
+                'operation_name': "BASELINE COMPARISON",
+                'location_description': f"{aoi['name']} - {aoi['location_name']}",
+                'bbox_coordinates': aoi['bbox_coordinates'],
+                'image_filenames': {
+                    'image1': aoi['baseline_image_filename'],  # baseline
+                    'image2': current_filename,                # current
+                    'heatmap': heatmap_filename
+                },
+                's3_keys': {
+                    'image1': None,  # baseline images not yet migrated to S3
+                    'image2': _s3_key(current_result),
+                    'heatmap': _s3_key(heatmap_result)
+                },
+                'meta': {
+                    'analysis_date': datetime.now().isoformat(),
+                    'comparison_type': 'baseline_vs_current',
+                    'analysis_type': 'manual_trigger'
+                },
+                'change_percentage': change_percentage,
+                'change_metrics': change_metrics
+            },
+            'images': {
+                'baseline_url': f"/api/image/{aoi['baseline_image_filename']}",
+                'current_url': f'/api/image/{current_filename}',
+                'heatmap_url': f'/api/image/{heatmap_filename}'
+            }
+        }
+
+    def run_time_range(self, aoi: Dict[str, Any], process_id: str, dates: Dict[str, str]) -> Dict[str, Any]:
+        """Compare two time ranges over an AOI"""
+        with self.stage('download'):
+            image1 = self.satellite_service.download_image(aoi['bbox_coordinates'], dates['date1_from'], dates['date1_to'])
+            image2 = self.satellite_service.download_image(aoi['bbox_coordinates'], dates['date2_from'], dates['date2_to'])
+            if not image1 or not image2:
+                raise AnalysisError("Failed to download one or both images", "DOWNLOAD_ERROR")
+
+        image1_filename = f"aoi_{aoi['id']}_period1_{process_id}.jpg"
+        image2_filename = f"aoi_{aoi['id']}_period2_{process_id}.jpg"
+        heatmap_filename = f"aoi_{aoi['id']}_comparison_{process_id}.png"
+
+        with self.stage('save_images'):
+            image1_result = self.satellite_service.save_image(image1, image1_filename, aoi['id'])
+            image2_result = self.satellite_service.save_image(image2, image2_filename, aoi['id'])
+
+        with self.stage('heatmap'):
+            heatmap_path = os.path.join(Config.IMAGES_DIR, heatmap_filename)
+            heatmap_result = self.satellite_service.create_heatmap(image1, image2, heatmap_path, aoi['id'])
+
+        with self.stage('change_detection'):
+            change_percentage, change_metrics = self.measure_change(image1, image2)
+
+        return {
+            'change_percentage': change_percentage,
+            'record': {
+                'operation_name': "TIME RANGE COMPARISON",
+                'location_description': f"{aoi['name']} - {aoi['location_name']}",
+                'bbox_coordinates': aoi['bbox_coordinates'],
+                'image_filenames': {
+                    'image1': image1_filename,
+                    'image2': image2_filename,
+                    'heatmap': heatmap_filename
+                },
+                's3_keys': {
+                    'image1': _s3_key(image1_result),
+                    'image2': _s3_key(image2_result),
+                    'heatmap': _s3_key(heatmap_result)
+                },
+                'meta': {
+                    'analysis_date': datetime.now().isoformat(),
+                    'comparison_type': 'time_range',
+                    'period1': f"{dates['date1_from']} to {dates['date1_to']}",
+                    'period2': f"{dates['date2_from']} to {dates['date2_to']}",
+                    'analysis_type': 'manual_trigger'
+                },
+                'change_percentage': change_percentage,
+                'change_metrics': change_metrics
+            },
+            'images': {
+                'baseline_url': f'/api/image/{image1_filename}',
+                'current_url': f'/api/image/{image2_filename}',
+                'heatmap_url': f'/api/image/{heatmap_filename}'
+            }
+        }
+
+    def run_manual_comparison(self, user_id: int, bbox: list, location_description: str,
+                              process_id: str, dates: Dict[str, str]) -> Dict[str, Any]:
+        """Compare two time ranges over an arbitrary bbox (not tied to an AOI)"""
+        with self.stage('download'):
+            image1 = self.satellite_service.download_image(bbox, dates['date1_from'], dates['date1_to'])
+            if not image1:
+                raise AnalysisError("Failed to download first image", "DOWNLOAD_ERROR")
+
+            image2 = self.satellite_service.download_image(bbox, dates['date2_from'], dates['date2_to'])
+            if not image2:
+                raise AnalysisError("Failed to download second image", "DOWNLOAD_ERROR")
+
+        image1_filename = f"manual_{user_id}_image1_{process_id}.jpg"
+        image2_filename = f"manual_{user_id}_image2_{process_id}.jpg"
+        heatmap_filename = f"manual_{user_id}_heatmap_{process_id}.png"
+
+        with self.stage('save_images'):
+            image1_result = self.satellite_service.save_image(image1, image1_filename)
+            image2_result = self.satellite_service.save_image(image2, image2_filename)
+
+        with self.stage('heatmap'):
+            heatmap_path = os.path.join(Config.IMAGES_DIR, heatmap_filename)
+            heatmap_result = self.satellite_service.create_heatmap(image1, image2, heatmap_path)
+
+        with self.stage('change_detection'):
+            change_percentage, change_metrics = self.measure_change(image1, image2)
+
+        return {
+            'change_percentage': change_percentage,
+            'record': {
+                'operation_name': "MANUAL COMPARISON",
+                'location_description': location_description,
+                'bbox_coordinates': bbox,
+                'image_filenames': {
+                    'image1': image1_filename,
+                    'image2': image2_filename,
+                    'heatmap': heatmap_filename
+                },
+                's3_keys': {
+                    'image1': _s3_key(image1_result),
+                    'image2': _s3_key(image2_result),
+                    'heatmap': _s3_key(heatmap_result)
+                },
+                'meta': {
+                    'date1_from': dates['date1_from'],
+                    'date1_to': dates['date1_to'],
+                    'date2_from': dates['date2_from'],
+                    'date2_to': dates['date2_to'],
+                    'processing_time': datetime.now().isoformat()
+                },
+                'change_percentage': change_percentage,
+                'change_metrics': change_metrics
+            },
+            'images': {
+                'baseline_url': f'/api/image/{image1_filename}',
+                'current_url': f'/api/image/{image2_filename}',
+                'heatmap_url': f'/api/image/{heatmap_filename}'
+            }
+        }
+
+
+def _s3_key(save_result) -> Optional[str]:
+    """Extract the S3 key from a save_image/create_heatmap result"""
+    return save_result.get('s3_key') if isinstance(save_result, dict) else None
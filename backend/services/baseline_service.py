@@ -1,34 +1,241 @@
 """
 Baseline Service
 Handles baseline image creation and management
+
+Baselines are created by a bounded queue drained by a fixed pool of worker
+threads. The AOI row is the durable record of the work: queued AOIs are
+'pending' and in-flight AOIs are 'processing'. A worker claims the row
+('pending' -> 'processing') before building the baseline, so several
+processes draining the same rows never build one twice. On start and on
+every sweep, 'processing' claims older than BASELINE_STALE_MINUTES (left by a
+crash) are reset, and 'pending' rows that are not queued yet are picked up.
 """
+import queue
 import threading
+import time
 import logging
-from database import DatabaseManager
+from datetime import datetime, timedelta
+from typing import Dict, Any
+
+from shared_db import db_manager
 from config import Config
 
 logger = logging.getLogger(__name__)
 
-# Initialize database manager
-db_manager = DatabaseManager(Config.DATABASE_URL, Config.SQLALCHEMY_ENGINE_OPTIONS)
 
+class BaselineQueue:
+    """Bounded, deduplicated baseline creation queue with a fixed worker pool"""
 
-def create_baseline_async(aoi_id: int):
-    """Create baseline image asynchronously"""
-    threading.Thread(
-        target=lambda: _create_baseline_image(aoi_id),
-        daemon=True
-    ).start()
+    def __init__(self, db_manager, workers: int = 2, max_queue: int = 100, rescan_seconds: int = 60):
+        self.db_manager = db_manager
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rescan_seconds = rescan_seconds
 
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._tracked = set()  # AOI IDs queued or in flight
+        self._in_flight = 0
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._started = False
 
-def _create_baseline_image(aoi_id: int):
-    """Create baseline image for AOI"""
-    try:
-        # Import here to avoid circular imports
+        self._stats = {
+            'submitted': 0,
+            'duplicates': 0,
+            'deferred': 0,
+            'recovered': 0,
+            'skipped': 0,
+            'completed': 0,
+            'failed': 0,
+            'total_duration_ms': 0.0,
+            'last_failed': None
+        }
+
+    def start(self):
+        """Recover unfinished work and start the worker pool (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._stop_event.clear()
+
+        self._reset_stale()
+
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'baseline-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        sweeper = threading.Thread(target=self._sweeper_loop, name='baseline-sweeper', daemon=True)
+        sweeper.start()
+        self._threads.append(sweeper)
+
+        self._enqueue_pending(recovered=True)
+        logger.info(f"Baseline queue started: {self.workers} workers, capacity {self.max_queue}")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop accepting work; rows still pending are resumed on next start"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        with self._lock:
+            self._started = False
+
+    def submit(self, aoi_id: int) -> str:
+        """
+        Queue baseline creation for an AOI.
+
+        Returns 'queued', 'duplicate' (already queued or running) or 'deferred'
+        (queue full - the row stays 'pending' and the sweeper picks it up later).
+        """
+        if not self._started:
+            self.start()
+
+        with self._lock:
+            if aoi_id in self._tracked:
+                self._stats['duplicates'] += 1
+                return 'duplicate'
+
+        self.db_manager.mark_baseline_pending(aoi_id)
+        status = self._enqueue(aoi_id)
+        with self._lock:
+            if status == 'queued':
+                self._stats['submitted'] += 1
+            elif status == 'deferred':
+                self._stats['deferred'] += 1
+        return status
+
+    def _enqueue(self, aoi_id: int) -> str:
+        with self._lock:
+            if aoi_id in self._tracked:
+                return 'duplicate'
+            try:
+                self._queue.put_nowait(aoi_id)
+            except queue.Full:
+                return 'deferred'
+            self._tracked.add(aoi_id)
+            return 'queued'
+
+    def _enqueue_pending(self, recovered: bool = False):
+        """Queue 'pending' AOIs that are not tracked yet, up to free capacity"""
+        free = self.max_queue - self._queue.qsize()
+        if free <= 0:
+            return
+
+        with self._lock:
+            tracked = set(self._tracked)
+
+        try:
+            aoi_ids = self.db_manager.get_pending_baseline_aoi_ids(limit=free, exclude_ids=tracked)
+        except Exception as e:
+            logger.error(f"Failed to load pending baselines: {e}")
+            return
+
+        queued = sum(1 for aoi_id in aoi_ids if self._enqueue(aoi_id) == 'queued')
+        if queued:
+            with self._lock:
+                self._stats['recovered' if recovered else 'submitted'] += queued
+            logger.info(f"Queued {queued} pending baselines{' from a previous run' if recovered else ''}")
+
+    def _reset_stale(self):
+        """Return 'processing' claims older than BASELINE_STALE_MINUTES to 'pending'"""
+        cutoff = datetime.utcnow() - timedelta(minutes=Config.BASELINE_STALE_MINUTES)
+        try:
+            reset = self.db_manager.reset_stale_baselines(cutoff)
+            if reset:
+                logger.info(f"Reset {reset} baselines left in 'processing' by a crashed process")
+        except Exception as e:
+            logger.error(f"Failed to reset stale baselines: {e}")
+
+    def _sweeper_loop(self):
+        while not self._stop_event.wait(self.rescan_seconds):
+            self._reset_stale()
+            self._enqueue_pending()
+
+    def _worker_loop(self):
+        # One long-lived satellite client per worker instead of one per baseline
         from services.satellite_service import SatelliteService
-        
         satellite_processor = SatelliteService(Config.CLIENT_ID, Config.CLIENT_SECRET)
+
+        while not self._stop_event.is_set():
+            try:
+                aoi_id = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            with self._lock:
+                self._in_flight += 1
+            start = time.perf_counter()
+            try:
+                created = _create_baseline_image(aoi_id, satellite_processor)
+            except Exception as e:
+                logger.error(f"Baseline worker error for AOI {aoi_id}: {e}")
+                created = False
+
+            duration_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                self._tracked.discard(aoi_id)
+                if created is None:
+                    # Another process claimed the row first
+                    self._stats['skipped'] += 1
+                elif created:
+                    self._stats['total_duration_ms'] += duration_ms
+                    self._stats['completed'] += 1
+                else:
+                    self._stats['total_duration_ms'] += duration_ms
+                    self._stats['failed'] += 1
+                    self._stats['last_failed'] = f"AOI {aoi_id}"
+            self._queue.task_done()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, in-flight work and outcome counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            finished = stats['completed'] + stats['failed']
+            return {
+                'running': self._started,
+                'workers': self.workers,
+                'capacity': self.max_queue,
+                'queue_depth': self._queue.qsize(),
+                'in_flight': self._in_flight,
+                'submitted': stats['submitted'],
+                'duplicates': stats['duplicates'],
+                'deferred': stats['deferred'],
+                'recovered': stats['recovered'],
+                'skipped': stats['skipped'],
+                'completed': stats['completed'],
+                'failed': stats['failed'],
+                'avg_duration_ms': round(stats['total_duration_ms'] / finished, 1) if finished else None,
+                'last_failed': stats['last_failed']
+            }
+
+
+# Global baseline queue instance
+baseline_queue = BaselineQueue(
+    db_manager,
+    workers=Config.BASELINE_WORKERS,
+    max_queue=Config.BASELINE_QUEUE_SIZE,
+    rescan_seconds=Config.BASELINE_RESCAN_SECONDS
+)
+
+
+def create_baseline_async(aoi_id: int) -> str:
+    """Queue baseline image creation (see BaselineQueue.submit for return values)"""
+    return baseline_queue.submit(aoi_id)
+
+
+def _create_baseline_image(aoi_id: int, satellite_processor=None):
+    """Create baseline image for AOI (None if the row was not pending, e.g. claimed by another process)"""
+    try:
+        if satellite_processor is None:
+            # Import here to avoid circular imports
+            from services.satellite_service import SatelliteService
+            satellite_processor = SatelliteService(Config.CLIENT_ID, Config.CLIENT_SECRET)
+
         return db_manager.create_baseline_image(aoi_id, satellite_processor)
     except Exception as e:
         logger.error(f"Error creating baseline image for AOI {aoi_id}: {e}")
-        return False
\ No newline at end of file
+        return False
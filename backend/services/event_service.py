@@ -0,0 +1,131 @@
+"""
+Event Service
+Per-user event fan-out (baseline status transitions, analysis completion)
+over Redis pub/sub, consumed by the Server-Sent Events stream.
+
+When Redis is unreachable the broker falls back to in-process queues, which
+only reach subscribers connected to the same process.
+"""
+import json
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """Publish/subscribe broker keyed by user ID"""
+
+    CHANNEL_PREFIX = 'vantage:events:user:'
+
+    def __init__(self, redis_url: Optional[str]):
+        self.redis_url = redis_url
+        self._redis = None
+        self._redis_checked = False
+        self._lock = threading.Lock()
+        self._local_subscribers: Dict[int, set] = {}
+
+    def _channel(self, user_id: int) -> str:
+        return f"{self.CHANNEL_PREFIX}{user_id}"
+
+    def _get_redis(self):
+        """Connect to Redis once; fall back to in-process delivery if unavailable"""
+        if self._redis_checked:
+            return self._redis
+
+        with self._lock:
+            if not self._redis_checked:
+                try:
+                    import redis
+                    client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=2)
+                    client.ping()
+                    self._redis = client
+                    logger.info("Event broker using Redis pub/sub")
+                except Exception as e:
+                    self._redis = None
+                    logger.warning(f"Redis unavailable for events, using in-process delivery: {e}")
+                self._redis_checked = True
+
+        return self._redis
+
+    def publish(self, user_id: int, event_type: str, data: Dict[str, Any]) -> None:
+        """Publish an event to every stream the user has open (never raises)"""
+        event = {
+            'type': event_type,
+            'data': data,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+        try:
+            client = self._get_redis()
+            if client is not None:
+                client.publish(self._channel(user_id), json.dumps(event, default=str))
+                return
+        except Exception as e:
+            logger.warning(f"Failed to publish {event_type} for user {user_id}: {e}")
+
+        with self._lock:
+            subscribers = list(self._local_subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                logger.warning(f"Dropping {event_type} for slow subscriber of user {user_id}")
+
+    def subscribe(self, user_id: int, heartbeat_seconds: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield events for a user as they arrive.
+        Yields None every heartbeat_seconds without traffic so callers can send keep-alives.
+        """
+        client = self._get_redis()
+        if client is not None:
+            yield from self._subscribe_redis(client, user_id, heartbeat_seconds)
+        else:
+            yield from self._subscribe_local(user_id, heartbeat_seconds)
+
+    def _subscribe_redis(self, client, user_id: int, heartbeat_seconds: float):
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel(user_id))
+        try:
+            while True:
+                message = pubsub.get_message(timeout=heartbeat_seconds)
+                if not message:
+                    yield None
+                    continue
+
+                try:
+                    yield json.loads(message['data'])
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"Malformed event on {self._channel(user_id)}: {e}")
+        finally:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+    def _subscribe_local(self, user_id: int, heartbeat_seconds: float):
+        subscriber = queue.Queue(maxsize=100)
+        with self._lock:
+            self._local_subscribers.setdefault(user_id, set()).add(subscriber)
+        try:
+            while True:
+                try:
+                    yield subscriber.get(timeout=heartbeat_seconds)
+                except queue.Empty:
+                    yield None
+        finally:
+            with self._lock:
+                subscribers = self._local_subscribers.get(user_id)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._local_subscribers[user_id]
+
+
+# Global event broker instance
+event_broker = EventBroker(Config.REDIS_URL)
@@ -0,0 +1,215 @@
+"""
+JWT Verifier
+RS256 verification of Clerk session tokens against the instance's JWKS.
+
+Signing keys are fetched once, cached by `kid` and refreshed in the
+background every JWKS_REFRESH_SECONDS. A token signed with an unknown `kid`
+triggers an immediate (rate-limited) refresh, so key rotation needs no
+restart. Verified claims are kept in a small LRU until the token's `exp`,
+so repeated requests carrying the same bearer token skip the RSA check.
+
+For tests and offline development the JWKS can come from a local file
+(CLERK_JWKS_FILE) or be passed in directly.
+"""
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+
+def jwks_url_from_publishable_key(publishable_key: Optional[str]) -> Optional[str]:
+    """JWKS URL of the Clerk instance a publishable key (pk_test_/pk_live_<base64 domain$>) belongs to"""
+    if not publishable_key or publishable_key.count('_') < 2:
+        return None
+    encoded = publishable_key.split('_', 2)[2]
+    try:
+        domain = base64.b64decode(encoded + '=' * (-len(encoded) % 4)).decode().rstrip('$')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return f"https://{domain}/.well-known/jwks.json" if domain else None
+
+
+class JWKSKeyStore:
+    """Signing keys by kid, loaded from a JWKS source and refreshed in the background"""
+
+    def __init__(self, fetch: Callable[[], Dict[str, Any]], refresh_interval: float = 3600.0,
+                 min_refresh_interval: float = 30.0):
+        self._fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._lock = threading.Lock()
+        self._last_refresh = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self.refresh_count = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'JWKSKeyStore':
+        import requests
+
+        def fetch():
+            response = requests.get(url, timeout=5)
+            response.raise_for_status()
+            return response.json()
+        return cls(fetch, **kwargs)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'JWKSKeyStore':
+        def fetch():
+            with open(path) as f:
+                return json.load(f)
+        return cls(fetch, **kwargs)
+
+    @classmethod
+    def from_jwks(cls, jwks: Dict[str, Any], **kwargs) -> 'JWKSKeyStore':
+        return cls(lambda: jwks, **kwargs)
+
+    def refresh(self) -> bool:
+        """Reload the key set; on failure the previous keys stay in use"""
+        try:
+            jwks = self._fetch()
+            keys = {}
+            for jwk in jwks.get('keys', []):
+                if jwk.get('use', 'sig') != 'sig' or not jwk.get('kid'):
+                    continue
+                try:
+                    keys[jwk['kid']] = jwt.PyJWK(jwk)
+                except jwt.PyJWKError as e:
+                    logger.warning(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+        except Exception as e:
+            logger.error(f"JWKS refresh failed: {e}")
+            with self._lock:
+                self._last_refresh = time.monotonic()
+            return False
+
+        with self._lock:
+            self._keys = keys
+            self._last_refresh = time.monotonic()
+            self.refresh_count += 1
+        logger.info(f"Loaded {len(keys)} JWKS signing keys")
+        return True
+
+    def get_key(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        """Key for kid, refreshing once if it is unknown (key rotation)"""
+        self._ensure_refresher()
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        with self._lock:
+            recently = (self._last_refresh is not None and
+                        time.monotonic() - self._last_refresh < self.min_refresh_interval)
+        if not recently:
+            self.refresh()
+        return self._keys.get(kid)
+
+    def _ensure_refresher(self):
+        """Initial load plus a background refresh thread per process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        self.refresh()
+        if self.refresh_interval > 0:
+            self._thread = threading.Thread(target=self._run, name='jwks-refresh', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.refresh_interval)
+            self.refresh()
+
+
+class TokenVerifier:
+    """Verifies RS256 session tokens and caches the verified claims until exp"""
+
+    def __init__(self, key_store: Optional[JWKSKeyStore], issuer: Optional[str] = None,
+                 authorized_parties: Optional[List[str]] = None, leeway: float = 5.0,
+                 cache_size: int = 1024, skip_signature: bool = False):
+        self.key_store = key_store
+        self.issuer = issuer
+        self.authorized_parties = authorized_parties or []
+        self.leeway = leeway
+        self.cache_size = cache_size
+        self.skip_signature = skip_signature
+
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # token hash -> (exp, claims)
+        self._lock = threading.Lock()
+        self._stats = {'cache_hits': 0, 'verified': 0, 'rejected': 0}
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid token; raises jwt.InvalidTokenError (or a subclass) otherwise"""
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        now = time.time()
+
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None:
+                exp, claims = entry
+                if exp > now:
+                    self._cache.move_to_end(cache_key)
+                    self._stats['cache_hits'] += 1
+                    return dict(claims)
+                del self._cache[cache_key]
+
+        try:
+            claims = self._decode(token)
+        except jwt.InvalidTokenError:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise
+
+        with self._lock:
+            self._stats['verified'] += 1
+            self._cache[cache_key] = (claims['exp'], claims)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(claims)
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        options = {'require': ['exp', 'sub']}
+
+        if self.skip_signature:
+            options['verify_signature'] = False
+            return jwt.decode(token, options=options, algorithms=['RS256'], leeway=self.leeway)
+
+        if self.key_store is None:
+            raise jwt.InvalidTokenError("No JWKS configured for token verification")
+
+        kid = jwt.get_unverified_header(token).get('kid')
+        key = self.key_store.get_key(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+
+        claims = jwt.decode(
+            token,
+            key.key,
+            algorithms=['RS256'],
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options=options
+        )
+
+        azp = claims.get('azp')
+        if self.authorized_parties and azp and azp not in self.authorized_parties:
+            raise jwt.InvalidTokenError(f"Unexpected authorized party: {azp}")
+        return claims
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, cached_tokens=len(self._cache),
+                        jwks_refreshes=self.key_store.refresh_count if self.key_store else 0)
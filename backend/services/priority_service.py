@@ -0,0 +1,105 @@
+"""
+Priority Service
+Maps AOI priority (HIGH/MEDIUM/LOW) onto dispatch order and Celery message
+priority.
+
+Priorities age: for every PRIORITY_AGING_MINUTES a run is overdue it is
+promoted one level, so LOW and MEDIUM work cannot starve behind a steady
+stream of HIGH work.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from config import Config
+
+PRIORITY_RANKS = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
+
+# Redis transport orders 0 as the highest priority (priority_steps in celery_app)
+CELERY_PRIORITIES = {0: 0, 1: 3, 2: 6}
+
+
+def normalize_priority(priority: Optional[str]) -> str:
+    """Return HIGH, MEDIUM or LOW (unknown values count as MEDIUM)"""
+    value = (priority or '').upper()
+    return value if value in PRIORITY_RANKS else 'MEDIUM'
+
+
+def effective_rank(priority: Optional[str], scheduled_for: Optional[datetime] = None,
+                   now: Optional[datetime] = None) -> int:
+    """Priority rank (0 = highest) after promotion for time spent overdue"""
+    rank = PRIORITY_RANKS[normalize_priority(priority)]
+
+    aging_minutes = Config.PRIORITY_AGING_MINUTES
+    if scheduled_for is not None and aging_minutes > 0:
+        overdue_minutes = ((now or datetime.utcnow()) - scheduled_for).total_seconds() / 60
+        if overdue_minutes > 0:
+            rank -= int(overdue_minutes // aging_minutes)
+
+    return max(0, rank)
+
+
+def celery_priority(priority: Optional[str], scheduled_for: Optional[datetime] = None,
+                    now: Optional[datetime] = None) -> int:
+    """Celery message priority for a scheduled run"""
+    return CELERY_PRIORITIES[effective_rank(priority, scheduled_for, now)]
+
+
+def sort_for_dispatch(items: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Order due AOIs by effective priority, then by how long they have waited"""
+    now = now or datetime.utcnow()
+    return sorted(items, key=lambda item: (
+        effective_rank(item.get('priority'), item.get('next_run_at'), now),
+        item.get('next_run_at') or now
+    ))
+
+
+def slo_target_seconds(priority: Optional[str]) -> int:
+    """Maximum acceptable delay between a scheduled time and the run starting"""
+    return Config.SCHEDULE_SLO_SECONDS[normalize_priority(priority)]
+
+
+def promoted_since(priority: Optional[str], scheduled_for: Optional[datetime], window_seconds: float,
+                   now: Optional[datetime] = None) -> bool:
+    """True if the run was promoted by aging within the last window_seconds"""
+    if scheduled_for is None:
+        return False
+    now = now or datetime.utcnow()
+    earlier = now - timedelta(seconds=window_seconds)
+    return effective_rank(priority, scheduled_for, now) < effective_rank(priority, scheduled_for, earlier)
+
+
+def schedule_meta(priority: Optional[str], scheduled_for: Optional[datetime],
+                  started_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Analysis meta fields used for per-priority schedule latency metrics"""
+    started_at = started_at or datetime.utcnow()
+    return {
+        'priority': normalize_priority(priority),
+        'scheduled_for': scheduled_for.isoformat() if scheduled_for else None,
+        'schedule_latency_seconds': round(max(0.0, (started_at - scheduled_for).total_seconds()), 1)
+        if scheduled_for else None
+    }
+
+
+def summarize_latencies(latencies_by_priority: Dict[str, List[float]]) -> Dict[str, Any]:
+    """Per-priority latency percentiles and SLO attainment"""
+    summary = {}
+    for priority in PRIORITY_RANKS:
+        samples = sorted(latencies_by_priority.get(priority, []))
+        target = slo_target_seconds(priority)
+        if not samples:
+            summary[priority] = {'count': 0, 'slo_target_seconds': target}
+            continue
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 1)
+
+        within = sum(1 for sample in samples if sample <= target)
+        summary[priority] = {
+            'count': len(samples),
+            'p50_seconds': percentile(0.50),
+            'p95_seconds': percentile(0.95),
+            'max_seconds': round(samples[-1], 1),
+            'slo_target_seconds': target,
+            'slo_attainment_percent': round(within / len(samples) * 100, 1)
+        }
+    return summary
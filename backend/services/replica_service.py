@@ -0,0 +1,149 @@
+"""
+Replica Service
+Read-only sessions against PostgreSQL read replicas.
+
+DatabaseManager sends its read-only methods (dashboards, history, admin
+listings and stats, profile lookups) to a ReplicaPool when
+DATABASE_REPLICA_URLS is set. Replicas are used round-robin. Each is health
+checked at most every DB_REPLICA_HEALTH_SECONDS, and a replica that cannot be
+reached or lags by more than DB_REPLICA_MAX_LAG_SECONDS is skipped until its
+next check. With no healthy replica, reads go to the primary.
+
+Read-your-writes: once a transaction that wrote commits, reads in the same
+context (request thread, task) are pinned to the primary until
+reset_read_pin() is called at the start of the next request.
+"""
+import time
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+_reads_pinned: ContextVar[bool] = ContextVar('reads_pinned', default=False)
+
+
+def pin_reads() -> None:
+    """Send this context's reads to the primary (it has just written)"""
+    _reads_pinned.set(True)
+
+
+def reads_pinned() -> bool:
+    return _reads_pinned.get()
+
+
+def reset_read_pin() -> None:
+    """Start of a request: nothing written yet"""
+    _reads_pinned.set(False)
+
+
+class Replica:
+    """One replica engine plus its last health check"""
+
+    def __init__(self, name: str, url: str, engine_options: Dict):
+        self.name = name
+        self.engine = create_engine(url, **(engine_options or {}))
+        self.SessionLocal = sessionmaker(bind=self.engine)
+        self.healthy = True
+        self.checked_at = None
+        self.lag_seconds = None
+        self.last_error = None
+        self.reads = 0
+        self._check_lock = threading.Lock()
+
+    def lag_query(self):
+        if self.engine.dialect.name == 'postgresql':
+            return text(
+                "SELECT CASE WHEN pg_is_in_recovery() "
+                "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                "ELSE 0 END"
+            )
+        return text("SELECT 0")
+
+
+class ReplicaPool:
+    """Health-checked round-robin over read replica engines"""
+
+    def __init__(self, urls: List[str], engine_options: Dict = None,
+                 health_interval: float = 30.0, max_lag: float = 30.0):
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        self.replicas = [Replica(f"replica-{i + 1}", url, engine_options) for i, url in enumerate(urls)]
+
+        self._lock = threading.Lock()
+        self._next = 0
+        self._stats = {'replica_reads': 0, 'primary_fallbacks': 0, 'failovers': 0}
+
+    def choose(self) -> Optional[Replica]:
+        """Next healthy replica, or None to read from the primary"""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            self._maybe_check(replica)
+            if replica.healthy:
+                with self._lock:
+                    replica.reads += 1
+                    self._stats['replica_reads'] += 1
+                return replica
+
+        with self._lock:
+            self._stats['primary_fallbacks'] += 1
+        return None
+
+    def _maybe_check(self, replica: Replica) -> None:
+        """Health check when due; one thread checks while the others use the last result"""
+        now = time.monotonic()
+        if replica.checked_at is not None and now - replica.checked_at < self.health_interval:
+            return
+        if not replica._check_lock.acquire(blocking=False):
+            return
+        try:
+            with replica.engine.connect() as connection:
+                lag = float(connection.execute(replica.lag_query()).scalar() or 0)
+            replica.lag_seconds = round(lag, 1)
+            replica.last_error = None
+            healthy = lag <= self.max_lag
+            if not healthy:
+                logger.warning(f"{replica.name} lags {lag:.0f}s behind the primary, reading from elsewhere")
+            elif not replica.healthy:
+                logger.info(f"{replica.name} is healthy again")
+            replica.healthy = healthy
+        except Exception as e:
+            self._set_down(replica, e)
+        finally:
+            replica.checked_at = time.monotonic()
+            replica._check_lock.release()
+
+    def mark_failed(self, replica: Replica, error: Exception) -> None:
+        """A read on replica failed at the connection level; skip it until its next check"""
+        self._set_down(replica, error)
+        replica.checked_at = time.monotonic()
+        with self._lock:
+            self._stats['failovers'] += 1
+
+    @staticmethod
+    def _set_down(replica: Replica, error: Exception) -> None:
+        if replica.healthy:
+            logger.warning(f"{replica.name} unavailable, reading from elsewhere: {error}")
+        replica.healthy = False
+        replica.last_error = str(error)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Routing counters and per-replica health for this process"""
+        with self._lock:
+            return dict(self._stats, replicas=[
+                {
+                    'name': replica.name,
+                    'healthy': replica.healthy,
+                    'lag_seconds': replica.lag_seconds,
+                    'reads': replica.reads,
+                    'last_error': replica.last_error
+                }
+                for replica in self.replicas
+            ])
@@ -26,7 +26,13 @@ class S3StorageService:
     """
     
     def __init__(self):
-        """Initialize S3 client with environment credentials"""
+        self.connect()
+    
+    def connect(self):
+        """
+        Initialize S3 client with environment credentials.
+        Called again in forked worker processes so they do not share the parent's connections.
+        """
         try:
             self.s3_client = boto3.client(
                 's3',
@@ -7,7 +7,10 @@ This is the proven, working code.
 """
 
 import logging
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional
 from PIL import Image
 from io import BytesIO
@@ -26,6 +29,15 @@ class SentinelHubStrategy(SatelliteStrategy):
         self.client_secret = config.get('client_secret')
         self.base_url = config.get('base_url', 'https://services.sentinel-hub.com')
         self.access_token = None
+        self.token_expires_at = 0.0  # time.monotonic() deadline, refreshed a minute early
+        self._token_lock = threading.Lock()
+        
+        # Pooled keep-alive connections shared by every download from this instance
+        pool_size = config.get('pool_size', 4)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     @property
     def provider_name(self) -> str:
@@ -41,9 +53,11 @@ class SentinelHubStrategy(SatelliteStrategy):
         }
         
         try:
-            response = requests.post(token_url, data=data, timeout=30)
+            response = self.session.post(token_url, data=data, timeout=30)
             if response.status_code == 200:
-                self.access_token = response.json()['access_token']
+                token = response.json()
+                self.access_token = token['access_token']
+                self.token_expires_at = time.monotonic() + max(0, token.get('expires_in', 3600) - 60)
                 logger.info(f"Successfully authenticated with {self.provider_name}")
                 return True
             else:
@@ -53,12 +67,20 @@ class SentinelHubStrategy(SatelliteStrategy):
             logger.error(f"Network error connecting to {self.provider_name}: {str(e)}")
             return False
     
+    def _ensure_token(self, force: bool = False) -> bool:
+        """Reuse the cached token until shortly before it expires"""
+        if not force and self.access_token and time.monotonic() < self.token_expires_at:
+            return True
+        with self._token_lock:
+            if not force and self.access_token and time.monotonic() < self.token_expires_at:
+                return True
+            return self.connect()
+    
     def download_image(self, bbox: list, date_from: str, date_to: str, 
                       width: int = 1024, height: int = 1024) -> Optional[Image.Image]:
         """Download satellite image from Sentinel Hub"""
-        if not self.access_token:
-            if not self.connect():
-                return None
+        if not self._ensure_token():
+            return None
                 
         evalscript = """
         //VERSION=3
@@ -110,13 +132,14 @@ class SentinelHubStrategy(SatelliteStrategy):
         }
         
         url = f"{self.base_url}/api/v1/process"
-        headers = {
-            'Authorization': f'Bearer {self.access_token}',
-            'Content-Type': 'application/json'
-        }
         
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
+            response = self._post_process(url, payload)
+            if response.status_code == 401:
+                # Token revoked or expired early - authenticate again and retry once
+                if not self._ensure_token(force=True):
+                    return None
+                response = self._post_process(url, payload)
             
             if response.status_code == 200:
                 image = Image.open(BytesIO(response.content))
@@ -128,4 +151,11 @@ class SentinelHubStrategy(SatelliteStrategy):
                 
         except requests.RequestException as e:
             logger.error(f"Network error downloading from {self.provider_name}: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+    
+    def _post_process(self, url: str, payload: dict):
+        headers = {
+            'Authorization': f'Bearer {self.access_token}',
+            'Content-Type': 'application/json'
+        }
+        return self.session.post(url, headers=headers, json=payload, timeout=60)
@@ -0,0 +1,104 @@
+"""
+Schedule Slots
+Assigns next_run_at for recurring AOI monitoring.
+
+Without a user-chosen time, every AOI gets a stable slot inside the
+configured UTC window derived from a hash of its ID: a time of day for
+daily runs, plus a day of the week (weekly) or of the 30-day cycle
+(monthly). AOIs created together therefore spread out instead of firing as
+one batch. With a user-chosen time (the schedule anchor) runs recur at
+exactly that time plus whole intervals.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import Config
+
+FREQUENCY_INTERVALS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
+    'monthly': timedelta(days=30)
+}
+
+_EPOCH = datetime(1970, 1, 5)  # a Monday, so weekly slots keep the same weekday
+
+
+def frequency_interval(frequency: Optional[str]) -> Optional[timedelta]:
+    """Interval between runs; None for one-off or disabled schedules, weekly if unknown"""
+    if not frequency:
+        return None
+    frequency = frequency.lower()
+    if frequency in ('once', 'none'):
+        return None
+    return FREQUENCY_INTERVALS.get(frequency, FREQUENCY_INTERVALS['weekly'])
+
+
+def _jitter_fraction(aoi_id: int, salt: str) -> float:
+    """Deterministic value in [0, 1) for an AOI"""
+    digest = hashlib.sha256(f"{aoi_id}:{salt}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def slot_phase(aoi_id: int, interval: timedelta) -> timedelta:
+    """Offset of the AOI's slot from the start of each interval"""
+    window_start = timedelta(hours=Config.SCHEDULE_SLOT_WINDOW_START_HOUR)
+    window_minutes = int(Config.SCHEDULE_SLOT_WINDOW_HOURS * 60)
+    time_of_day = window_start + timedelta(minutes=int(_jitter_fraction(aoi_id, 'time') * window_minutes))
+
+    days = interval.days
+    day = int(_jitter_fraction(aoi_id, 'day') * days) if days > 1 else 0
+    return (timedelta(days=day) + time_of_day) % interval
+
+
+def next_slot(aoi_id: int, frequency: Optional[str], after: Optional[datetime] = None,
+              anchor: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    First run time strictly after `after` (default: now).
+
+    Uses anchor + n * interval when the user picked a time, otherwise the
+    AOI's jittered slot. Returns None for frequencies that do not recur.
+    """
+    interval = frequency_interval(frequency)
+    if interval is None:
+        return None
+
+    after = after or datetime.utcnow()
+    if anchor is not None:
+        base = anchor
+    else:
+        base = _EPOCH + slot_phase(aoi_id, interval)
+
+    periods = (after - base) // interval + 1
+    return (base + periods * interval).replace(microsecond=0)
+
+
+def following_slot(aoi_id: int, frequency: Optional[str], previous_run_at: Optional[datetime],
+                   anchor: Optional[datetime] = None, collapse: Optional[bool] = None) -> Optional[datetime]:
+    """
+    Run time that follows previous_run_at.
+
+    When collapsing (CATCHUP_COLLAPSE_MISSED), slots that have already passed
+    are skipped, so an AOI that fell behind runs once and resumes its cadence.
+    Otherwise the next slot is returned even if it is in the past, and the
+    missed runs are replayed one by one.
+    """
+    now = datetime.utcnow()
+    if collapse is None:
+        collapse = Config.CATCHUP_COLLAPSE_MISSED
+
+    if previous_run_at is None:
+        after = now
+    elif collapse:
+        after = max(now, previous_run_at)
+    else:
+        after = previous_run_at
+    return next_slot(aoi_id, frequency, after, anchor)
+
+
+def missed_slots(frequency: Optional[str], scheduled_for: Optional[datetime], now: Optional[datetime] = None) -> int:
+    """Number of further slots that passed while a run was overdue"""
+    interval = frequency_interval(frequency)
+    if interval is None or scheduled_for is None:
+        return 0
+    return max(0, ((now or datetime.utcnow()) - scheduled_for) // interval)
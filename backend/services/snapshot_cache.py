@@ -0,0 +1,103 @@
+"""
+Snapshot Cache
+Keeps the result of an expensive, read-only computation (e.g. the admin
+statistics) for a TTL.
+
+When the snapshot is older than the TTL, the next caller either recomputes it
+inline or, in background mode, gets the stale snapshot right away while a
+single thread recomputes it. Only the very first call, before any snapshot
+exists, waits for the computation.
+"""
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """TTL cache for a single computed value, with optional background refresh"""
+
+    def __init__(self, loader: Callable[[], Any], ttl: float = 60.0, background: bool = True, name: str = 'snapshot'):
+        self.loader = loader
+        self.ttl = ttl
+        self.background = background
+        self.name = name
+
+        self._value = None
+        self._loaded_at: Optional[float] = None  # monotonic
+        self._computed_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._stats = {'hits': 0, 'stale_hits': 0, 'loads': 0, 'failed_loads': 0, 'last_load_ms': None}
+
+    def get(self, force: bool = False) -> Any:
+        """Current snapshot; recomputed when older than the TTL (or when forced)"""
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+            if fresh and not force:
+                self._stats['hits'] += 1
+                return self._value
+            if self._loaded_at is not None and self.background and not force:
+                self._stats['stale_hits'] += 1
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh_in_background, name=f'{self.name}-refresh',
+                                     daemon=True).start()
+                return self._value
+
+        return self._load()
+
+    def _load(self) -> Any:
+        # Callers arriving during a load wait for it rather than running their own
+        started = time.monotonic()
+        with self._load_lock:
+            with self._lock:
+                if self._loaded_at is not None and self._loaded_at >= started:
+                    return self._value
+
+            start = time.perf_counter()
+            try:
+                value = self.loader()
+            except Exception:
+                with self._lock:
+                    self._stats['failed_loads'] += 1
+                raise
+
+            with self._lock:
+                self._value = value
+                self._loaded_at = time.monotonic()
+                self._computed_at = datetime.utcnow()
+                self._stats['loads'] += 1
+                self._stats['last_load_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            return value
+
+    def _refresh_in_background(self):
+        try:
+            self._load()
+        except Exception as e:
+            logger.error(f"Background refresh of {self.name} failed, serving the previous snapshot: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self) -> None:
+        """Next get() recomputes"""
+        with self._lock:
+            self._loaded_at = None
+            self._value = None
+
+    def info(self) -> Dict[str, Any]:
+        """Age of the current snapshot plus load counters"""
+        with self._lock:
+            age = round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None
+            return dict(
+                self._stats,
+                computed_at=self._computed_at.isoformat() if self._computed_at else None,
+                age_seconds=age,
+                ttl_seconds=self.ttl,
+                background=self.background
+            )
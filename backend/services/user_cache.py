@@ -0,0 +1,188 @@
+"""
+User Cache
+Authenticated-user lookups for require_auth without a database round-trip.
+
+Users are cached by Clerk ID (the token's `sub`) in a small in-process LRU
+with a TTL, optionally backed by a shared Redis tier with a longer TTL.
+DatabaseManager invalidates an entry once a transaction that changed the
+user's tokens, role or profile commits. That clears this process's entry
+and the Redis entry. Other processes' in-process entries expire within
+USER_CACHE_TTL_SECONDS.
+"""
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """Two-tier TTL cache of user dicts keyed by Clerk user ID"""
+
+    KEY_PREFIX = 'vantage:user:'
+    ID_KEY_PREFIX = 'vantage:user-id:'
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000,
+                 redis_url: Optional[str] = None, redis_ttl: int = 0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self.redis_ttl = redis_ttl
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # clerk id -> (expires_at, user)
+        self._clerk_ids: Dict[int, str] = {}  # user id -> clerk id, for invalidation
+        self._invalidated_at: Dict[int, float] = {}  # user id -> monotonic time of last invalidation
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_checked = False
+        self._stats = {'hits': 0, 'redis_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _get_redis(self):
+        """Connect to Redis once when the shared tier is enabled"""
+        if not self.redis_ttl or not self.redis_url:
+            return None
+        if self._redis_checked:
+            return self._redis
+
+        with self._lock:
+            if not self._redis_checked:
+                try:
+                    import redis
+                    client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=2, socket_timeout=1)
+                    client.ping()
+                    self._redis = client
+                    logger.info("User cache using Redis tier")
+                except Exception as e:
+                    self._redis = None
+                    logger.warning(f"Redis unavailable for user cache, using in-process tier only: {e}")
+                self._redis_checked = True
+
+        return self._redis
+
+    def get(self, clerk_user_id: str) -> Optional[Dict[str, Any]]:
+        """Cached user dict (a copy), or None"""
+        if not self.enabled or not clerk_user_id:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(clerk_user_id)
+            if entry is not None:
+                expires_at, user = entry
+                if expires_at > now:
+                    self._entries.move_to_end(clerk_user_id)
+                    self._stats['hits'] += 1
+                    return dict(user)
+                del self._entries[clerk_user_id]
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                raw = client.get(self.KEY_PREFIX + clerk_user_id)
+                if raw:
+                    user = json.loads(raw)
+                    self._store_local(clerk_user_id, user)
+                    with self._lock:
+                        self._stats['redis_hits'] += 1
+                    return dict(user)
+            except Exception as e:
+                logger.warning(f"User cache Redis read failed: {e}")
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, user: Dict[str, Any], read_started: Optional[float] = None) -> None:
+        """
+        Cache a user dict as returned by User.to_dict().
+
+        read_started (time.monotonic() before the database read) lets a read that
+        raced with a committed change be discarded instead of caching stale data.
+        """
+        clerk_user_id = user.get('clerk_user_id') if user else None
+        if not self.enabled or not clerk_user_id:
+            return
+
+        if read_started is not None:
+            with self._lock:
+                if self._invalidated_at.get(user['id'], float('-inf')) >= read_started:
+                    return
+
+        self._store_local(clerk_user_id, dict(user))
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                pipe.setex(self.KEY_PREFIX + clerk_user_id, self.redis_ttl, json.dumps(user, default=str))
+                pipe.setex(f"{self.ID_KEY_PREFIX}{user['id']}", self.redis_ttl, clerk_user_id)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"User cache Redis write failed: {e}")
+
+    def _store_local(self, clerk_user_id: str, user: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[clerk_user_id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(clerk_user_id)
+            self._clerk_ids[user['id']] = clerk_user_id
+            while len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._clerk_ids.pop(evicted['id'], None)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user from both tiers (call after the change has committed)"""
+        now = time.monotonic()
+        with self._lock:
+            clerk_user_id = self._clerk_ids.pop(user_id, None)
+            if clerk_user_id is not None:
+                self._entries.pop(clerk_user_id, None)
+            self._invalidated_at[user_id] = now
+            if len(self._invalidated_at) > self.max_entries:
+                # Only reads still in flight care about old invalidations
+                cutoff = now - 60
+                self._invalidated_at = {uid: at for uid, at in self._invalidated_at.items() if at > cutoff}
+            self._stats['invalidations'] += 1
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                clerk_user_id = clerk_user_id or client.get(f"{self.ID_KEY_PREFIX}{user_id}")
+                if isinstance(clerk_user_id, bytes):
+                    clerk_user_id = clerk_user_id.decode()
+                keys = [f"{self.ID_KEY_PREFIX}{user_id}"]
+                if clerk_user_id:
+                    keys.append(self.KEY_PREFIX + clerk_user_id)
+                client.delete(*keys)
+            except Exception as e:
+                logger.warning(f"User cache Redis invalidation failed: {e}")
+
+    def clear(self) -> None:
+        """Drop every in-process entry"""
+        with self._lock:
+            self._entries.clear()
+            self._clerk_ids.clear()
+            self._invalidated_at.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), ttl_seconds=self.ttl,
+                        redis_tier=self._redis is not None)
+
+
+# Global user cache for require_auth
+user_cache = UserCache(
+    ttl=Config.USER_CACHE_TTL_SECONDS,
+    max_entries=Config.USER_CACHE_MAX_ENTRIES,
+    redis_url=Config.REDIS_URL,
+    redis_ttl=Config.USER_CACHE_REDIS_TTL_SECONDS
+)
@@ -0,0 +1,74 @@
+"""
+Worker Services
+One long-lived service graph per Celery worker process: database engine,
+satellite service (pooled Sentinel Hub session and cached access token),
+S3 client and analysis pipelines built on top of them.
+
+Built by the worker_process_init hook in tasks.py, so prefork children never
+share connections with the parent, and reused by every task in the process.
+"""
+import time
+import logging
+import threading
+from typing import Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def build_satellite_service():
+    """Create the configured satellite service (OpenCV unless USE_OPENCV=false)"""
+    if Config.USE_OPENCV:
+        from services.satellite_service_opencv import SatelliteServiceOpenCV
+        return SatelliteServiceOpenCV(Config.CLIENT_ID, Config.CLIENT_SECRET)
+
+    from services.satellite_service import SatelliteService
+    return SatelliteService(Config.CLIENT_ID, Config.CLIENT_SECRET)
+
+
+class WorkerServices:
+    """Process-wide services shared by all tasks running in a worker process"""
+
+    def __init__(self, db_manager):
+        start = time.perf_counter()
+
+        # shared_db drops connections inherited across fork on first use in this process
+        self.db_manager = db_manager
+
+        try:
+            from services.s3_service import s3_service
+            s3_service.connect()
+            self.s3_service = s3_service
+        except ImportError:
+            self.s3_service = None
+
+        self.satellite_service = build_satellite_service()
+        self.build_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def new_pipeline(self, on_stage=None):
+        """Analysis pipeline for one run (pipelines hold per-run stage timings)"""
+        from services.analysis_service import AnalysisPipeline
+        return AnalysisPipeline(self.satellite_service, on_stage=on_stage)
+
+
+_services: Optional[WorkerServices] = None
+_lock = threading.RLock()
+
+
+def init_worker_services(db_manager) -> WorkerServices:
+    """Build the process-wide services (worker_process_init hook)"""
+    global _services
+    with _lock:
+        _services = WorkerServices(db_manager)
+        logger.info(f"Worker services ready in {_services.build_ms} ms")
+        return _services
+
+
+def get_worker_services(db_manager) -> WorkerServices:
+    """Process-wide services, built on first use outside a prefork worker (solo pool, eager tasks)"""
+    if _services is None:
+        with _lock:
+            if _services is None:
+                return init_worker_services(db_manager)
+    return _services
@@ -2,16 +2,89 @@
 Shared Database Manager Instance
 ===============================
 
-This module provides a global database manager instance that can be imported
-across the application. It's initialized once and reused everywhere.
+Every module that needs the database - controllers, services, Celery tasks
+and the app factory - goes through this registry, so a process has exactly
+one DatabaseManager and therefore one engine and one connection pool.
 
-This is needed for the current controller architecture where controllers
-import db_manager directly rather than receiving it as a dependency.
+The manager is created lazily on first use, with the pool sized for the
+process role (Config.DB_PROCESS_ROLE, or configure() before first use).
+Importing this module opens no connections and runs no DDL; the API creates
+missing tables once at startup (Config.DB_CREATE_TABLES).
+
+`db_manager` is kept for the existing `from shared_db import db_manager`
+imports and forwards to the process's manager.
 """
+import os
+import logging
+import threading
+from typing import Dict, Any, Optional
 
 from database import DatabaseManager
 from config import Config
 
-# Create a global database manager instance
-# This will be initialized when the module is first imported
-db_manager = DatabaseManager(Config.DATABASE_URL, Config.SQLALCHEMY_ENGINE_OPTIONS)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+_manager: Optional[DatabaseManager] = None
+_manager_pid = None
+_role: Optional[str] = None
+_lock = threading.Lock()
+
+
+def configure(role: str) -> None:
+    """Set the process role (api, worker, script); only effective before first use"""
+    global _role
+    if role not in Config.DB_POOL_SIZES:
+        raise ValueError(f"Unknown database process role: {role}")
+    if _manager is not None and role != current_role():
+        logger.warning(f"Database engine already created for role '{current_role()}', ignoring role '{role}'")
+        return
+    _role = role
+
+
+def current_role() -> str:
+    return _role or Config.DB_PROCESS_ROLE
+
+
+def engine_options(role: str) -> Dict[str, Any]:
+    """Config.SQLALCHEMY_ENGINE_OPTIONS with the pool sized for a process role"""
+    pool_size, max_overflow = Config.DB_POOL_SIZES.get(role, Config.DB_POOL_SIZES['api'])
+    return dict(Config.SQLALCHEMY_ENGINE_OPTIONS, pool_size=pool_size, max_overflow=max_overflow)
+
+
+def get_db_manager() -> DatabaseManager:
+    """This process's DatabaseManager, created on first call"""
+    global _manager, _manager_pid
+    pid = os.getpid()
+
+    if _manager is None:
+        with _lock:
+            if _manager is None:
+                role = current_role()
+                _manager = DatabaseManager(Config.DATABASE_URL, engine_options(role), Config.DATABASE_REPLICA_URLS)
+                _manager_pid = pid
+                pool_size, max_overflow = Config.DB_POOL_SIZES.get(role, Config.DB_POOL_SIZES['api'])
+                logger.info(f"Database engine created for role '{role}' (pool {pool_size}+{max_overflow})")
+    elif _manager_pid != pid:
+        with _lock:
+            if _manager_pid != pid:
+                # Connections inherited across fork belong to the parent - drop them without closing
+                _manager.engine.dispose(close=False)
+                if _manager.replicas is not None:
+                    for replica in _manager.replicas.replicas:
+                        replica.engine.dispose(close=False)
+                _manager_pid = pid
+
+    return _manager
+
+
+class _SharedDatabaseManager:
+    """Module-level stand-in that builds the manager on first attribute access"""
+
+    def __getattr__(self, name):
+        return getattr(get_db_manager(), name)
+
+    def __repr__(self):
+        return f"<shared DatabaseManager ({'created' if _manager is not None else 'not created'})>"
+
+
+db_manager = _SharedDatabaseManager()
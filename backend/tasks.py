@@ -1,33 +1,58 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from celery_app import celery_app
 from datetime import datetime, timedelta
+from sqlalchemy import or_
 import uuid
 import os
-import numpy as np
-from PIL import Image
+import time
 import logging
 
 # Import our existing modules
-from database import DatabaseManager
+import shared_db
+from shared_db import db_manager
 from config import Config
 from models import AreaOfInterest, AnalysisHistory
+from services.priority_service import celery_priority, effective_rank, promoted_since, schedule_meta
+from services.schedule_slots import following_slot, missed_slots
+from services.worker_services import init_worker_services, get_worker_services
 
-# Initialize components
-db_manager = DatabaseManager(Config.DATABASE_URL, Config.SQLALCHEMY_ENGINE_OPTIONS)
 logger = logging.getLogger(__name__)
 
 # Import satellite processor
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+@worker_init.connect
+def _configure_worker_role(**kwargs):
+    """Size the connection pool for a worker before any task touches the database"""
+    shared_db.configure('worker')
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    """Build the long-lived service graph once per worker process"""
+    init_worker_services(db_manager)
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    """Write buffered activity before the child exits (prefork children skip atexit)"""
+    if db_manager.activity_sink is not None:
+        db_manager.activity_sink.close()
+
 @celery_app.task(bind=True, name='tasks.run_scheduled_analysis')
 def run_scheduled_analysis(self, aoi_id, analysis_type='baseline_comparison'):
     """
     Celery task to run scheduled analysis for an AOI
     """
+    from services.analysis_service import AnalysisError
+    
+    started_at = datetime.utcnow()
     try:
         logger.info(f"🤖 Starting Celery scheduled analysis for AOI {aoi_id}")
         
+        if analysis_type != 'baseline_comparison':
+            return {'success': False, 'error': f'Unsupported scheduled analysis type: {analysis_type}'}
+        
         # Get AOI details
         with db_manager.get_session() as session:
             aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
@@ -35,137 +60,228 @@ def run_scheduled_analysis(self, aoi_id, analysis_type='baseline_comparison'):
                 logger.warning(f"AOI {aoi_id} not found or inactive")
                 return {'success': False, 'error': 'AOI not found or inactive'}
             
+            # Only the AOI's current scheduled task may run; superseded ETA tasks are dropped.
+            # Mark the claim as running (conditionally, so a sweep cannot swap it in between);
+            # _finish_scheduled_run releases it together with moving next_run_at
+            claimed = session.query(AreaOfInterest).filter(
+                AreaOfInterest.id == aoi_id,
+                AreaOfInterest.scheduled_task_id == self.request.id,
+                _not_running(started_at)
+            ).update({'run_started_at': started_at}, synchronize_session=False)
+            if not claimed:
+                logger.info(f"Skipping superseded scheduled task {self.request.id} for AOI {aoi_id}")
+                return {'success': False, 'skipped': True, 'error': 'Superseded by a newer schedule'}
+            
             user_id = aoi.user_id
             aoi_name = aoi.name
-            bbox = aoi.bbox_coordinates
-            baseline_filename = aoi.baseline_image_filename
-            
-        # Import satellite service here to avoid circular imports
-        from services.satellite_service import SatelliteService
-        satellite_processor = SatelliteService(Config.CLIENT_ID, Config.CLIENT_SECRET)
+            aoi_data = aoi.to_dict()
+            scheduled_meta = schedule_meta(aoi.priority, aoi.next_run_at, started_at)
+            scheduled_meta['missed_slots'] = missed_slots(aoi.monitoring_frequency, aoi.next_run_at, started_at)
         
-        # Generate date ranges
+        setup_start = time.perf_counter()
+        pipeline = get_worker_services(db_manager).new_pipeline()
+        setup_ms = round((time.perf_counter() - setup_start) * 1000, 2)
+        
+        # For baseline comparison, get current image (last 7 days) vs baseline
         current_date = datetime.now()
-        if analysis_type == 'baseline_comparison':
-            # For baseline comparison, get current image vs baseline
-            date_from = (current_date - timedelta(days=7)).strftime("%Y-%m-%d")
-            date_to = current_date.strftime("%Y-%m-%d")
-            
-            # Download current image
-            current_image = satellite_processor.download_image(
-                bbox=bbox,
-                date_from=date_from,
-                date_to=date_to
-            )
-            
-            if not current_image:
-                logger.error("Failed to download current image")
-                return {'success': False, 'error': 'Failed to download current image'}
-            
-            # Load baseline image
-            baseline_path = os.path.join(Config.IMAGES_DIR, baseline_filename)
-            if not os.path.exists(baseline_path):
-                logger.error("Baseline image not found")
-                return {'success': False, 'error': 'Baseline image not found'}
-            
-            baseline_image = Image.open(baseline_path)
-            
-            # Create filenames
-            process_id = str(uuid.uuid4())[:8]
-            current_filename = f"scheduled_aoi_{aoi_id}_current_{process_id}.jpg"
-            heatmap_filename = f"scheduled_aoi_{aoi_id}_heatmap_{process_id}.png"
-            
-            current_path = os.path.join(Config.IMAGES_DIR, current_filename)
-            heatmap_path = os.path.join(Config.IMAGES_DIR, heatmap_filename)
-            
-            # Save current image
-            current_image.save(current_path, 'JPEG', quality=95)
-            
-            # Create heatmap
-            satellite_processor.create_heatmap(baseline_image, current_image, heatmap_path)
-            
-            # Calculate change percentage
-            change_percentage = satellite_processor.calculate_change_percentage(baseline_image, current_image)
-            
-            # Save to database
-            analysis_id = db_manager.save_analysis(
-                user_id=user_id,
-                aoi_id=aoi_id,
-                process_id=process_id,
-                operation_name="SCHEDULED BASELINE COMPARISON",
-                location_description=f"{aoi_name} - Scheduled Analysis",
-                bbox_coordinates=bbox,
-                image_filenames={
-                    'image1': baseline_filename,  # baseline
-                    'image2': current_filename,             # current
-                    'heatmap': heatmap_filename
-                },
-                meta={
-                    'analysis_date': current_date.isoformat(),
-                    'comparison_type': 'baseline_vs_current',
-                    'analysis_type': 'scheduled_celery',
-                    'scheduled_task': True
-                },
-                change_percentage=change_percentage,
-                tokens_used=0
-            )
-            
-            logger.info(f"✅ Scheduled analysis completed for AOI {aoi_id} - Change: {change_percentage:.2f}%")
-            
-            # Check for significant change and potentially send notifications
-            if change_percentage > 15.0:
-                logger.warning(f"🚨 Significant change detected in {aoi_name}: {change_percentage:.2f}%")
-                # Here you could add notification logic (email, webhook, etc.)
-            
-            # Update next run time based on frequency
-            _update_next_run_time(aoi_id)
-            
-            return {
-                'success': True,
-                'analysis_id': analysis_id,
-                'change_percentage': change_percentage,
-                'aoi_name': aoi_name,
-                'message': f'Scheduled analysis completed for {aoi_name}'
-            }
+        dates = {
+            'current_from': (current_date - timedelta(days=7)).strftime("%Y-%m-%d"),
+            'current_to': current_date.strftime("%Y-%m-%d")
+        }
+        process_id = str(uuid.uuid4())[:8]
+        
+        try:
+            outcome = pipeline.run_baseline_comparison(aoi_data, process_id, dates)
+        except AnalysisError as e:
+            logger.error(f"Scheduled analysis for AOI {aoi_id} failed: {e.message}")
+            _finish_scheduled_run(aoi_id, self.request.id, succeeded=False)
+            return {'success': False, 'error': e.message}
+        
+        change_percentage = outcome['change_percentage']
+        record = outcome['record']
+        record['operation_name'] = "SCHEDULED BASELINE COMPARISON"
+        record['location_description'] = f"{aoi_name} - Scheduled Analysis"
+        record['meta'].update({
+            'analysis_date': current_date.isoformat(),
+            'analysis_type': 'scheduled_celery',
+            'scheduled_task': True,
+            'setup_ms': setup_ms,
+            'stage_timings': pipeline.stage_timings,
+            **scheduled_meta
+        })
+        
+        # Save to database
+        analysis_id = db_manager.save_analysis(
+            user_id=user_id,
+            aoi_id=aoi_id,
+            process_id=process_id,
+            tokens_used=0,
+            **record
+        )
+        
+        logger.info(f"✅ Scheduled analysis completed for AOI {aoi_id} - Change: {change_percentage:.2f}% "
+                    f"(setup {setup_ms} ms, stages {pipeline.stage_timings})")
+        
+        # Check for significant change and potentially send notifications
+        if change_percentage > 15.0:
+            logger.warning(f"🚨 Significant change detected in {aoi_name}: {change_percentage:.2f}%")
+            # Here you could add notification logic (email, webhook, etc.)
+        
+        # Update next run time based on frequency
+        _finish_scheduled_run(aoi_id, self.request.id, succeeded=True)
+        
+        return {
+            'success': True,
+            'analysis_id': analysis_id,
+            'change_percentage': change_percentage,
+            'aoi_name': aoi_name,
+            'setup_ms': setup_ms,
+            'message': f'Scheduled analysis completed for {aoi_name}'
+        }
             
     except Exception as e:
         logger.error(f"❌ Scheduled analysis failed for AOI {aoi_id}: {str(e)}")
-        # Don't update next run time on failure - let it retry
+        # Keep the slot, retried after SCHEDULE_RETRY_DELAY_MINUTES
+        _finish_scheduled_run(aoi_id, self.request.id, succeeded=False)
         return {'success': False, 'error': str(e)}
 
-def _update_next_run_time(aoi_id):
-    """Update the next run time based on frequency"""
+def _finish_scheduled_run(aoi_id, task_id, succeeded):
+    """
+    Release the run's claim in the same transaction that moves next_run_at:
+    to the following slot on success. A failed run is retried with exponential
+    backoff (SCHEDULE_RETRY_DELAY_MINUTES, doubling per consecutive failure);
+    after SCHEDULE_MAX_RETRIES retries it gives up and moves to the following
+    slot. If the AOI was rescheduled while the run was going, the claim
+    already belongs to the new task and is left alone.
+    """
     try:
         with db_manager.get_session() as session:
             aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
             if not aoi:
                 return
             
+            if aoi.scheduled_task_id != task_id:
+                return
+            aoi.scheduled_task_id = None
+            aoi.run_started_at = None
+            
             frequency = aoi.monitoring_frequency
             if not frequency:
                 return
             
-            current_time = datetime.utcnow()
+            failures = 0 if succeeded else (aoi.schedule_failures or 0) + 1
+            retrying = 0 < failures <= Config.SCHEDULE_MAX_RETRIES
+            aoi.schedule_failures = failures if retrying else 0
+            if failures and not retrying:
+                logger.warning(f"⚠️ AOI {aoi_id} scheduled run failed {failures} times - giving up on this slot")
             
-            if frequency == 'daily':
-                aoi.next_run_at = current_time + timedelta(days=1)
-            elif frequency == 'weekly':
-                aoi.next_run_at = current_time + timedelta(days=7)
-            elif frequency == 'monthly':
-                aoi.next_run_at = current_time + timedelta(days=30)
+            if retrying:
+                delay = Config.SCHEDULE_RETRY_DELAY_MINUTES * 2 ** (failures - 1)
+                aoi.next_run_at = datetime.utcnow() + timedelta(minutes=delay)
+                retry_at = aoi.next_run_at
             elif frequency == 'once':
                 # For one-time tasks, disable monitoring
                 aoi.monitoring_frequency = None
                 aoi.next_run_at = None
+            else:
+                # Next slot after the one just run (missed slots collapse unless configured otherwise)
+                aoi.next_run_at = following_slot(aoi.id, frequency, aoi.next_run_at, aoi.schedule_anchor_at)
             
-            session.commit()
-            
-            # Schedule next run if there is one
-            if aoi.next_run_at and frequency != 'once':
-                schedule_analysis_task(aoi_id, aoi.next_run_at)
+            next_run_at = aoi.next_run_at
+        
+        if retrying:
+            logger.info(f"🔁 AOI {aoi_id} scheduled run failed ({failures}) - retry at {retry_at}")
+            reschedule_aoi(aoi_id, retry_at)
+            return
+        
+        # Schedule next run if there is one. Runs beyond the ETA horizon, and missed
+        # slots being replayed, are left to the sweeper (which paces catch-up)
+        if next_run_at and frequency != 'once':
+            if next_run_at > datetime.utcnow():
+                reschedule_aoi(aoi_id, next_run_at)
+            else:
+                logger.info(f"📅 AOI {aoi_id} replaying missed slot {next_run_at} - left to the catch-up sweeper")
                 
     except Exception as e:
-        logger.error(f"Failed to update next run time for AOI {aoi_id}: {e}")
+        logger.error(f"Failed to finish scheduled run for AOI {aoi_id}: {e}")
+
+def _not_running(now=None):
+    """Filter for AOIs with no scheduled run in progress (claims older than SCHEDULE_RUN_TIMEOUT_MINUTES are stale)"""
+    stale_before = (now or datetime.utcnow()) - timedelta(minutes=Config.SCHEDULE_RUN_TIMEOUT_MINUTES)
+    return or_(AreaOfInterest.run_started_at.is_(None), AreaOfInterest.run_started_at < stale_before)
+
+def _eta_horizon():
+    """Latest run time that is published to the broker as an ETA task right now"""
+    return datetime.utcnow() + timedelta(minutes=Config.SCHEDULE_ETA_HORIZON_MINUTES)
+
+def _revoke(task_id):
+    try:
+        celery_app.control.revoke(task_id)
+        logger.info(f"🚫 Revoked scheduled analysis task {task_id}")
+    except Exception as e:
+        logger.warning(f"Failed to revoke task {task_id}: {e}")
+
+def _publish_scheduled_run(aoi_id, task_id, run_at, priority=None, dispatch_at=None):
+    """
+    Publish the scheduled run; clear the stored ID on failure so the sweeper retries.
+    
+    Runs that are already due go straight onto the queue without an ETA, so the
+    broker orders them by message priority rather than workers holding them FIFO.
+    dispatch_at overrides run_at as the ETA when catch-up paces overdue runs.
+    """
+    now = datetime.utcnow()
+    dispatch_at = dispatch_at or run_at
+    eta = dispatch_at if dispatch_at and dispatch_at > now else None
+    message_priority = celery_priority(priority, run_at, now)
+    try:
+        run_scheduled_analysis.apply_async(args=[aoi_id], eta=eta, task_id=task_id, priority=message_priority)
+        logger.info(f"📅 Scheduled analysis task {task_id} for AOI {aoi_id} at {run_at} (priority {message_priority})")
+        return task_id
+    except Exception as e:
+        logger.error(f"Failed to publish scheduled analysis for AOI {aoi_id}: {e}")
+        with db_manager.get_session() as session:
+            session.query(AreaOfInterest).filter_by(
+                id=aoi_id, scheduled_task_id=task_id
+            ).update({'scheduled_task_id': None}, synchronize_session=False)
+        return None
+
+def reschedule_aoi(aoi_id, run_at):
+    """
+    Make run_at the AOI's only pending scheduled run.
+    
+    Revokes the previously published ETA task, then publishes a new one when
+    run_at falls within SCHEDULE_ETA_HORIZON_MINUTES. Later runs are published
+    by sweep_scheduled_analyses once they come close, so workers never hold
+    more than one horizon's worth of ETA messages. Pass run_at=None to cancel.
+    Returns the new task ID, or None if nothing was published.
+    """
+    if isinstance(run_at, str):
+        run_at = datetime.fromisoformat(run_at.replace('Z', '+00:00'))
+    if run_at is not None and run_at.tzinfo is not None:
+        run_at = datetime(*run_at.utctimetuple()[:6])
+    
+    new_task_id = None
+    with db_manager.get_session() as session:
+        aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
+        if not aoi:
+            return None
+        
+        previous_task_id = aoi.scheduled_task_id
+        priority = aoi.priority
+        if run_at is not None and run_at <= _eta_horizon():
+            new_task_id = str(uuid.uuid4())
+        aoi.scheduled_task_id = new_task_id
+        aoi.run_started_at = None
+    
+    if previous_task_id:
+        _revoke(previous_task_id)
+    
+    if new_task_id:
+        return _publish_scheduled_run(aoi_id, new_task_id, run_at, priority)
+    
+    if run_at is not None:
+        logger.info(f"📅 AOI {aoi_id} run at {run_at} is beyond the ETA horizon - left to the sweeper")
+    return None
 
 @celery_app.task(name='tasks.schedule_analysis_task')
 def schedule_analysis_task(aoi_id, scheduled_time):
@@ -173,23 +289,106 @@ def schedule_analysis_task(aoi_id, scheduled_time):
     Schedule an analysis task to run at a specific time
     """
     try:
-        # Convert to datetime if it's a string
-        if isinstance(scheduled_time, str):
-            scheduled_time = datetime.fromisoformat(scheduled_time.replace('Z', '+00:00'))
-        
-        # Schedule the task using Celery's apply_async with eta
-        result = run_scheduled_analysis.apply_async(
-            args=[aoi_id],
-            eta=scheduled_time
-        )
-        
-        logger.info(f"📅 Scheduled analysis task {result.id} for AOI {aoi_id} at {scheduled_time}")
-        return result.id
-        
+        return reschedule_aoi(aoi_id, scheduled_time)
     except Exception as e:
         logger.error(f"Failed to schedule analysis task: {e}")
         return None
 
+@celery_app.task(name='tasks.sweep_scheduled_analyses')
+def sweep_scheduled_analyses():
+    """
+    Periodic (beat) task: publish ETA tasks for scheduled runs that have come
+    within the horizon and have no live task yet, highest effective priority
+    first. Overdue runs that aged into a higher priority since the last sweep
+    are re-published at the new priority so they cannot starve in the queue.
+    
+    AOIs whose scheduled run is executing right now are skipped: the run moves
+    next_run_at and releases its claim when it finishes. A claim older than
+    SCHEDULE_RUN_TIMEOUT_MINUTES belongs to a dead worker and is taken over.
+    
+    Catch-up: overdue runs (most urgent first) are paced at
+    CATCHUP_MAX_PER_MINUTE by spreading their ETAs across the sweep interval;
+    the rest wait for later sweeps, so a backlog after an outage drains at a
+    bounded rate instead of hitting the provider all at once.
+    """
+    now = datetime.utcnow()
+    horizon = _eta_horizon()
+    rate = Config.CATCHUP_MAX_PER_MINUTE
+    overdue_budget = max(1, int(rate * Config.SCHEDULE_SWEEP_SECONDS / 60)) if rate > 0 else None
+    spacing = 60.0 / rate if rate > 0 else 0.0
+    with db_manager.get_session() as session:
+        rows = session.query(
+            AreaOfInterest.id, AreaOfInterest.next_run_at, AreaOfInterest.priority,
+            AreaOfInterest.scheduled_task_id, AreaOfInterest.run_started_at
+        ).filter(
+            AreaOfInterest.monitoring_frequency.isnot(None),
+            AreaOfInterest.is_active == True,
+            AreaOfInterest.baseline_status == 'completed',
+            AreaOfInterest.next_run_at.isnot(None),
+            AreaOfInterest.next_run_at <= horizon,
+            _not_running(now)
+        ).all()
+    
+    rows.sort(key=lambda row: (effective_rank(row.priority, row.next_run_at, now), row.next_run_at))
+    
+    published = 0
+    promoted = 0
+    paced = 0
+    deferred = 0
+    for aoi_id, run_at, priority, current_task_id, run_started_at in rows:
+        stale = run_started_at is not None
+        if current_task_id and not stale and not promoted_since(priority, run_at, Config.SCHEDULE_SWEEP_SECONDS, now):
+            continue
+        
+        dispatch_at = run_at
+        if run_at <= now:
+            if overdue_budget is not None and paced >= overdue_budget:
+                deferred += 1
+                continue
+            dispatch_at = now + timedelta(seconds=paced * spacing)
+            paced += 1
+        
+        task_id = str(uuid.uuid4())
+        
+        # Claim the slot so concurrent sweeps or reschedules never publish twice; a run
+        # that started after the SELECT above keeps its claim
+        with db_manager.get_session() as session:
+            claimed = session.query(AreaOfInterest).filter(
+                AreaOfInterest.id == aoi_id,
+                AreaOfInterest.scheduled_task_id == current_task_id if current_task_id
+                else AreaOfInterest.scheduled_task_id.is_(None),
+                _not_running(now)
+            ).update({'scheduled_task_id': task_id, 'run_started_at': None}, synchronize_session=False)
+        
+        if not claimed:
+            continue
+        if current_task_id:
+            _revoke(current_task_id)
+        if _publish_scheduled_run(aoi_id, task_id, run_at, priority, dispatch_at):
+            if current_task_id:
+                promoted += 1
+            else:
+                published += 1
+    
+    if published or promoted:
+        logger.info(f"🧹 Sweeper published {published} scheduled analyses due before {horizon}, "
+                    f"re-prioritized {promoted} overdue runs")
+    if deferred:
+        logger.info(f"⏳ Catch-up: paced {paced} overdue runs at {rate}/min, {deferred} left for later sweeps")
+    return published
+
+@celery_app.task(name='tasks.archive_analysis_history')
+def archive_analysis_history():
+    """
+    Periodic (beat) task: move analyses older than HISTORY_RETENTION_DAYS from
+    analysis_history to analysis_history_archive. History reads cover both
+    tiers, so this only changes where the rows live.
+    """
+    if Config.HISTORY_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=Config.HISTORY_RETENTION_DAYS)
+    return db_manager.archive_analysis_history(cutoff, batch_size=Config.HISTORY_ARCHIVE_BATCH_SIZE)
+
 @celery_app.task(name='tasks.cancel_scheduled_analysis')
 def cancel_scheduled_analysis(task_id):
     """
@@ -201,4 +400,110 @@ def cancel_scheduled_analysis(task_id):
         return True
     except Exception as e:
         logger.error(f"Failed to cancel task {task_id}: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+@celery_app.task(bind=True, name='tasks.run_analysis_job')
+def run_analysis_job(self, job_id):
+    """
+    Celery task that runs an async analysis job submitted through the API.
+    Tokens are debited only once the pipeline has produced a result.
+    """
+    from services.analysis_service import AnalysisError
+    from utils.date_strategy import SatelliteDateStrategy
+    
+    job = db_manager.get_analysis_job(job_id)
+    if not job:
+        logger.error(f"Analysis job {job_id} not found")
+        return {'success': False, 'error': 'Job not found'}
+    
+    if job['status'] in ('completed', 'failed'):
+        logger.warning(f"Analysis job {job_id} already {job['status']}, skipping")
+        return {'success': job['status'] == 'completed', 'job_id': job_id}
+    
+    user_id = job['user_id']
+    aoi_id = job['aoi_id']
+    params = job.get('params') or {}
+    
+    db_manager.update_analysis_job(job_id, status='running', stage='starting')
+    
+    def on_stage(stage, timings):
+        db_manager.update_analysis_job(job_id, stage=stage, stage_timings=timings)
+    
+    setup_start = time.perf_counter()
+    pipeline = get_worker_services(db_manager).new_pipeline(on_stage=on_stage)
+    pipeline.stage_timings['setup'] = round((time.perf_counter() - setup_start) * 1000, 2)
+    process_id = str(uuid.uuid4())[:8]
+    tokens_used = 0 if job['job_type'] == 'manual_comparison' else 1
+    
+    try:
+        if job['job_type'] == 'manual_comparison':
+            outcome = pipeline.run_manual_comparison(
+                user_id,
+                params['bbox_coordinates'],
+                params.get('location_description', "Manual Analysis"),
+                process_id,
+                params['dates']
+            )
+        else:
+            with db_manager.get_session() as session:
+                aoi = session.query(AreaOfInterest).filter_by(id=aoi_id, user_id=user_id).first()
+                if not aoi or not aoi.is_active:
+                    raise AnalysisError("AOI not found or inactive", "NOT_FOUND", 404)
+                aoi_data = aoi.to_dict()
+            
+            if job['job_type'] == 'baseline_comparison':
+                outcome = pipeline.run_baseline_comparison(
+                    aoi_data, process_id, SatelliteDateStrategy.get_analysis_dates()
+                )
+            else:
+                outcome = pipeline.run_time_range(aoi_data, process_id, params['dates'])
+        
+        with pipeline.stage('persist'):
+            # Debit and history row commit together: no charge without a saved analysis
+            outcome['record']['meta']['job_id'] = job_id
+            success, message, analysis_id = db_manager.save_charged_analysis(
+                user_id=user_id,
+                aoi_id=aoi_id,
+                process_id=process_id,
+                tokens_used=tokens_used,
+                reference_id=f"Analysis job {job_id}",
+                **outcome['record']
+            )
+            if not success:
+                raise AnalysisError(message, "INSUFFICIENT_TOKENS", 400)
+        
+        result = {
+            'analysis_id': analysis_id,
+            'process_id': process_id,
+            'change_percentage': round(outcome['change_percentage'], 2),
+            'tokens_used': tokens_used,
+            'images': outcome['images']
+        }
+        db_manager.update_analysis_job(
+            job_id,
+            status='completed',
+            stage='completed',
+            stage_timings=pipeline.stage_timings,
+            analysis_id=analysis_id,
+            tokens_used=tokens_used,
+            result=result
+        )
+        
+        logger.info(f"✅ Analysis job {job_id} completed - timings: {pipeline.stage_timings}")
+        return {'success': True, 'job_id': job_id, **result}
+        
+    except AnalysisError as e:
+        logger.error(f"❌ Analysis job {job_id} failed: {e.message}")
+        db_manager.update_analysis_job(
+            job_id, status='failed', stage_timings=pipeline.stage_timings,
+            error=e.message, error_code=e.code
+        )
+        return {'success': False, 'job_id': job_id, 'error': e.message}
+    except Exception as e:
+        logger.error(f"❌ Analysis job {job_id} failed: {str(e)}")
+        db_manager.update_analysis_job(
+            job_id, status='failed', stage_timings=pipeline.stage_timings,
+            error=str(e), error_code='INTERNAL_ERROR'
+        )
+        return {'success': False, 'job_id': job_id, 'error': str(e)}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: core write latency with and without the buffered activity sink
+
+Runs the same mix of create_aoi / delete_aoi / log_activity calls against a
+fresh database twice, once writing UserActivity inline (the previous
+behaviour) and once through the ActivitySink, and reports per-call latency.
+Set TEST_DATABASE_URL to benchmark against PostgreSQL instead of a temporary
+SQLite file.
+
+    python tests/benchmark_activity_sink.py --ops 2000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database import DatabaseManager
+from models import User, UserActivity
+
+
+def make_db_manager(buffered):
+    Config.ACTIVITY_BUFFER_ENABLED = buffered
+    database_url = os.getenv('TEST_DATABASE_URL')
+    if database_url:
+        db_manager = DatabaseManager(database_url)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), 'activity.db')
+        db_manager = DatabaseManager(f'sqlite:///{path}')
+    db_manager.create_tables()
+    return db_manager
+
+
+def run(db_manager, ops):
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id=f'bench_{os.urandom(6).hex()}', email='bench@example.com',
+                    tokens_remaining=0, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        user_id = user.id
+
+    timings = {'create_aoi': [], 'delete_aoi': [], 'log_activity': []}
+    for i in range(ops):
+        start = time.perf_counter()
+        aoi_id = db_manager.create_aoi(user_id, {'name': f'AOI {i}', 'bbox_coordinates': [0, 0, 1, 1]})
+        timings['create_aoi'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        db_manager.log_activity(user_id, 'benchmark', {'i': i})
+        timings['log_activity'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        db_manager.delete_aoi(user_id, aoi_id)
+        timings['delete_aoi'].append(time.perf_counter() - start)
+
+    if db_manager.activity_sink is not None:
+        db_manager.activity_sink.close()
+    with db_manager.get_session() as session:
+        activity_rows = session.query(UserActivity).filter_by(user_id=user_id).count()
+    return timings, activity_rows
+
+
+def report(label, timings):
+    print(f"\n{label}")
+    for name, samples in timings.items():
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"  {name:<14} mean {statistics.mean(samples) * 1000:7.3f} ms   p95 {p95 * 1000:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark activity sink write latency")
+    parser.add_argument('--ops', type=int, default=1000)
+    args = parser.parse_args()
+
+    inline, inline_rows = run(make_db_manager(buffered=False), args.ops)
+    buffered, buffered_rows = run(make_db_manager(buffered=True), args.ops)
+
+    report("inline UserActivity inserts", inline)
+    report("buffered ActivitySink", buffered)
+
+    expected = args.ops * 3
+    assert inline_rows == expected, f"inline wrote {inline_rows} of {expected} activity rows"
+    assert buffered_rows == expected, f"sink wrote {buffered_rows} of {expected} activity rows"
+    print(f"\n✅ {expected} activity rows written in both modes")
+
+
+if __name__ == '__main__':
+    main()
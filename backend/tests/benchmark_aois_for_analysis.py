@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: get_aois_for_analysis at scale
+
+Seeds a throwaway SQLite database with N AOIs (default 100k) across 2k users,
+then compares the previous N+1 implementation (one User query per due AOI,
+coalesce() on next_run_at) with the joined, index-backed keyset query.
+
+    python tests/benchmark_aois_for_analysis.py --aois 100000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.sql import func
+
+from database import DatabaseManager
+from models import User, AreaOfInterest
+
+
+def seed(db_manager, aoi_count, user_count):
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    with db_manager.get_session() as session:
+        session.bulk_insert_mappings(User, [
+            {'id': i, 'clerk_user_id': f'bench_{i}', 'email': f'bench_{i}@example.com',
+             'tokens_remaining': 0 if i % 10 == 0 else 50, 'total_tokens_used': 0}
+            for i in range(1, user_count + 1)
+        ])
+        session.bulk_insert_mappings(AreaOfInterest, [
+            {
+                'user_id': rng.randint(1, user_count),
+                'name': f'AOI {i}',
+                'bbox_coordinates': [0, 0, 1, 1],
+                'monitoring_frequency': None if i % 5 == 0 else 'daily',
+                'is_active': i % 20 != 0,
+                'baseline_status': 'completed' if i % 7 else 'pending',
+                # ~10% due: most runs are in the future, a few never scheduled
+                'next_run_at': None if i % 97 == 0 else now + timedelta(minutes=rng.randint(-600, 10000))
+            }
+            for i in range(1, aoi_count + 1)
+        ])
+    with db_manager.engine.connect() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+
+def legacy_get_aois_for_analysis(db_manager):
+    """The previous implementation, kept here for comparison"""
+    with db_manager.get_session() as session:
+        current_time = datetime.utcnow()
+        aois = session.query(AreaOfInterest).filter(
+            AreaOfInterest.monitoring_frequency.isnot(None),
+            AreaOfInterest.is_active == True,
+            AreaOfInterest.baseline_status == 'completed',
+            func.coalesce(AreaOfInterest.next_run_at, current_time - timedelta(days=1)) <= current_time
+        ).all()
+        result = []
+        for aoi in aois:
+            user = session.query(User).filter_by(id=aoi.user_id).first()
+            if user and user.tokens_remaining > 0:
+                result.append(aoi.id)
+        return result
+
+
+def timed(label, fn, runs=3):
+    best = None
+    value = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<34} {best * 1000:10.1f} ms")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark get_aois_for_analysis")
+    parser.add_argument('--aois', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    db_manager = DatabaseManager(f'sqlite:///{path}')
+    db_manager.create_tables()
+
+    print(f"🌱 Seeding {args.aois} AOIs / {args.users} users ...")
+    seed(db_manager, args.aois, args.users)
+
+    legacy = timed("legacy (N+1, coalesce)", lambda: legacy_get_aois_for_analysis(db_manager), runs=1)
+    current = timed("joined + ix_aoi_due (all)", db_manager.get_aois_for_analysis)
+    timed(f"first keyset batch ({args.batch_size})",
+          lambda: next(db_manager.iter_aois_for_analysis(batch_size=args.batch_size), []))
+
+    assert sorted(legacy) == sorted(aoi['aoi_id'] for aoi in current), "result sets differ"
+    print(f"✅ {len(current)} due AOIs, identical result sets")
+
+
+if __name__ == '__main__':
+    main()
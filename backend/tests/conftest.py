@@ -0,0 +1,80 @@
+"""
+Shared fixtures for the backend tests
+
+Database tests get a DatabaseManager over a temporary SQLite file with the
+tables created. Tests that are safe to run against a shared database (they
+use unique keys and do not count whole tables) can ask for TEST_DATABASE_URL
+instead, e.g. a scratch PostgreSQL database.
+
+    python -m pytest tests/test_bulk_tokens.py
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+# Threads share SQLite managers in the concurrency tests; wait on the write lock instead of failing
+SQLITE_ENGINE_OPTIONS = {'connect_args': {'timeout': 60, 'check_same_thread': False}}
+
+
+def dispose_db_manager(db_manager):
+    """Close the manager's connections (primary and replicas)"""
+    if db_manager.activity_sink is not None:
+        db_manager.activity_sink.close()
+    db_manager.engine.dispose()
+    if db_manager.replicas is not None:
+        for replica in db_manager.replicas.replicas:
+            replica.engine.dispose()
+
+
+@pytest.fixture(scope='module')
+def make_db_manager():
+    """
+    Factory for DatabaseManagers with the tables created, cleaned up after the module.
+
+    make_db_manager(engine_options=None, replica_urls=None, use_test_database=False):
+    engine_options apply to TEST_DATABASE_URL only (SQLite gets SQLITE_ENGINE_OPTIONS).
+    Module-scoped so seeded datasets can be shared by a module's tests.
+    """
+    directory = tempfile.mkdtemp()
+    managers = []
+
+    def make(engine_options=None, replica_urls=None, use_test_database=False):
+        database_url = os.getenv('TEST_DATABASE_URL') if use_test_database else None
+        if database_url:
+            db_manager = DatabaseManager(database_url, engine_options, replica_urls)
+        else:
+            path = os.path.join(directory, f'test_{len(managers)}.db')
+            db_manager = DatabaseManager(f'sqlite:///{path}', SQLITE_ENGINE_OPTIONS, replica_urls)
+        db_manager.create_tables()
+        managers.append(db_manager)
+        return db_manager
+
+    yield make
+
+    for db_manager in managers:
+        dispose_db_manager(db_manager)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def db_manager(make_db_manager):
+    """Fresh SQLite-backed DatabaseManager for one test"""
+    return make_db_manager()
+
+
+@pytest.fixture
+def shared_db_manager(db_manager, monkeypatch):
+    """db_manager installed as this process's shared manager (what `from shared_db import db_manager` uses)"""
+    import shared_db
+
+    monkeypatch.setattr(shared_db, '_manager', db_manager)
+    monkeypatch.setattr(shared_db, '_manager_pid', os.getpid())
+    return db_manager
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the buffered activity sink: rows are written when a batch fills,
+when the flush interval passes and at shutdown, and only for transactions
+that commit. Latency is measured separately by benchmark_activity_sink.py.
+
+    python -m pytest tests/test_activity_sink.py
+"""
+import time
+
+import pytest
+
+from models import User, UserActivity
+from services.activity_service import ActivitySink
+
+
+def stored(db_manager):
+    with db_manager.get_session() as session:
+        return [row.activity_type for row in session.query(UserActivity).order_by(UserActivity.id)]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def user_id(db_manager):
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='sink_user', email='sink@example.com', tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        return user.id
+
+
+@pytest.fixture
+def make_sink(db_manager):
+    sinks = []
+
+    def make(**options):
+        sink = ActivitySink(db_manager.engine, **options)
+        sinks.append(sink)
+        return sink
+
+    yield make
+    for sink in sinks:
+        sink.close()
+
+
+def test_full_batch_is_flushed_at_once(db_manager, user_id, make_sink):
+    sink = make_sink(batch_size=5, flush_interval=60)
+    for n in range(4):
+        sink.record(user_id, f'event-{n}')
+    time.sleep(0.1)
+    assert stored(db_manager) == []
+
+    sink.record(user_id, 'event-4')
+    assert wait_for(lambda: len(stored(db_manager)) == 5)
+    assert stored(db_manager) == [f'event-{n}' for n in range(5)]
+    assert sink.get_metrics()['batches'] == 1
+
+
+def test_partial_batch_is_flushed_on_the_interval(db_manager, user_id, make_sink):
+    sink = make_sink(batch_size=1000, flush_interval=0.05)
+    sink.record(user_id, 'login')
+    assert wait_for(lambda: stored(db_manager) == ['login'])
+    assert sink.get_metrics()['buffered'] == 0
+
+
+def test_close_flushes_what_is_left(db_manager, user_id, make_sink):
+    sink = make_sink(batch_size=1000, flush_interval=60)
+    for n in range(3):
+        sink.record(user_id, f'event-{n}')
+    assert stored(db_manager) == []
+
+    sink.close()
+    assert stored(db_manager) == ['event-0', 'event-1', 'event-2']
+    metrics = sink.get_metrics()
+    assert (metrics['recorded'], metrics['written'], metrics['buffered']) == (3, 3, 0)
+
+
+def test_full_buffer_drops_the_oldest(db_manager, user_id, make_sink):
+    sink = make_sink(batch_size=1000, flush_interval=60, max_buffer=2)
+    for n in range(4):
+        sink.record(user_id, f'event-{n}')
+
+    sink.close()
+    assert stored(db_manager) == ['event-2', 'event-3']
+    assert sink.get_metrics()['dropped'] == 2
+
+
+def test_only_committed_activity_reaches_the_sink(db_manager, user_id):
+    assert db_manager.activity_sink is not None
+
+    with pytest.raises(RuntimeError):
+        with db_manager.get_session() as session:
+            db_manager._add_activity(session, user_id, 'rolled_back', {})
+            raise RuntimeError("request failed")
+
+    with db_manager.get_session() as session:
+        db_manager._add_activity(session, user_id, 'committed', {'n': 1})
+        assert db_manager.activity_sink.get_metrics()['recorded'] == 0
+
+    db_manager.activity_sink.close()
+    assert stored(db_manager) == ['committed']
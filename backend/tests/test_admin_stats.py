@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-query admin statistics and their snapshot cache
+
+    python -m pytest tests/test_admin_stats.py
+"""
+import time
+import threading
+
+import pytest
+
+from models import User, AreaOfInterest, AnalysisHistory
+from services.snapshot_cache import SnapshotCache
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    """Two users (one admin), two AOIs (one paused) and one analysis"""
+    with db_manager.get_session() as session:
+        admin = User(clerk_user_id='admin', email='admin@example.com', role='admin',
+                     tokens_remaining=3, total_tokens_used=2)
+        user = User(clerk_user_id='user', email='user@example.com', tokens_remaining=4, total_tokens_used=1)
+        session.add_all([admin, user])
+        session.flush()
+        session.add_all([
+            AreaOfInterest(user_id=user.id, name='Active', bbox_coordinates=[0, 0, 1, 1], is_active=True),
+            AreaOfInterest(user_id=user.id, name='Paused', bbox_coordinates=[0, 0, 1, 1], is_active=False),
+            AnalysisHistory(user_id=user.id, process_id='p1', operation_name='test')
+        ])
+    return db_manager
+
+
+def test_stats_counts(db_manager):
+    stats = db_manager.get_admin_stats()
+    assert stats['users'] == {'total': 2, 'admins': 1, 'recent_7_days': 2}
+    assert stats['aois'] == {'total': 2, 'active': 1, 'recent_7_days': 2}
+    assert stats['analyses'] == {'total': 1, 'archived': 0, 'recent_7_days': 1}
+    assert stats['tokens'] == {'total_used': 3, 'total_remaining': 7}
+
+
+def test_stats_are_cached_until_refresh(db_manager):
+    assert db_manager.get_admin_stats()['users']['total'] == 2
+    with db_manager.get_session() as session:
+        session.add(User(clerk_user_id='late', email='late@example.com', tokens_remaining=0, total_tokens_used=0))
+
+    assert db_manager.get_admin_stats()['users']['total'] == 2
+    assert db_manager.get_admin_stats(refresh=True)['users']['total'] == 3
+
+
+def test_background_refresh_serves_stale_snapshot():
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return len(calls)
+
+    cache = SnapshotCache(loader, ttl=0.5, background=True)
+    assert cache.get() == 1
+    time.sleep(0.6)
+    assert cache.get() == 1, "stale snapshot should be served while refreshing"
+    assert cache.get() == 1
+    release.set()
+    time.sleep(0.2)
+    assert cache.get() == 2
+    assert len(calls) == 2, "only one refresh should run"
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests for admission control of synchronous analyses: per-user and global
+limits, the bounded wait queue, 429 responses with Retry-After, and slots
+being released when the analysis fails.
+
+    python -m pytest tests/test_admission.py
+"""
+import time
+import threading
+
+import pytest
+from flask import Flask, request
+
+from services import admission_service
+from services.admission_service import AdmissionController, AdmissionRejected
+from utils.decorators import admission_controlled, handle_errors
+
+
+def hold_slot(controller, user_id):
+    """Admit user_id in a thread and keep the slot until the returned event is set"""
+    admitted, release = threading.Event(), threading.Event()
+
+    def run():
+        with controller.admit(user_id):
+            admitted.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert admitted.wait(5)
+    return release, thread
+
+
+def hold_slot_after_wait(controller, user_id):
+    """Like hold_slot, for a request that has to queue: returns once it is waiting"""
+    admitted, release = threading.Event(), threading.Event()
+
+    def run():
+        with controller.admit(user_id):
+            admitted.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    for _ in range(500):
+        if controller.get_metrics()['waiting'] == 1:
+            break
+        time.sleep(0.01)
+    assert controller.get_metrics()['waiting'] == 1
+    assert not admitted.is_set()
+    return release, thread
+
+
+def test_user_may_hold_only_their_share():
+    controller = AdmissionController(max_concurrent=4, max_per_user=1)
+    release, thread = hold_slot(controller, 'alice')
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        with controller.admit('alice'):
+            pass
+    assert rejected.value.code == 'USER_CONCURRENCY_LIMIT'
+    assert rejected.value.retry_after >= 1
+
+    with controller.admit('bob'):
+        assert controller.get_metrics()['in_flight'] == 2
+
+    release.set()
+    thread.join()
+    assert controller.get_metrics()['rejected_user_limit'] == 1
+
+
+def test_full_queue_is_rejected_at_once():
+    controller = AdmissionController(max_concurrent=1, max_per_user=1, max_waiting=0)
+    release, thread = hold_slot(controller, 'alice')
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        with controller.admit('bob'):
+            pass
+    assert rejected.value.code == 'OVERLOADED'
+
+    release.set()
+    thread.join()
+    metrics = controller.get_metrics()
+    assert (metrics['in_flight'], metrics['active_users'], metrics['rejected_queue_full']) == (0, 0, 1)
+
+    # bob's reservation was given back along with the rejection
+    with controller.admit('bob'):
+        pass
+
+
+def test_waiting_request_gets_the_freed_slot():
+    controller = AdmissionController(max_concurrent=1, max_per_user=1, max_waiting=1, wait_timeout=5)
+    release, thread = hold_slot(controller, 'alice')
+    waiter_release, waiter = hold_slot_after_wait(controller, 'bob')
+
+    release.set()
+    thread.join()
+    waiter_release.set()
+    waiter.join()
+    metrics = controller.get_metrics()
+    assert (metrics['admitted'], metrics['admitted_after_wait'], metrics['peak_waiting']) == (2, 1, 1)
+
+
+def test_wait_times_out():
+    controller = AdmissionController(max_concurrent=1, max_per_user=1, max_waiting=1, wait_timeout=0.05)
+    release, thread = hold_slot(controller, 'alice')
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        with controller.admit('bob'):
+            pass
+    assert rejected.value.code == 'OVERLOADED'
+
+    release.set()
+    thread.join()
+    metrics = controller.get_metrics()
+    assert (metrics['waiting'], metrics['active_users'], metrics['rejected_wait_timeout']) == (0, 0, 1)
+
+
+def test_failed_analysis_releases_its_slot():
+    controller = AdmissionController(max_concurrent=1, max_per_user=1, max_waiting=0)
+
+    with pytest.raises(RuntimeError):
+        with controller.admit('alice'):
+            raise RuntimeError("download failed")
+
+    metrics = controller.get_metrics()
+    assert (metrics['in_flight'], metrics['active_users']) == (0, 0)
+    assert metrics['avg_duration_ms'] is not None
+    with controller.admit('alice'):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """App with one admission-controlled endpoint; ?fail=1 makes the analysis raise"""
+    controller = AdmissionController(max_concurrent=1, max_per_user=1, max_waiting=0)
+    monkeypatch.setattr(admission_service, 'admission_controller', controller)
+
+    @admission_controlled
+    def analyse():
+        if request.args.get('fail'):
+            raise RuntimeError("pipeline crashed")
+        return {'in_flight': controller.get_metrics()['in_flight']}
+
+    app = Flask(__name__)
+
+    @app.route('/analyse/<int:user_id>')
+    @handle_errors
+    def endpoint(user_id):
+        request.user = {'id': user_id}
+        return analyse()
+
+    app.controller = controller
+    return app.test_client()
+
+
+def test_overloaded_endpoint_answers_429_with_retry_after(client):
+    release, thread = hold_slot(client.application.controller, 2)
+
+    response = client.get('/analyse/1')
+    assert response.status_code == 429
+    assert response.get_json()['code'] == 'OVERLOADED'
+    retry_after = int(response.headers['Retry-After'])
+    assert retry_after >= 1
+    assert response.get_json()['details'] == {'retry_after': retry_after}
+
+    release.set()
+    thread.join()
+    assert client.get('/analyse/1').get_json() == {'in_flight': 1}
+
+
+def test_endpoint_error_releases_the_slot(client):
+    assert client.get('/analyse/1?fail=1').status_code == 500
+    assert client.application.controller.get_metrics()['in_flight'] == 0
+    assert client.get('/analyse/1').status_code == 200
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Tests for async analysis jobs: submitting with ?async=true, polling the job
+status, and the token debit that commits together with the saved analysis
+(a failed job leaves the balance unchanged).
+
+The satellite service is a stub and the Celery task is run eagerly.
+
+    python -m pytest tests/test_analysis_jobs.py
+"""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import tasks
+from controllers.analysis_controller import analysis_bp
+from controllers.job_controller import job_bp
+from models import User, AreaOfInterest, AnalysisHistory, AnalysisJob, TokenTransaction
+from services.analysis_service import AnalysisPipeline
+from utils import decorators
+
+
+class StubSatelliteService:
+    """Images are plain strings; download_fails makes every download fail"""
+
+    def __init__(self):
+        self.download_fails = False
+
+    def download_image(self, bbox, date_from, date_to):
+        return None if self.download_fails else f'image {date_from}'
+
+    def load_baseline_image(self, filename):
+        return 'baseline image'
+
+    def save_image(self, image, filename, aoi_id=None):
+        return {'local_path': filename, 's3_key': None}
+
+    def create_heatmap(self, image1, image2, path, aoi_id=None):
+        return {'local_path': path, 's3_key': None}
+
+    def calculate_change_percentage(self, image1, image2):
+        return 4.25
+
+
+class StubServices:
+    def __init__(self, satellite_service):
+        self.satellite_service = satellite_service
+
+    def new_pipeline(self, on_stage=None):
+        return AnalysisPipeline(self.satellite_service, on_stage=on_stage)
+
+
+@pytest.fixture
+def api(shared_db_manager, monkeypatch):
+    """Test client authenticated as a user with 5 tokens and an AOI with a completed baseline"""
+    db_manager = shared_db_manager
+    clerk_user_id = f'job_user_{uuid.uuid4().hex}'
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id=clerk_user_id, email='jobs@example.com', tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        aoi = AreaOfInterest(user_id=user.id, name='Port', bbox_coordinates=[34.0, 31.0, 34.1, 31.1],
+                             is_active=True, baseline_status='completed', baseline_image_filename='baseline.jpg')
+        session.add(aoi)
+        session.flush()
+        user_id, aoi_id = user.id, aoi.id
+
+    monkeypatch.setattr(decorators.clerk_auth, 'verify_token',
+                        lambda token: {'sub': clerk_user_id, 'email': 'jobs@example.com'})
+
+    satellite_service = StubSatelliteService()
+    monkeypatch.setattr(tasks, 'get_worker_services', lambda _: StubServices(satellite_service))
+    queued = []
+    monkeypatch.setattr(tasks.run_analysis_job, 'apply_async',
+                        lambda args, task_id: queued.append(task_id))
+
+    app = Flask(__name__)
+    app.register_blueprint(analysis_bp)
+    app.register_blueprint(job_bp)
+    app.satellite_service = satellite_service
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = 'Bearer test-token'
+
+    return SimpleNamespace(client=client, db_manager=db_manager, satellite_service=satellite_service,
+                           queued=queued, user_id=user_id, aoi_id=aoi_id)
+
+
+def submit(api):
+    response = api.client.post(f'/api/aoi/{api.aoi_id}/run-analysis?async=true', json={})
+    return response.status_code, response.get_json()
+
+
+def poll(api, job_id):
+    response = api.client.get(f'/api/jobs/{job_id}')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']['job']
+
+
+def run_job(job_id):
+    return tasks.run_analysis_job.apply(args=[job_id], task_id=job_id).get()
+
+
+def balance(api):
+    with api.db_manager.get_session() as session:
+        user = session.query(User).filter_by(id=api.user_id).first()
+        transactions = session.query(TokenTransaction).filter_by(user_id=api.user_id).count()
+        analyses = session.query(AnalysisHistory).filter_by(user_id=api.user_id).count()
+        return user.tokens_remaining, transactions, analyses
+
+
+def test_submit_poll_and_complete(api):
+    status_code, body = submit(api)
+    assert status_code == 202, body
+    job_id = body['data']['job_id']
+    assert api.queued == [job_id]
+    assert body['data']['status_url'] == f'/api/jobs/{job_id}'
+
+    # Nothing is charged while the job waits in the queue
+    assert poll(api, job_id)['status'] == 'queued'
+    assert balance(api) == (5, 0, 0)
+
+    assert run_job(job_id)['success']
+
+    job = poll(api, job_id)
+    assert job['status'] == 'completed'
+    assert job['tokens_used'] == 1
+    assert job['result']['change_percentage'] == 4.25
+    assert 'params' not in job
+    assert {'download', 'save_images', 'heatmap', 'change_detection', 'persist'} <= set(job['stage_timings'])
+
+    # One token debited, with its ledger row, next to the saved analysis
+    assert balance(api) == (4, 1, 1)
+    with api.db_manager.get_session() as session:
+        analysis = session.query(AnalysisHistory).filter_by(id=job['analysis_id']).first()
+        assert analysis.meta['job_id'] == job_id
+        assert analysis.tokens_used == 1
+
+
+def test_failed_pipeline_leaves_balance_unchanged(api):
+    api.satellite_service.download_fails = True
+    job_id = submit(api)[1]['data']['job_id']
+
+    assert not run_job(job_id)['success']
+
+    job = poll(api, job_id)
+    assert job['status'] == 'failed'
+    assert job['error_code'] == 'DOWNLOAD_ERROR'
+    assert balance(api) == (5, 0, 0)
+
+
+def test_failed_save_rolls_back_the_debit(api, monkeypatch):
+    def failing_insert(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(api.db_manager, '_insert_analysis', failing_insert)
+    job_id = submit(api)[1]['data']['job_id']
+
+    assert not run_job(job_id)['success']
+
+    job = poll(api, job_id)
+    assert job['status'] == 'failed'
+    assert job['error_code'] == 'INTERNAL_ERROR'
+    assert balance(api) == (5, 0, 0)
+
+
+def test_out_of_tokens_is_rejected_before_queueing(api):
+    with api.db_manager.get_session() as session:
+        session.query(User).filter_by(id=api.user_id).update({'tokens_remaining': 0})
+
+    status_code, body = submit(api)
+    assert status_code == 400
+    assert body['code'] == 'INSUFFICIENT_TOKENS'
+    assert api.queued == []
+
+
+def test_unavailable_queue_fails_the_job(api, monkeypatch):
+    def broker_down(args, task_id):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(tasks.run_analysis_job, 'apply_async', broker_down)
+
+    status_code, body = submit(api)
+    assert status_code == 503
+    assert body['code'] == 'QUEUE_UNAVAILABLE'
+    with api.db_manager.get_session() as session:
+        job = session.query(AnalysisJob).filter_by(user_id=api.user_id).one()
+        assert (job.status, job.error_code) == ('failed', 'QUEUE_UNAVAILABLE')
+    assert balance(api) == (5, 0, 0)
@@ -0,0 +1,67 @@
+"""
+Tests for DatabaseManager.update_aoi_analysis_date, which moves an AOI to its
+next run after an automatic analysis (or a failed attempt)
+
+    python -m pytest tests/test_aoi_analysis_date.py
+"""
+from datetime import datetime, timedelta
+
+from models import User, AreaOfInterest
+from services.schedule_slots import following_slot
+
+
+def add_due_aoi(db_manager, frequency, next_run_at=None):
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id=f'auto_{frequency}', email=f'{frequency}@example.com',
+                    tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        aoi = AreaOfInterest(user_id=user.id, name=f'AOI {frequency}', bbox_coordinates=[0, 0, 1, 1],
+                             monitoring_frequency=frequency, is_active=True, baseline_status='completed',
+                             next_run_at=next_run_at)
+        session.add(aoi)
+        session.flush()
+        return aoi.id
+
+
+def load(db_manager, aoi_id):
+    with db_manager.get_session() as session:
+        aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
+        return aoi.monitoring_frequency, aoi.next_run_at
+
+
+def due_ids(db_manager):
+    return [aoi['aoi_id'] for batch in db_manager.iter_aois_for_analysis() for aoi in batch]
+
+
+def test_once_is_disabled_after_its_run(db_manager):
+    aoi_id = add_due_aoi(db_manager, 'once')
+    assert due_ids(db_manager) == [aoi_id]
+
+    db_manager.update_aoi_analysis_date(aoi_id, increment_total=True)
+
+    assert load(db_manager, aoi_id) == (None, None)
+    assert due_ids(db_manager) == []
+
+
+def test_recurring_moves_to_following_slot(db_manager):
+    run_at = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=5)
+    aoi_id = add_due_aoi(db_manager, 'daily', run_at)
+
+    db_manager.update_aoi_analysis_date(aoi_id)
+
+    frequency, next_run_at = load(db_manager, aoi_id)
+    assert frequency == 'daily'
+    assert next_run_at == following_slot(aoi_id, 'daily', run_at)
+    assert due_ids(db_manager) == []
+
+
+def test_frequency_without_interval_recurs_weekly(db_manager):
+    aoi_id = add_due_aoi(db_manager, 'none')
+
+    db_manager.update_aoi_analysis_date(aoi_id)
+
+    frequency, next_run_at = load(db_manager, aoi_id)
+    assert frequency == 'none'
+    assert datetime.utcnow() < next_run_at <= datetime.utcnow() + timedelta(days=7)
+    assert due_ids(db_manager) == []
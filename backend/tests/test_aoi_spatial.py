@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the AOI spatial queries (B-tree path), checked against brute force
+
+    python -m pytest tests/test_aoi_spatial.py
+"""
+import random
+
+import pytest
+
+from models import User, AreaOfInterest
+from utils.bbox import point_bbox_distance_km, tile_bbox, bbox_tiles
+
+@pytest.fixture(scope='module')
+def seeded_db(make_db_manager):
+    """200 random AOI boxes around the Mediterranean, a few of them inactive (built once per module)"""
+    db_manager = make_db_manager()
+    rng = random.Random(7)
+    boxes = {}
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='spatial_user', email='spatial@example.com', tokens_remaining=10, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        for n in range(200):
+            lon, lat = rng.uniform(-5, 35), rng.uniform(30, 45)
+            width, height = rng.uniform(0.01, 1.5), rng.uniform(0.01, 1.0)
+            aoi = AreaOfInterest(user_id=user.id, name=f'AOI {n}', is_active=n % 10 != 0,
+                                 bbox_coordinates=[lon, lat, lon + width, lat + height])
+            session.add(aoi)
+            session.flush()
+            boxes[aoi.id] = (lon, lat, lon + width, lat + height, aoi.is_active)
+
+    return db_manager, boxes
+
+
+def brute_force(boxes, bbox, mode, active_only=True):
+    q_min_lon, q_min_lat, q_max_lon, q_max_lat = bbox
+    matches = []
+    for aoi_id, (min_lon, min_lat, max_lon, max_lat, active) in sorted(boxes.items()):
+        if active_only and not active:
+            continue
+        if mode == 'intersects':
+            hit = min_lon <= q_max_lon and max_lon >= q_min_lon and min_lat <= q_max_lat and max_lat >= q_min_lat
+        elif mode == 'contains':
+            hit = min_lon <= q_min_lon and max_lon >= q_max_lon and min_lat <= q_min_lat and max_lat >= q_max_lat
+        else:
+            hit = min_lon >= q_min_lon and max_lon <= q_max_lon and min_lat >= q_min_lat and max_lat <= q_max_lat
+        if hit:
+            matches.append(aoi_id)
+    return matches
+
+
+def test_bbox_modes_match_brute_force(seeded_db):
+    db_manager, boxes = seeded_db
+    assert db_manager.spatial_backend() == 'btree'
+    rng = random.Random(11)
+    for _ in range(30):
+        lon, lat = rng.uniform(-5, 35), rng.uniform(30, 45)
+        for bbox in ((lon, lat, lon + rng.uniform(0.5, 6), lat + rng.uniform(0.5, 4)), (lon, lat, lon, lat)):
+            for mode in db_manager.SPATIAL_MODES:
+                found = [aoi['id'] for aoi in db_manager.find_aois_by_bbox(bbox, mode=mode)]
+                assert found == brute_force(boxes, bbox, mode), (bbox, mode)
+
+    everything = (-180, -90, 180, 90)
+    assert len(db_manager.find_aois_by_bbox(everything, active_only=False, limit=1000)) == 200
+    assert len(db_manager.find_aois_by_bbox(everything, limit=1000)) == 180
+
+
+def test_nearest_matches_brute_force(seeded_db):
+    db_manager, boxes = seeded_db
+    rng = random.Random(3)
+    for lon, lat in [(rng.uniform(-20, 50), rng.uniform(20, 55)) for _ in range(15)] + [(-120.0, -40.0)]:
+        found = db_manager.nearest_aois(lon, lat, k=5)
+        expected = sorted(
+            (point_bbox_distance_km(lon, lat, box[:4]), aoi_id) for aoi_id, box in boxes.items() if box[4]
+        )[:5]
+        assert [aoi['id'] for aoi in found] == [aoi_id for _, aoi_id in expected], (lon, lat)
+        assert abs(found[-1]['distance_km'] - expected[-1][0]) < 1e-2
+
+
+def test_tiles(seeded_db):
+    min_lon, min_lat, max_lon, max_lat = tile_bbox(3, 4, 2)
+    assert (min_lon, max_lon) == (0.0, 45.0) and 40.9 < min_lat < 41.0 and 66.5 < max_lat < 66.6
+    assert bbox_tiles((1.0, 45.0, 2.0, 46.0), 3) == [(3, 4, 2)]
+
+    db_manager, boxes = seeded_db
+    groups = db_manager.get_aoi_tile_groups(4)
+    for tile, ids in groups.items():
+        z, x, y = (int(part) for part in tile.split('/'))
+        assert sorted(ids) == brute_force(boxes, tile_bbox(z, x, y), 'intersects'), tile
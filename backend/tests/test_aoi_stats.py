@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the aoi_stats summary maintained by save_analysis
+
+    python -m pytest tests/test_aoi_stats.py
+"""
+from models import User, AOIStats, AnalysisHistory
+from migrate_aoi_stats import summarize
+
+
+def add_user_and_aoi(db_manager):
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='stats_user', email='stats@example.com', tokens_remaining=10, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        user_id = user.id
+    aoi_id = db_manager.create_aoi(user_id, {'name': 'Harbor', 'bbox_coordinates': [0, 0, 1, 1]})
+    return user_id, aoi_id
+
+
+def save(db_manager, user_id, aoi_id, n, change_percentage, tokens_used=1):
+    return db_manager.save_analysis(
+        user_id, aoi_id, f'process-{n}', 'test', 'Harbor', [0, 0, 1, 1],
+        {}, {}, change_percentage=change_percentage, tokens_used=tokens_used
+    )
+
+
+def test_dashboard_reads_maintained_stats(db_manager):
+    user_id, aoi_id = add_user_and_aoi(db_manager)
+    assert db_manager.get_aoi_dashboard(aoi_id, user_id)['statistics']['total_analyses'] == 0
+
+    for n, (change, tokens) in enumerate([(10.0, 1), (None, 2), (20.0, 1), (40.0, 3)]):
+        last_id = save(db_manager, user_id, aoi_id, n, change, tokens)
+
+    statistics = db_manager.get_aoi_dashboard(aoi_id, user_id)['statistics']
+    assert statistics['total_analyses'] == 4
+    assert statistics['total_tokens_used'] == 7
+    assert statistics['last_analysis_id'] == last_id
+    assert statistics['last_change_percentage'] == 40.0
+    assert abs(statistics['avg_change_percentage'] - 70.0 / 3) < 1e-9
+
+    view = db_manager.get_aoi_dashboard_view(aoi_id, user_id)
+    assert view['statistics']['total_analyses'] == 4
+    assert view['statistics']['monitoring_status'] == 'active'
+    assert len(view['recent_analyses']) == 4
+
+
+def test_incremental_stats_match_backfill(db_manager):
+    user_id, aoi_id = add_user_and_aoi(db_manager)
+    for n, change in enumerate([5.0, 12.5, None, 3.0, 30.0]):
+        save(db_manager, user_id, aoi_id, n, change)
+
+    with db_manager.get_session() as session:
+        maintained = session.get(AOIStats, aoi_id).to_dict()
+        history = session.query(
+            AnalysisHistory.id, AnalysisHistory.analysis_timestamp,
+            AnalysisHistory.tokens_used, AnalysisHistory.change_percentage
+        ).filter_by(aoi_id=aoi_id).order_by(AnalysisHistory.analysis_timestamp, AnalysisHistory.id).all()
+
+    backfilled = AOIStats(**summarize(aoi_id, history)).to_dict()
+    for key, value in backfilled.items():
+        if isinstance(value, float):
+            assert abs(maintained[key] - value) < 1e-9, key
+        elif key != 'last_analysis_at':
+            assert maintained[key] == value, key
+
+
+def test_missing_stats_row_is_created(db_manager):
+    user_id, aoi_id = add_user_and_aoi(db_manager)
+    with db_manager.get_session() as session:
+        session.query(AOIStats).filter_by(aoi_id=aoi_id).delete()
+
+    save(db_manager, user_id, aoi_id, 1, 15.0)
+    statistics = db_manager.get_aoi_dashboard(aoi_id, user_id)['statistics']
+    assert statistics['total_analyses'] == 1
+    assert statistics['rolling_change_percentage'] == 15.0
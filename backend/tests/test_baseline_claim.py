@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the baseline claim: only one process builds a pending baseline, and
+only stale 'processing' claims are reset
+
+    python -m pytest tests/test_baseline_claim.py
+"""
+from datetime import datetime, timedelta
+
+from models import User, AreaOfInterest
+
+
+class RacingProcessor:
+    """Satellite stub: while 'downloading', a second process tries the same baseline"""
+
+    def __init__(self, db_manager, aoi_id):
+        self.db_manager = db_manager
+        self.aoi_id = aoi_id
+        self.downloads = 0
+        self.second_attempt = 'not run'
+
+    def download_image(self, bbox, date_from, date_to):
+        self.downloads += 1
+        self.second_attempt = self.db_manager.create_baseline_image(self.aoi_id, self)
+        return None
+
+
+def add_aois(db_manager, statuses):
+    aoi_ids = []
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='baseline_user', email='baseline@example.com', tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        for status, started_at in statuses:
+            aoi = AreaOfInterest(user_id=user.id, name=f'AOI {status}', bbox_coordinates=[34.0, 31.0, 34.1, 31.1],
+                                 baseline_status=status, baseline_started_at=started_at)
+            session.add(aoi)
+            session.flush()
+            aoi_ids.append(aoi.id)
+    return aoi_ids
+
+
+def statuses(db_manager, aoi_ids):
+    with db_manager.get_session() as session:
+        return [session.query(AreaOfInterest).filter_by(id=aoi_id).first().baseline_status for aoi_id in aoi_ids]
+
+
+def test_only_one_claim_wins(db_manager):
+    aoi_id, = add_aois(db_manager, [('pending', None)])
+    processor = RacingProcessor(db_manager, aoi_id)
+
+    assert db_manager.create_baseline_image(aoi_id, processor) is False  # stub download fails
+    assert processor.downloads == 1
+    assert processor.second_attempt is None
+    assert statuses(db_manager, [aoi_id]) == ['failed']
+
+    # Rows that are not pending are never picked up again
+    assert db_manager.create_baseline_image(aoi_id, processor) is None
+    assert processor.downloads == 1
+
+
+def test_reset_only_stale_claims(db_manager):
+    now = datetime.utcnow()
+    aoi_ids = add_aois(db_manager, [
+        ('processing', now - timedelta(hours=2)),   # crashed long ago
+        ('processing', now - timedelta(minutes=1)),  # being built right now
+        ('processing', None),                        # claimed before started-at was recorded
+        ('completed', now - timedelta(hours=2)),
+    ])
+
+    assert db_manager.reset_stale_baselines(now - timedelta(minutes=30)) == 2
+    assert statuses(db_manager, aoi_ids) == ['pending', 'processing', 'pending', 'completed']
+
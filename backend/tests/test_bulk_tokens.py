@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk token grants (DatabaseManager.bulk_add_tokens)
+
+Checks that grants to the same email chain their balances in input order,
+that invalid rows and unknown emails are rejected per row without blocking
+the rest, and that every applied credit gets exactly one ledger row.
+
+Runs against TEST_DATABASE_URL (e.g. a scratch PostgreSQL database) when
+set, otherwise against a temporary SQLite file.
+
+    python -m pytest tests/test_bulk_tokens.py
+"""
+import os
+
+import pytest
+
+from models import User, TokenTransaction
+
+
+@pytest.fixture
+def db_manager(make_db_manager):
+    return make_db_manager(use_test_database=True)
+
+
+def create_user(db_manager, email, tokens):
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id=f'bulk_{os.urandom(6).hex()}', email=email,
+                    tokens_remaining=tokens, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        return user.id
+
+
+def balance(db_manager, user_id):
+    with db_manager.get_session() as session:
+        return session.query(User.tokens_remaining).filter_by(id=user_id).scalar()
+
+
+def ledger(db_manager, user_id):
+    with db_manager.get_session() as session:
+        return session.query(
+            TokenTransaction.id, TokenTransaction.amount, TokenTransaction.balance_before,
+            TokenTransaction.balance_after, TokenTransaction.transaction_type, TokenTransaction.admin_note
+        ).filter_by(user_id=user_id).order_by(TokenTransaction.balance_after).all()
+
+
+def test_repeated_emails_chain_balances(db_manager):
+    suffix = os.urandom(4).hex()
+    alice, bob = f'alice-{suffix}@example.com', f'bob-{suffix}@example.com'
+    alice_id = create_user(db_manager, alice, 5)
+    bob_id = create_user(db_manager, bob, 0)
+
+    outcomes = db_manager.bulk_add_tokens(
+        [{'email': alice, 'amount': 3}, {'email': bob, 'amount': 2}, {'email': alice, 'amount': 4}],
+        admin_note='bulk test'
+    )
+
+    assert [outcome['success'] for outcome in outcomes] == [True, True, True]
+    assert [(o['balance_before'], o['new_balance']) for o in outcomes] == [(5, 8), (0, 2), (8, 12)]
+    assert [o['row'] for o in outcomes] == [0, 1, 2]
+    assert balance(db_manager, alice_id) == 12 and balance(db_manager, bob_id) == 2
+
+    rows = ledger(db_manager, alice_id)
+    assert [(tx.amount, tx.balance_before, tx.balance_after) for tx in rows] == [(3, 5, 8), (4, 8, 12)]
+    assert {(tx.transaction_type, tx.admin_note) for tx in rows} == {('admin_grant', 'bulk test')}
+    assert [outcomes[0]['transaction_id'], outcomes[2]['transaction_id']] == [tx.id for tx in rows]
+
+
+def test_rejected_rows(db_manager):
+    email = f'carol-{os.urandom(4).hex()}@example.com'
+    user_id = create_user(db_manager, email, 1)
+
+    outcomes = db_manager.bulk_add_tokens([
+        {'email': 'nobody@example.com', 'amount': 5},
+        {'email': email, 'amount': 0},
+        {'email': email, 'amount': -3},
+        {'email': email, 'amount': '4'},
+        {'email': email, 'amount': True},
+        {'amount': 2},
+        {'email': email, 'amount': 2},
+    ])
+
+    assert [outcome.get('error') for outcome in outcomes] == [
+        'User not found',
+        'Amount must be a positive integer',
+        'Amount must be a positive integer',
+        'Amount must be a positive integer',
+        'Amount must be a positive integer',
+        'Email required',
+        None,
+    ]
+    assert [outcome['success'] for outcome in outcomes] == [False] * 6 + [True]
+    assert outcomes[5]['email'] == 'missing'
+    assert balance(db_manager, user_id) == 3
+    assert [(tx.amount, tx.balance_before, tx.balance_after) for tx in ledger(db_manager, user_id)] == [(2, 1, 3)]
+
+    # Nothing valid: nothing written
+    outcomes = db_manager.bulk_add_tokens([{'email': email, 'amount': 0}, {'email': 'nobody@example.com', 'amount': 1}])
+    assert not any(outcome['success'] for outcome in outcomes)
+    assert balance(db_manager, user_id) == 3 and len(ledger(db_manager, user_id)) == 1
+
+
+def test_one_ledger_row_per_credit(db_manager):
+    db_manager.BULK_GRANT_CHUNK = 3  # force several IN / UPDATE / INSERT chunks
+    suffix = os.urandom(4).hex()
+    users = {f'user{n}-{suffix}@example.com': create_user(db_manager, f'user{n}-{suffix}@example.com', n)
+             for n in range(10)}
+
+    grants = [{'email': email, 'amount': amount} for amount in (1, 2, 3) for email in users]
+    outcomes = db_manager.bulk_add_tokens(grants)
+    assert all(outcome['success'] for outcome in outcomes)
+
+    transaction_ids = set()
+    for n, (email, user_id) in enumerate(users.items()):
+        rows = ledger(db_manager, user_id)
+        assert [(tx.amount, tx.balance_before, tx.balance_after) for tx in rows] == \
+            [(1, n, n + 1), (2, n + 1, n + 3), (3, n + 3, n + 6)]
+        assert balance(db_manager, user_id) == n + 6
+        transaction_ids.update(tx.id for tx in rows)
+
+    assert {outcome['transaction_id'] for outcome in outcomes} == transaction_ids
+    assert len(transaction_ids) == len(grants)
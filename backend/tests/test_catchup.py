@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for catch-up after an outage: the sweeper paces overdue runs at
+CATCHUP_MAX_PER_MINUTE (most urgent first, ETAs spread across the sweep
+interval), defers the rest to later sweeps, and reports the backlog.
+
+    python -m pytest tests/test_catchup.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import tasks
+from config import Config
+from models import User, AreaOfInterest
+from services.schedule_slots import following_slot
+
+
+@pytest.fixture
+def backlog(db_manager, monkeypatch):
+    """
+    Sweeper over the test database pacing 6 overdue runs per 60-second sweep;
+    returns (add_aoi, published) where published holds (aoi_id, eta)
+    """
+    published = []
+    monkeypatch.setattr(tasks, 'db_manager', db_manager)
+    monkeypatch.setattr(Config, 'CATCHUP_MAX_PER_MINUTE', 6)
+    monkeypatch.setattr(Config, 'SCHEDULE_SWEEP_SECONDS', 60)
+    monkeypatch.setattr(tasks.run_scheduled_analysis, 'apply_async',
+                        lambda args, eta, task_id, priority: published.append((args[0], eta)))
+
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='catchup_user', email='catchup@example.com', tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        user_id = user.id
+
+    def add_aoi(minutes_overdue, priority='MEDIUM'):
+        run_at = datetime.utcnow() - timedelta(minutes=minutes_overdue)
+        with db_manager.get_session() as session:
+            aoi = AreaOfInterest(user_id=user_id, name=f'AOI {minutes_overdue}', priority=priority,
+                                 bbox_coordinates=[34.0, 31.0, 34.1, 31.1], monitoring_frequency='daily',
+                                 is_active=True, baseline_status='completed',
+                                 next_run_at=run_at, schedule_anchor_at=run_at)
+            session.add(aoi)
+            session.flush()
+            return aoi.id
+
+    return add_aoi, published
+
+
+def test_backlog_drains_at_the_configured_rate(backlog):
+    add_aoi, published = backlog
+    # Overdue by 1..15 minutes (under one aging window, so rank is the plain priority)
+    overdue = {minutes: add_aoi(minutes, 'HIGH' if minutes % 5 == 0 else 'LOW') for minutes in range(1, 16)}
+    most_urgent_first = [overdue[m] for m in (15, 10, 5)] + [overdue[m] for m in (14, 13, 12, 11, 9, 8, 7, 6, 4, 3, 2, 1)]
+
+    sweep_start = datetime.utcnow()
+    assert tasks.sweep_scheduled_analyses() == 6
+    assert [aoi_id for aoi_id, _ in published] == most_urgent_first[:6]
+
+    # The first run goes out now, the others 10 seconds apart across the sweep interval
+    etas = [eta for _, eta in published]
+    assert etas[0] is None
+    offsets = [(eta - sweep_start).total_seconds() for eta in etas[1:]]
+    for n, offset in enumerate(offsets, start=1):
+        assert 10 * n <= offset < 10 * n + 1
+
+    # Deferred runs go out on later sweeps; nothing is published twice
+    assert tasks.sweep_scheduled_analyses() == 6
+    assert tasks.sweep_scheduled_analyses() == 3
+    assert tasks.sweep_scheduled_analyses() == 0
+    assert [aoi_id for aoi_id, _ in published] == most_urgent_first
+
+
+def test_upcoming_runs_are_not_paced(db_manager, backlog):
+    add_aoi, published = backlog
+    overdue = [add_aoi(minutes) for minutes in range(1, 9)]
+    upcoming = [add_aoi(-minutes) for minutes in (10, 20)]  # due within the ETA horizon
+
+    # The six paced overdue runs use up the budget; upcoming runs are published anyway, at their own time
+    assert tasks.sweep_scheduled_analyses() == 8
+    etas = dict(published)
+    assert sum(aoi_id in etas for aoi_id in overdue) == 6
+    with db_manager.get_session() as session:
+        for aoi_id in upcoming:
+            assert etas[aoi_id] == session.query(AreaOfInterest.next_run_at).filter_by(id=aoi_id).scalar()
+
+
+def test_pacing_can_be_disabled(backlog, monkeypatch):
+    add_aoi, published = backlog
+    monkeypatch.setattr(Config, 'CATCHUP_MAX_PER_MINUTE', 0)
+    for minutes in range(1, 21):
+        add_aoi(minutes)
+
+    assert tasks.sweep_scheduled_analyses() == 20
+    assert all(eta is None for _, eta in published)
+
+
+def test_progress_reports_waiting_runs(db_manager, backlog):
+    add_aoi, published = backlog
+    for minutes in range(1, 16):
+        add_aoi(minutes, 'HIGH' if minutes <= 3 else 'LOW')
+    add_aoi(-30)  # not overdue
+
+    tasks.sweep_scheduled_analyses()
+    progress = db_manager.get_catchup_progress()
+    assert progress['active']
+    assert (progress['overdue'], progress['dispatched'], progress['waiting']) == (15, 6, 9)
+    assert progress['by_priority'] == {'HIGH': 3, 'LOW': 12}
+    assert progress['estimated_minutes_remaining'] == 1.5
+    assert 15 * 60 <= progress['oldest_overdue_seconds'] < 16 * 60
+
+    tasks.sweep_scheduled_analyses()
+    tasks.sweep_scheduled_analyses()
+    progress = db_manager.get_catchup_progress()
+    assert not progress['active']
+    assert progress['estimated_minutes_remaining'] == 0
+
+
+def test_missed_slots_collapse_or_replay():
+    anchor = datetime(2024, 1, 1, 6, 0)
+    missed = datetime.utcnow().replace(microsecond=0) - timedelta(days=3, hours=1)
+    previous = anchor + (missed - anchor) // timedelta(days=1) * timedelta(days=1)
+
+    collapsed = following_slot(1, 'daily', previous, anchor, collapse=True)
+    assert datetime.utcnow() < collapsed <= datetime.utcnow() + timedelta(days=1)
+
+    replayed = following_slot(1, 'daily', previous, anchor, collapse=False)
+    assert replayed == previous + timedelta(days=1) < datetime.utcnow()
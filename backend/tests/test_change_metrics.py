@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the aoi_change_metrics series and its bucketed queries
+
+    python -m pytest tests/test_change_metrics.py
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from models import User, AOIChangeMetric
+from services.analysis_service import AnalysisPipeline
+
+
+def add_user_and_aoi(db_manager):
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='metrics_user', email='metrics@example.com', tokens_remaining=10, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        user_id = user.id
+    aoi_id = db_manager.create_aoi(user_id, {'name': 'Harbor', 'bbox_coordinates': [0, 0, 1, 1]})
+    return user_id, aoi_id
+
+
+def seed_points(db_manager, aoi_id, points):
+    """points: (measured_at, overall_change, cloud_coverage)"""
+    with db_manager.engine.begin() as connection:
+        connection.execute(insert(AOIChangeMetric.__table__), [
+            {'aoi_id': aoi_id, 'measured_at': measured_at, 'overall_change': overall, 'cloud_coverage': cloud}
+            for measured_at, overall, cloud in points
+        ])
+
+
+def test_save_analysis_appends_point(db_manager):
+    user_id, aoi_id = add_user_and_aoi(db_manager)
+    analysis_id = db_manager.save_analysis(
+        user_id, aoi_id, 'process-1', 'test', 'Harbor', [0, 0, 1, 1], {}, {},
+        change_percentage=12.5,
+        change_metrics={'overall_change': 12.5, 'color_change': 4.0, 'cloud_coverage': 30.0,
+                        'usable_area_percent': 70.0, 'analysis_quality': 'medium'}
+    )
+    db_manager.save_analysis(user_id, aoi_id, 'process-2', 'test', 'Harbor', [0, 0, 1, 1], {}, {})
+
+    raw = db_manager.get_aoi_change_metrics(aoi_id, user_id, bucket='raw')
+    assert len(raw['series']) == 1, "analyses without measurements add no point"
+    point = raw['series'][0]
+    assert point['overall_change'] == 12.5 and point['cloud_coverage'] == 30.0
+    assert point['structural_change'] is None
+    with db_manager.get_session() as session:
+        assert session.query(AOIChangeMetric.analysis_id).scalar() == analysis_id
+
+
+def test_daily_and_weekly_buckets(db_manager):
+    user_id, aoi_id = add_user_and_aoi(db_manager)
+    monday = datetime(2024, 3, 4)
+    seed_points(db_manager, aoi_id, [
+        (monday + timedelta(hours=1), 10.0, 5.0),
+        (monday + timedelta(hours=9), 20.0, 15.0),
+        (monday + timedelta(days=2), 40.0, None),
+        (monday + timedelta(days=6, hours=23), 30.0, 0.0),   # Sunday, same ISO week
+        (monday + timedelta(days=7), 50.0, 1.0),              # next Monday
+    ])
+
+    daily = db_manager.get_aoi_change_metrics(aoi_id, user_id, bucket='day')['series']
+    assert [p['period'] for p in daily] == ['2024-03-04', '2024-03-06', '2024-03-10', '2024-03-11']
+    assert daily[0]['count'] == 2
+    assert daily[0]['overall_change'] == {'min': 10.0, 'max': 20.0, 'avg': 15.0}
+    assert daily[1]['cloud_coverage'] == {'min': None, 'max': None, 'avg': None}
+
+    weekly = db_manager.get_aoi_change_metrics(aoi_id, user_id, bucket='week')['series']
+    assert [(p['period'], p['count']) for p in weekly] == [('2024-03-04', 4), ('2024-03-11', 1)]
+    assert weekly[0]['overall_change']['avg'] == 25.0
+
+    ranged = db_manager.get_aoi_change_metrics(aoi_id, user_id, bucket='month', since=monday + timedelta(days=1),
+                                               until=monday + timedelta(days=7))
+    assert [(p['period'], p['count']) for p in ranged['series']] == [('2024-03-01', 2)]
+
+
+def test_other_users_aoi_is_hidden(db_manager):
+    user_id, aoi_id = add_user_and_aoi(db_manager)
+    assert db_manager.get_aoi_change_metrics(aoi_id, user_id + 1) is None
+
+
+def test_pipeline_keeps_component_metrics():
+    class BasicService:
+        def calculate_change_percentage(self, image1, image2):
+            return 7.0
+
+    class EnhancedService(BasicService):
+        def calculate_change_percentage_enhanced(self, image1, image2):
+            return {'overall_change': 8.0, 'structural_change': 3.0}
+
+    assert AnalysisPipeline(BasicService()).measure_change(None, None) == (7.0, {'overall_change': 7.0})
+    change, metrics = AnalysisPipeline(EnhancedService()).measure_change(None, None)
+    assert change == 8.0 and metrics['structural_change'] == 3.0
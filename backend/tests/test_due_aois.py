@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the due-AOI query: the joined keyset query (iter_aois_for_analysis)
+must return exactly the AOIs the previous per-AOI implementation returned,
+whatever the batch size. Speed is measured by benchmark_aois_for_analysis.py.
+
+    python -m pytest tests/test_due_aois.py
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.sql import func
+
+from models import User, AreaOfInterest
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+def legacy_aois_for_analysis(db_manager, current_time):
+    """The previous get_aois_for_analysis (one User query per due AOI), at a fixed time"""
+    with db_manager.get_session() as session:
+        aois = session.query(AreaOfInterest).filter(
+            AreaOfInterest.monitoring_frequency.isnot(None),
+            AreaOfInterest.is_active == True,
+            AreaOfInterest.baseline_status == 'completed',
+            func.coalesce(AreaOfInterest.next_run_at, current_time - timedelta(days=1)) <= current_time
+        ).all()
+        result = {}
+        for aoi in aois:
+            user = session.query(User).filter_by(id=aoi.user_id).first()
+            if user and user.tokens_remaining > 0:
+                result[aoi.id] = {
+                    'aoi_id': aoi.id,
+                    'user_db_id': aoi.user_id,
+                    'name': aoi.name,
+                    'location_name': aoi.location_name,
+                    'bbox_coordinates': aoi.bbox_coordinates,
+                    'monitoring_frequency': aoi.monitoring_frequency,
+                    'analysis_type': 'baseline_comparison',
+                    'user_tokens': user.tokens_remaining
+                }
+        return result
+
+
+@pytest.fixture(scope='module')
+def seeded_db(make_db_manager):
+    """600 AOIs over 40 users mixing every filter; many share a next_run_at to exercise batch boundaries"""
+    db_manager = make_db_manager()
+    rng = random.Random(7)
+    with db_manager.get_session() as session:
+        session.bulk_insert_mappings(User, [
+            {'id': i, 'clerk_user_id': f'due_{i}', 'email': f'due_{i}@example.com',
+             'tokens_remaining': 0 if i % 8 == 0 else rng.randint(1, 50), 'total_tokens_used': 0}
+            for i in range(1, 41)
+        ])
+        session.bulk_insert_mappings(AreaOfInterest, [
+            {
+                'user_id': rng.randint(1, 40),
+                'name': f'AOI {i}',
+                'location_name': f'Location {i % 13}',
+                'bbox_coordinates': [0, 0, 1, 1],
+                'monitoring_frequency': rng.choice([None, 'daily', 'weekly', 'monthly', 'once']),
+                'is_active': rng.random() > 0.1,
+                'baseline_status': rng.choice(['completed', 'completed', 'completed', 'pending', 'failed']),
+                'next_run_at': rng.choice([
+                    None,
+                    NOW,
+                    NOW - timedelta(hours=1),
+                    NOW - timedelta(minutes=rng.randint(1, 5000)),
+                    NOW + timedelta(minutes=rng.randint(1, 5000)),
+                ])
+            }
+            for i in range(1, 601)
+        ])
+    return db_manager
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 50, 1000])
+def test_same_aois_as_the_previous_query(seeded_db, batch_size):
+    expected = legacy_aois_for_analysis(seeded_db, NOW)
+    assert len(expected) > 50
+
+    batches = list(seeded_db.iter_aois_for_analysis(batch_size=batch_size, now=NOW))
+    assert all(0 < len(batch) <= batch_size for batch in batches)
+    due = [aoi for batch in batches for aoi in batch]
+
+    ids = [aoi['aoi_id'] for aoi in due]
+    assert len(ids) == len(set(ids)), "an AOI was returned twice"
+    assert set(ids) == set(expected)
+    for aoi in due:
+        assert {key: aoi[key] for key in expected[aoi['aoi_id']]} == expected[aoi['aoi_id']]
+
+
+def test_never_scheduled_first_then_oldest_overdue(seeded_db):
+    due = [aoi for batch in seeded_db.iter_aois_for_analysis(batch_size=13, now=NOW) for aoi in batch]
+    unscheduled = [aoi['aoi_id'] for aoi in due if aoi['next_run_at'] is None]
+    assert [aoi['aoi_id'] for aoi in due[:len(unscheduled)]] == sorted(unscheduled)
+
+    overdue = [(aoi['next_run_at'], aoi['aoi_id']) for aoi in due[len(unscheduled):]]
+    assert overdue == sorted(overdue)
+    assert all(run_at <= NOW for run_at, _ in overdue)
+
+
+def test_limit_returns_the_first_due_aois(seeded_db):
+    everything = seeded_db.get_aois_for_analysis()
+    assert seeded_db.get_aois_for_analysis(limit=25) == everything[:25]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-user event stream: publish/subscribe through the broker's
+in-process fallback (no Redis), the events the database publishes after
+commit, and the SSE endpoint's framing.
+
+    python -m pytest tests/test_events.py
+"""
+import json
+import threading
+import uuid
+
+import pytest
+from flask import Flask
+
+import database
+from config import Config
+from controllers import event_controller
+from models import User, AreaOfInterest
+from services.event_service import EventBroker
+from utils import decorators
+
+HEARTBEAT = 0.05
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """Broker without Redis (in-process delivery), used by the database and the SSE endpoint"""
+    broker = EventBroker(None)
+    monkeypatch.setattr(database, 'event_broker', broker)
+    monkeypatch.setattr(event_controller, 'event_broker', broker)
+    return broker
+
+
+def subscribe(broker, user_id):
+    """Subscription that is registered with the broker (the first heartbeat has passed)"""
+    events = broker.subscribe(user_id, heartbeat_seconds=HEARTBEAT)
+    assert next(events) is None
+    return events
+
+
+def next_event(events):
+    """Next event, skipping heartbeats"""
+    for _ in range(int(2 / HEARTBEAT)):
+        event = next(events)
+        if event is not None:
+            return event
+    raise AssertionError("no event within 2 seconds")
+
+
+def test_event_reaches_only_the_users_streams(broker):
+    first, second, other = subscribe(broker, 1), subscribe(broker, 1), subscribe(broker, 2)
+
+    broker.publish(1, 'baseline.status', {'aoi_id': 7, 'baseline_status': 'completed'})
+
+    for events in (first, second):
+        event = next_event(events)
+        assert event['type'] == 'baseline.status'
+        assert event['data'] == {'aoi_id': 7, 'baseline_status': 'completed'}
+        assert 'timestamp' in event
+    assert next(other) is None
+
+
+def test_event_published_from_another_thread(broker):
+    events = subscribe(broker, 1)
+    publisher = threading.Timer(HEARTBEAT / 2, broker.publish, args=(1, 'job.status', {'status': 'running'}))
+    publisher.start()
+    assert next_event(events)['data'] == {'status': 'running'}
+    publisher.join()
+
+
+def test_closed_stream_unsubscribes(broker):
+    events = subscribe(broker, 1)
+    assert 1 in broker._local_subscribers
+
+    events.close()
+    assert 1 not in broker._local_subscribers
+    broker.publish(1, 'job.status', {'status': 'queued'})  # no subscribers: dropped, never raises
+
+
+def test_slow_subscriber_drops_events_instead_of_blocking(broker):
+    events = subscribe(broker, 1)
+    for n in range(150):
+        broker.publish(1, 'job.status', {'n': n})
+
+    received = [next(events)['data']['n'] for _ in range(100)]
+    assert received == list(range(100))
+    assert next(events) is None
+
+
+def test_database_publishes_after_commit(db_manager, broker):
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='event_user', email='events@example.com', tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        aoi = AreaOfInterest(user_id=user.id, name='Port', bbox_coordinates=[34.0, 31.0, 34.1, 31.1],
+                             baseline_status='pending')
+        session.add(aoi)
+        session.flush()
+        user_id, aoi_id = user.id, aoi.id
+    events = subscribe(broker, user_id)
+
+    class NoImagery:
+        def download_image(self, bbox, date_from, date_to):
+            return None
+
+    assert db_manager.create_baseline_image(aoi_id, NoImagery()) is False
+    assert next_event(events)['data'] == {'aoi_id': aoi_id, 'baseline_status': 'processing'}
+    assert next_event(events)['data'] == {'aoi_id': aoi_id, 'baseline_status': 'failed'}
+
+    job_id = str(uuid.uuid4())
+    db_manager.create_analysis_job(job_id, user_id, 'baseline_comparison', {}, aoi_id=aoi_id)
+    db_manager.update_analysis_job(job_id, stage='download')  # stage only: no event
+    db_manager.update_analysis_job(job_id, status='running')
+    event = next_event(events)
+    assert event['type'] == 'job.status'
+    assert (event['data']['job_id'], event['data']['status']) == (job_id, 'running')
+
+    success, message, analysis_id = db_manager.save_charged_analysis(
+        user_id=user_id, aoi_id=aoi_id, process_id='events', tokens_used=1,
+        operation_name='test', location_description='Port', bbox_coordinates=[34.0, 31.0, 34.1, 31.1],
+        image_filenames={}, meta={}, change_percentage=2.5
+    )
+    assert success, message
+    event = next_event(events)
+    assert event['type'] == 'analysis.completed'
+    assert event['data'] == {'analysis_id': analysis_id, 'aoi_id': aoi_id,
+                             'process_id': 'events', 'change_percentage': 2.5}
+
+
+def test_stream_endpoint_frames(shared_db_manager, broker, monkeypatch):
+    clerk_user_id = f'stream_user_{uuid.uuid4().hex}'
+    monkeypatch.setattr(decorators.clerk_auth, 'verify_token',
+                        lambda token: {'sub': clerk_user_id, 'email': 'stream@example.com'} if token else None)
+    monkeypatch.setattr(Config, 'SSE_HEARTBEAT_SECONDS', HEARTBEAT)
+    monkeypatch.setattr(Config, 'SSE_MAX_STREAM_SECONDS', 0)  # recycle after the first event or heartbeat
+
+    app = Flask(__name__)
+    app.register_blueprint(event_controller.event_bp)
+    client = app.test_client()
+
+    assert client.get('/api/events/stream').status_code == 401
+
+    # EventSource cannot send headers, so the token is accepted as a query parameter
+    response = client.get('/api/events/stream?token=test-token')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    frames = response.get_data(as_text=True).split('\n\n')
+    assert frames[0] == 'retry: 3000'
+    event, data = frames[1].split('\n')
+    assert event == 'event: connected'
+    with shared_db_manager.get_session() as session:
+        user_id = session.query(User.id).filter_by(clerk_user_id=clerk_user_id).scalar()
+    assert json.loads(data[len('data: '):]) == {'user_id': user_id}
+    assert frames[2] == ': keep-alive'
+    assert not broker._local_subscribers
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the analysis_history retention job and reads across the hot and archive tiers
+
+    python -m pytest tests/test_history_archive.py
+"""
+from datetime import datetime, timedelta
+
+from models import User, AnalysisHistory, AnalysisHistoryArchive
+
+START = datetime(2024, 1, 1)
+
+
+def add_analyses(db_manager, analyses=30):
+    """One AOI whose analyses are one day apart, starting at START; returns (user_id, aoi_id)"""
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='archive_user', email='archive@example.com', tokens_remaining=10, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        user_id = user.id
+    aoi_id = db_manager.create_aoi(user_id, {'name': 'Harbor', 'bbox_coordinates': [0, 0, 1, 1]})
+
+    with db_manager.get_session() as session:
+        session.add_all([
+            AnalysisHistory(
+                user_id=user_id, aoi_id=aoi_id, process_id=f'process-{n}', operation_name='test',
+                analysis_timestamp=START + timedelta(days=n), change_percentage=float(n),
+                meta={'priority': 'HIGH', 'stage_timings': {'fetch': 120}}
+            )
+            for n in range(analyses)
+        ])
+    return user_id, aoi_id
+
+
+def walk(fetch, limit):
+    """All ids of a paginated listing, following next_cursor"""
+    ids, cursor = [], None
+    while True:
+        page = fetch(limit, cursor)
+        ids.extend(page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+
+def test_archive_moves_old_rows_in_batches(db_manager):
+    user_id, aoi_id = add_analyses(db_manager)
+    moved = db_manager.archive_analysis_history(START + timedelta(days=20), batch_size=7)
+    assert moved == 20
+
+    with db_manager.get_session() as session:
+        assert session.query(AnalysisHistory).count() == 10
+        assert session.query(AnalysisHistoryArchive).count() == 20
+        archived = session.query(AnalysisHistoryArchive).filter_by(process_id='process-3').one()
+        assert archived.meta == {'priority': 'HIGH'}, "nested meta should be compacted"
+        assert archived.change_percentage == 3.0
+
+    assert db_manager.archive_analysis_history(START + timedelta(days=20)) == 0
+
+
+def test_ids_are_not_reused_after_archiving(db_manager):
+    user_id, aoi_id = add_analyses(db_manager, analyses=3)
+    db_manager.archive_analysis_history(START + timedelta(days=30))
+    new_id = db_manager.save_analysis(user_id, aoi_id, 'process-new', 'test', 'Harbor', [0, 0, 1, 1], {}, {})
+    with db_manager.get_session() as session:
+        assert new_id > max(row.id for row in session.query(AnalysisHistoryArchive.id))
+
+
+def test_history_reads_span_both_tiers(db_manager):
+    user_id, aoi_id = add_analyses(db_manager)
+    expected = [page['id'] for page in db_manager.get_user_history_page(user_id, limit=100)['history']]
+    assert len(expected) == 30
+
+    db_manager.archive_analysis_history(START + timedelta(days=12), batch_size=5)
+
+    def user_pages(limit, cursor):
+        page = db_manager.get_user_history_page(user_id, limit=limit, cursor=cursor)
+        return {'items': [a['id'] for a in page['history']], 'next_cursor': page['pagination']['next_cursor']}
+
+    def aoi_pages(limit, cursor):
+        page = db_manager.get_aoi_history(aoi_id, user_id, limit=limit, cursor=cursor)
+        return {'items': [a['id'] for a in page['analyses']], 'next_cursor': page['pagination']['next_cursor']}
+
+    for limit in (4, 7, 30, 50):
+        assert walk(user_pages, limit) == expected, limit
+        assert walk(aoi_pages, limit) == expected, limit
+
+    oldest = db_manager.get_user_history_page(user_id, limit=100)['history'][-1]
+    assert oldest['aoi']['name'] == 'Harbor'
+
+
+def test_dashboards_fall_back_to_archive(db_manager):
+    user_id, aoi_id = add_analyses(db_manager, analyses=8)
+    db_manager.archive_analysis_history(START + timedelta(days=6))
+
+    dashboard = db_manager.get_aoi_dashboard(aoi_id, user_id)
+    assert [a['change_percentage'] for a in dashboard['recent_analyses']] == [7.0, 6.0, 5.0, 4.0, 3.0]
+    view = db_manager.get_aoi_dashboard_view(aoi_id, user_id)
+    assert len(view['recent_analyses']) == 8
+
+    stats = db_manager.get_admin_stats(refresh=True)['analyses']
+    assert stats['total'] == 8 and stats['archived'] == 6
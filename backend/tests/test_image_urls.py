@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Tests for analysis image URLs: S3 images go through the signing redirect
+only while S3 is available, otherwise the local file endpoint is used.
+
+    python -m pytest tests/test_image_urls.py
+"""
+from models import AnalysisHistory
+from services.s3_service import s3_service
+
+
+def test_s3_key_uses_signing_redirect(monkeypatch):
+    monkeypatch.setattr(s3_service, 'enabled', True)
+    assert AnalysisHistory.image_url('analysis/aoi_1/a.png', 'a.png') == '/api/image/s3/analysis/aoi_1/a.png'
+
+
+def test_s3_disabled_falls_back_to_local_file(monkeypatch):
+    monkeypatch.setattr(s3_service, 'enabled', False)
+    assert AnalysisHistory.image_url('analysis/aoi_1/a.png', 'a.png') == '/api/image/a.png'
+    assert AnalysisHistory.image_url('analysis/aoi_1/a.png', None) is None
+
+
+def test_instance_urls_follow_s3_availability(monkeypatch):
+    monkeypatch.setattr(s3_service, 'enabled', False)
+    analysis = AnalysisHistory(image1_filename='a.png', image1_s3_key='analysis/aoi_1/a.png',
+                               heatmap_filename='h.png')
+    assert analysis.get_image_url('image1') == '/api/image/a.png'
+    assert analysis.get_image_url('image2') is None
+    assert analysis.get_image_url('heatmap') == '/api/image/h.png'
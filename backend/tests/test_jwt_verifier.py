@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the JWKS-backed token verifier
+
+Uses a locally generated RSA key and an in-memory JWKS in place of Clerk's.
+
+    python tests/test_jwt_verifier.py
+"""
+import os
+import sys
+import json
+import time
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from services.jwt_verifier import JWKSKeyStore, TokenVerifier, jwks_url_from_publishable_key
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({'kid': kid, 'use': 'sig', 'alg': 'RS256'})
+    return private_key, jwk
+
+
+def make_token(private_key, kid, expires_in=60, **claims):
+    payload = {'sub': 'user_123', 'email': 'test@example.com', 'exp': int(time.time()) + expires_in}
+    payload.update(claims)
+    return jwt.encode(payload, private_key, algorithm='RS256', headers={'kid': kid})
+
+
+class CountingKeyStore(JWKSKeyStore):
+    """Key store that counts key lookups (one per RSA verification)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = 0
+
+    def get_key(self, kid):
+        self.lookups += 1
+        return super().get_key(kid)
+
+
+def test_valid_token_is_verified_and_cached():
+    private_key, jwk = make_key('key-1')
+    store = CountingKeyStore(lambda: {'keys': [jwk]}, refresh_interval=0)
+    verifier = TokenVerifier(store)
+    token = make_token(private_key, 'key-1')
+
+    claims = verifier.verify(token)
+    assert claims['sub'] == 'user_123'
+    assert verifier.verify(token)['email'] == 'test@example.com'
+    assert store.lookups == 1, "second request should come from the token cache"
+    assert verifier.get_metrics()['cache_hits'] == 1
+
+
+def test_bad_tokens_are_rejected():
+    private_key, jwk = make_key('key-1')
+    other_key, _ = make_key('key-1')
+    verifier = TokenVerifier(JWKSKeyStore.from_jwks({'keys': [jwk]}, refresh_interval=0))
+
+    rejected = [
+        make_token(private_key, 'key-1', expires_in=-60),        # expired
+        make_token(other_key, 'key-1'),                          # signed by someone else
+        make_token(private_key, 'key-unknown'),                  # unknown kid
+        jwt.encode({'sub': 'x', 'exp': int(time.time()) + 60}, 'secret', algorithm='HS256',
+                   headers={'kid': 'key-1'}),                    # algorithm confusion
+    ]
+    for token in rejected:
+        try:
+            verifier.verify(token)
+        except jwt.InvalidTokenError:
+            continue
+        raise AssertionError(f"token was accepted: {token[:40]}...")
+
+
+def test_cached_token_expires_with_exp():
+    private_key, jwk = make_key('key-1')
+    verifier = TokenVerifier(JWKSKeyStore.from_jwks({'keys': [jwk]}, refresh_interval=0), leeway=0)
+    token = make_token(private_key, 'key-1', expires_in=1)
+
+    verifier.verify(token)
+    time.sleep(2.1)
+    try:
+        verifier.verify(token)
+    except jwt.ExpiredSignatureError:
+        return
+    raise AssertionError("expired token was served from the cache")
+
+
+def test_unknown_kid_triggers_refresh():
+    old_private, old_jwk = make_key('key-old')
+    new_private, new_jwk = make_key('key-new')
+    jwks = {'keys': [old_jwk]}
+    store = JWKSKeyStore(lambda: jwks, refresh_interval=0, min_refresh_interval=0)
+    verifier = TokenVerifier(store)
+
+    assert verifier.verify(make_token(old_private, 'key-old'))
+    jwks['keys'] = [old_jwk, new_jwk]  # key rotation at the identity provider
+    assert verifier.verify(make_token(new_private, 'key-new'))
+    assert store.refresh_count == 2
+
+
+def test_skip_signature_is_explicit():
+    private_key, _ = make_key('key-1')
+    token = make_token(private_key, 'key-1')
+
+    try:
+        TokenVerifier(None).verify(token)
+        raise AssertionError("token accepted without a key store")
+    except jwt.InvalidTokenError:
+        pass
+    assert TokenVerifier(None, skip_signature=True).verify(token)['sub'] == 'user_123'
+
+
+def test_jwks_url_from_publishable_key():
+    assert jwks_url_from_publishable_key('pk_test_Y2xlcmsuZXhhbXBsZS5jb20k') == \
+        'https://clerk.example.com/.well-known/jwks.json'
+    assert jwks_url_from_publishable_key(None) is None
+
+
+if __name__ == '__main__':
+    for test in (test_valid_token_is_verified_and_cached, test_bad_tokens_are_rejected,
+                 test_cached_token_expires_with_exp, test_unknown_kid_triggers_refresh,
+                 test_skip_signature_is_explicit, test_jwks_url_from_publishable_key):
+        test()
+        print(f"✅ {test.__name__}")
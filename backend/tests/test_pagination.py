@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination: opaque cursors, rejection of tampered cursors,
+and page boundaries when several rows share a timestamp (history across
+both tiers, token transactions and the admin user list).
+
+    python -m pytest tests/test_pagination.py
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import User, AnalysisHistory, TokenTransaction
+from utils.pagination import InvalidCursor, encode_cursor, decode_cursor
+
+TIED = datetime(2024, 3, 1, 12, 0, 0, 250000)
+
+
+def raw_cursor(payload):
+    """Cursor with an arbitrary payload, encoded the way encode_cursor does"""
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def walk(fetch, limit):
+    """All ids of a paginated listing, following next_cursor"""
+    ids, cursor = [], None
+    while True:
+        items, pagination = fetch(limit, cursor)
+        assert len(items) <= limit
+        ids.extend(items)
+        cursor = pagination['next_cursor']
+        assert pagination['has_next'] == (cursor is not None)
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize('timestamp', [TIED, datetime(2024, 3, 1), None])
+def test_cursor_round_trip(timestamp):
+    cursor = encode_cursor(timestamp, 42)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (timestamp, 42)
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!',
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+    raw_cursor({'timestamp': None, 'id': 1}),
+    raw_cursor([None]),
+    raw_cursor([None, 1, 2]),
+    raw_cursor(['2024-03-01T12:00:00', '7']),
+    raw_cursor(['2024-03-01T12:00:00', 7.5]),
+    raw_cursor(['yesterday', 7]),
+    encode_cursor(TIED, 7)[:-3]
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_invalid_cursor_is_a_validation_error():
+    # handle_errors turns ValueError into a 400
+    assert issubclass(InvalidCursor, ValueError)
+
+
+def add_user(session, n, created_at=TIED):
+    user = User(clerk_user_id=f'page_user_{n}', email=f'page{n}@example.com',
+                tokens_remaining=10, total_tokens_used=0, created_at=created_at)
+    session.add(user)
+    session.flush()
+    return user
+
+
+def test_history_pages_split_tied_timestamps(db_manager):
+    # Two groups of analyses sharing a timestamp; the older group is archived
+    older = TIED - timedelta(days=30)
+    with db_manager.get_session() as session:
+        user_id = add_user(session, 0).id
+        session.add_all([
+            AnalysisHistory(user_id=user_id, process_id=f'process-{n}', operation_name='test',
+                            analysis_timestamp=older if n < 5 else TIED, meta={})
+            for n in range(12)
+        ])
+    assert db_manager.archive_analysis_history(older + timedelta(seconds=1)) == 5
+
+    def fetch(limit, cursor):
+        page = db_manager.get_user_history_page(user_id, limit=limit, cursor=cursor)
+        return [analysis['process_id'] for analysis in page['history']], page['pagination']
+
+    expected = [f'process-{n}' for n in reversed(range(12))]
+    for limit in (1, 2, 5, 12, 20):
+        assert walk(fetch, limit) == expected, f"limit {limit}"
+
+
+def test_transaction_pages_split_tied_timestamps(db_manager):
+    with db_manager.get_session() as session:
+        user_id = add_user(session, 0).id
+        session.add_all([
+            TokenTransaction(user_id=user_id, transaction_type='admin_grant', amount=1,
+                             balance_before=n, balance_after=n + 1,
+                             created_at=TIED if n % 3 else TIED - timedelta(hours=n))
+            for n in range(10)
+        ])
+        session.flush()
+        expected = [tx.id for tx in session.query(TokenTransaction).order_by(
+            TokenTransaction.created_at.desc(), TokenTransaction.id.desc()
+        )]
+
+    def fetch(limit, cursor):
+        page = db_manager.get_token_transactions_page(limit=limit, cursor=cursor, user_id=user_id)
+        return [tx['id'] for tx in page['transactions']], page['pagination']
+
+    for limit in (1, 3, 4, 10):
+        assert walk(fetch, limit) == expected, f"limit {limit}"
+
+
+def test_admin_user_pages_split_tied_timestamps(db_manager):
+    with db_manager.get_session() as session:
+        user_ids = [add_user(session, n, TIED if n < 7 else TIED + timedelta(minutes=n)).id for n in range(9)]
+    expected = [user_ids[8], user_ids[7]] + user_ids[6::-1]
+
+    def fetch(limit, cursor):
+        page = db_manager.get_all_users_paginated(per_page=limit, cursor=cursor)
+        return [user['id'] for user in page['users']], page['pagination']
+
+    for limit in (1, 2, 3, 9):
+        assert walk(fetch, limit) == expected, f"limit {limit}"
+
+
+def test_tampered_cursor_is_rejected_by_list_queries(db_manager):
+    with pytest.raises(InvalidCursor):
+        db_manager.get_all_users_paginated(per_page=5, cursor=raw_cursor(['2024-03-01T12:00:00', 'x']))
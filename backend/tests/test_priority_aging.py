@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for priority aging: overdue runs are promoted one level per
+PRIORITY_AGING_MINUTES, dispatch follows the aged priority, and the sweeper
+re-publishes runs that were promoted since its last pass.
+
+    python -m pytest tests/test_priority_aging.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import tasks
+from config import Config
+from models import User, AreaOfInterest
+from services.priority_service import (
+    effective_rank, celery_priority, sort_for_dispatch, promoted_since, CELERY_PRIORITIES
+)
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture(autouse=True)
+def aging(monkeypatch):
+    monkeypatch.setattr(Config, 'PRIORITY_AGING_MINUTES', 30)
+
+
+def overdue(minutes):
+    return NOW - timedelta(minutes=minutes)
+
+
+@pytest.mark.parametrize('priority, scheduled_for, rank', [
+    ('HIGH', None, 0),
+    ('MEDIUM', None, 1),
+    ('LOW', None, 2),
+    ('low', None, 2),
+    ('URGENT', None, 1),
+    (None, None, 1),
+    ('LOW', NOW + timedelta(hours=5), 2),
+    ('LOW', overdue(29), 2),
+    ('LOW', overdue(30), 1),
+    ('LOW', overdue(59), 1),
+    ('LOW', overdue(60), 0),
+    ('LOW', overdue(600), 0),
+    ('MEDIUM', overdue(31), 0),
+    ('HIGH', overdue(600), 0),
+])
+def test_effective_rank(priority, scheduled_for, rank):
+    assert effective_rank(priority, scheduled_for, NOW) == rank
+
+
+def test_aging_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(Config, 'PRIORITY_AGING_MINUTES', 0)
+    assert effective_rank('LOW', overdue(600), NOW) == 2
+
+
+def test_celery_priority_follows_aged_rank():
+    assert celery_priority('LOW', overdue(5), NOW) == CELERY_PRIORITIES[2]
+    assert celery_priority('LOW', overdue(45), NOW) == CELERY_PRIORITIES[1]
+    assert celery_priority('LOW', overdue(90), NOW) == CELERY_PRIORITIES[0] == celery_priority('HIGH', None, NOW)
+
+
+def test_dispatch_order_uses_aged_priority_then_wait():
+    items = [
+        {'id': 'high-fresh', 'priority': 'HIGH', 'next_run_at': overdue(1)},
+        {'id': 'low-starving', 'priority': 'LOW', 'next_run_at': overdue(65)},
+        {'id': 'medium-fresh', 'priority': 'MEDIUM', 'next_run_at': overdue(2)},
+        {'id': 'low-fresh', 'priority': 'LOW', 'next_run_at': overdue(3)},
+        {'id': 'low-aged-once', 'priority': 'LOW', 'next_run_at': overdue(40)},
+        {'id': 'unscheduled', 'priority': 'MEDIUM', 'next_run_at': None},
+    ]
+    order = [item['id'] for item in sort_for_dispatch(items, NOW)]
+    # Equal ranks are served longest-waiting first
+    assert order == ['low-starving', 'high-fresh', 'low-aged-once', 'medium-fresh', 'unscheduled', 'low-fresh']
+
+
+def test_promoted_since_detects_crossing_an_aging_boundary():
+    window = 300
+    assert promoted_since('LOW', overdue(32), window, NOW)
+    assert promoted_since('LOW', overdue(61), window, NOW)
+    assert not promoted_since('LOW', overdue(40), window, NOW)
+    assert not promoted_since('LOW', overdue(2), window, NOW)
+    assert not promoted_since('HIGH', overdue(32), window, NOW)
+    assert not promoted_since('LOW', None, window, NOW)
+
+
+@pytest.fixture
+def sweep(db_manager, monkeypatch):
+    """Sweeper over the test database; returns (add_aoi, published, revoked)"""
+    published, revoked = [], []
+    monkeypatch.setattr(tasks, 'db_manager', db_manager)
+    monkeypatch.setattr(Config, 'CATCHUP_MAX_PER_MINUTE', 0)  # no catch-up pacing
+    monkeypatch.setattr(tasks.run_scheduled_analysis, 'apply_async',
+                        lambda args, eta, task_id, priority: published.append((args[0], priority)))
+    monkeypatch.setattr(tasks, '_revoke', revoked.append)
+
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='aging_user', email='aging@example.com', tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        user_id = user.id
+
+    def add_aoi(priority, minutes_overdue, scheduled_task_id=None):
+        run_at = datetime.utcnow() - timedelta(minutes=minutes_overdue)
+        with db_manager.get_session() as session:
+            aoi = AreaOfInterest(user_id=user_id, name=f'{priority} {minutes_overdue}',
+                                 bbox_coordinates=[34.0, 31.0, 34.1, 31.1], priority=priority,
+                                 monitoring_frequency='daily', is_active=True, baseline_status='completed',
+                                 next_run_at=run_at, schedule_anchor_at=run_at,
+                                 scheduled_task_id=scheduled_task_id)
+            session.add(aoi)
+            session.flush()
+            return aoi.id
+
+    return add_aoi, published, revoked
+
+
+def test_sweep_publishes_in_aged_priority_order(sweep):
+    add_aoi, published, revoked = sweep
+    high = add_aoi('HIGH', 1)
+    low_starving = add_aoi('LOW', 65)
+    medium = add_aoi('MEDIUM', 2)
+    low = add_aoi('LOW', 3)
+
+    assert tasks.sweep_scheduled_analyses() == 4
+    assert published == [
+        (low_starving, CELERY_PRIORITIES[0]),
+        (high, CELERY_PRIORITIES[0]),
+        (medium, CELERY_PRIORITIES[1]),
+        (low, CELERY_PRIORITIES[2]),
+    ]
+    assert revoked == []
+
+
+def test_sweep_republishes_runs_promoted_since_last_pass(db_manager, sweep):
+    add_aoi, published, revoked = sweep
+    # Both already have a queued task; only the first aged into MEDIUM during the last sweep interval
+    promoted = add_aoi('LOW', 31, scheduled_task_id='queued-promoted')
+    waiting = add_aoi('LOW', 45, scheduled_task_id='queued-waiting')
+
+    assert tasks.sweep_scheduled_analyses() == 0  # re-publications are not new runs
+    assert published == [(promoted, CELERY_PRIORITIES[1])]
+    assert revoked == ['queued-promoted']
+    with db_manager.get_session() as session:
+        assert session.query(AreaOfInterest).filter_by(id=promoted).one().scheduled_task_id != 'queued-promoted'
+        assert session.query(AreaOfInterest).filter_by(id=waiting).one().scheduled_task_id == 'queued-waiting'
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests for the hot DatabaseManager queries
+
+Seeds a dataset, runs each hot DatabaseManager method while capturing the
+SELECT statements it issues, and EXPLAINs every captured statement with its
+real parameters. A test fails when any statement falls back to a sequential
+scan or walks a whole index only for its order, or, for the newest-first
+pages, when the rows have to be sorted instead of being read in index order.
+
+Set TEST_DATABASE_URL to check PostgreSQL plans; the suite then runs with
+enable_seqscan = off, so a Seq Scan in a plan means no index can serve the
+query. Without it a temporary SQLite database is used (EXPLAIN QUERY PLAN).
+The seeded rows are left behind in TEST_DATABASE_URL; use a scratch database.
+
+    python -m pytest tests/test_query_plans.py                  # run the checks
+    SHOW_PLANS=1 python -m pytest -s tests/test_query_plans.py  # also print every plan
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from models import User, AreaOfInterest, AnalysisHistory, TokenTransaction
+
+USERS = 200
+AOIS_PER_USER = 5
+ANALYSES_PER_AOI = 20
+TRANSACTIONS_PER_USER = 50
+
+SHOW_PLANS = bool(os.getenv('SHOW_PLANS'))
+
+
+@pytest.fixture(scope='module')
+def seeded_db(make_db_manager):
+    """(db_manager, user_id, aoi_id) over the seeded dataset (built once per module)"""
+    db_manager = make_db_manager(use_test_database=True)
+
+    rng = random.Random(42)
+    tag = os.urandom(4).hex()
+    start = datetime(2024, 1, 1)
+    with db_manager.engine.begin() as connection:
+        first_user = connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM users")).scalar() + 1
+        first_aoi = connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM areas_of_interest")).scalar() + 1
+        user_ids = list(range(first_user, first_user + USERS))
+        aoi_ids = list(range(first_aoi, first_aoi + USERS * AOIS_PER_USER))
+
+        connection.execute(insert(User.__table__), [
+            {'id': user_id, 'clerk_user_id': f'plan_{tag}_{user_id}', 'email': f'{user_id}@example.com',
+             'role': 'user', 'is_admin': False, 'tokens_remaining': rng.randint(0, 20), 'total_tokens_used': 0,
+             'created_at': start + timedelta(minutes=user_id)}
+            for user_id in user_ids
+        ])
+        corners = [(rng.uniform(-170, 170), rng.uniform(-80, 80)) for _ in aoi_ids]
+        connection.execute(insert(AreaOfInterest.__table__), [
+            {'id': aoi_id, 'user_id': user_ids[i // AOIS_PER_USER], 'name': f'AOI {aoi_id}',
+             'bbox_coordinates': [lon, lat, lon + 0.2, lat + 0.1],
+             'min_lon': lon, 'min_lat': lat, 'max_lon': lon + 0.2, 'max_lat': lat + 0.1,
+             'monitoring_frequency': rng.choice(['DAILY', 'WEEKLY', None]),
+             'is_active': True, 'baseline_status': rng.choice(['completed', 'pending']),
+             'next_run_at': start + timedelta(hours=rng.randint(0, 24 * 400)),
+             'created_at': start + timedelta(minutes=i)}
+            for i, (aoi_id, (lon, lat)) in enumerate(zip(aoi_ids, corners))
+        ])
+        connection.execute(insert(AnalysisHistory.__table__), [
+            {'user_id': user_ids[i // AOIS_PER_USER], 'aoi_id': aoi_id,
+             'process_id': f'plan_{tag}_{aoi_id}_{n}', 'operation_name': 'plan', 'bbox_coordinates': [0, 0, 1, 1],
+             'analysis_timestamp': start + timedelta(hours=rng.randint(0, 24 * 400)),
+             'tokens_used': 1, 'change_percentage': rng.random() * 50}
+            for i, aoi_id in enumerate(aoi_ids) for n in range(ANALYSES_PER_AOI)
+        ])
+        connection.execute(insert(TokenTransaction.__table__), [
+            {'user_id': user_id, 'transaction_type': 'usage', 'amount': -1, 'balance_before': 1, 'balance_after': 0,
+             'created_at': start + timedelta(minutes=rng.randint(0, 60 * 24 * 400))}
+            for user_id in user_ids for _ in range(TRANSACTIONS_PER_USER)
+        ])
+    with db_manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE"))
+
+    return db_manager, user_ids[USERS // 2], aoi_ids[len(aoi_ids) // 2]
+
+
+def capture_selects(db_manager, call):
+    """Run call() and return the (statement, parameters) of every SELECT it sent"""
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    event.listen(db_manager.engine, 'before_cursor_execute', record)
+    try:
+        call()
+    finally:
+        event.remove(db_manager.engine, 'before_cursor_execute', record)
+    assert captured, "no SELECT statements captured"
+    return captured
+
+
+def explain(db_manager, statement, parameters):
+    """Plan lines for one captured statement"""
+    with db_manager.engine.connect() as connection:
+        if connection.dialect.name == 'postgresql':
+            connection.exec_driver_sql("SET enable_seqscan = off")
+            rows = connection.exec_driver_sql("EXPLAIN " + statement, parameters)
+            plan = [row[0] for row in rows]
+            connection.exec_driver_sql("RESET enable_seqscan")
+            return plan
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[-1] for row in rows]
+
+
+def plan_problems(db_manager, plan, ordered, full_index_scan_ok=False):
+    """
+    Sequential scans, full index scans (an index walked for its order while
+    the WHERE clause is only a filter) unless full_index_scan_ok, and, for
+    ordered pages, sorts
+    """
+    problems = []
+    if db_manager.engine.dialect.name == 'postgresql':
+        for i, line in enumerate(plan):
+            node = line.strip().lstrip('-> ')
+            if node.startswith('Seq Scan'):
+                problems.append(node)
+            if ordered and node.startswith(('Sort ', 'Incremental Sort ')):
+                problems.append(node)
+            if node.startswith(('Index Scan', 'Index Only Scan')) and not full_index_scan_ok:
+                details = []
+                for detail in plan[i + 1:]:
+                    if detail.strip().startswith('->'):
+                        break
+                    details.append(detail.strip())
+                if not any(d.startswith('Index Cond:') for d in details):
+                    problems.append(node)
+    else:
+        for line in plan:
+            if line.startswith('SCAN ') and (' USING ' not in line or not full_index_scan_ok):
+                problems.append(line)
+            if ordered and 'TEMP B-TREE FOR ORDER BY' in line:
+                problems.append(line)
+    return problems
+
+
+def assert_plans(db_manager, name, call, ordered=False, full_index_scan_ok=False):
+    failures = []
+    for statement, parameters in capture_selects(db_manager, call):
+        plan = explain(db_manager, statement, parameters)
+        if SHOW_PLANS:
+            print(f"\n-- {name}\n{statement}\n" + "\n".join(f"   {line}" for line in plan))
+        if plan_problems(db_manager, plan, ordered, full_index_scan_ok):
+            failures.append(f"{statement}\n  plan:\n    " + "\n    ".join(plan))
+    assert not failures, f"{name}: plan regressed\n" + "\n\n".join(failures)
+
+
+def test_user_history_pages(seeded_db):
+    db_manager, user_id, _ = seeded_db
+    first = db_manager.get_user_history_page(user_id, limit=20)
+    assert first['pagination']['next_cursor']
+    assert_plans(db_manager, 'get_user_history_page',
+                 lambda: db_manager.get_user_history_page(user_id, limit=20), ordered=True)
+    assert_plans(db_manager, 'get_user_history_page (cursor)', lambda: db_manager.get_user_history_page(
+        user_id, limit=20, cursor=first['pagination']['next_cursor']), ordered=True)
+
+
+def test_aoi_history_pages(seeded_db):
+    db_manager, _, aoi_id = seeded_db
+    with db_manager.get_session() as session:
+        owner = session.query(AreaOfInterest.user_id).filter_by(id=aoi_id).scalar()
+    assert_plans(db_manager, 'get_aoi_history',
+                 lambda: db_manager.get_aoi_history(aoi_id, owner, limit=5), ordered=True)
+    assert_plans(db_manager, 'get_aoi_dashboard', lambda: db_manager.get_aoi_dashboard(aoi_id, owner), ordered=True)
+    assert_plans(db_manager, 'get_aoi_change_metrics',
+                 lambda: db_manager.get_aoi_change_metrics(aoi_id, owner, bucket='week'))
+
+
+def test_token_transaction_pages(seeded_db):
+    db_manager, user_id, _ = seeded_db
+    assert_plans(db_manager, 'get_user_token_transactions',
+                 lambda: db_manager.get_user_token_transactions(user_id, limit=20), ordered=True)
+    assert_plans(db_manager, 'get_token_transactions_page (user)',
+                 lambda: db_manager.get_token_transactions_page(limit=20, user_id=user_id), ordered=True)
+
+
+def test_user_lookups(seeded_db):
+    db_manager, user_id, _ = seeded_db
+    assert_plans(db_manager, 'get_user_by_id', lambda: db_manager.get_user_by_id(user_id))
+    assert_plans(db_manager, 'get_user_aois', lambda: db_manager.get_user_aois(user_id))
+    # No filter: walking ix_users_created_id until LIMIT is the intended plan
+    assert_plans(db_manager, 'get_all_users_paginated', lambda: db_manager.get_all_users_paginated(per_page=20),
+                 ordered=True, full_index_scan_ok=True)
+
+
+def test_spatial_lookups(seeded_db):
+    db_manager = seeded_db[0]
+    for mode in db_manager.SPATIAL_MODES:
+        assert_plans(db_manager, f'find_aois_by_bbox ({mode})',
+                     lambda: db_manager.find_aois_by_bbox((10.0, 40.0, 12.0, 41.0), mode=mode))
+    assert_plans(db_manager, 'nearest_aois', lambda: db_manager.nearest_aois(10.0, 40.0, k=3))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for read-replica routing in DatabaseManager
+
+Uses two temporary SQLite files as primary and "replica"; the same user row
+carries a different email in each, so a read shows which database served it.
+
+    python -m pytest tests/test_read_replicas.py
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, User
+from services.replica_service import reset_read_pin
+
+
+@pytest.fixture
+def make_databases(make_db_manager, tmp_path):
+    """Factory for a primary DatabaseManager with replica_count seeded replicas"""
+
+    def make(replica_count=1, broken_replica=False):
+        replica_urls = [f'sqlite:///{tmp_path / f"replica{i}.db"}' for i in range(replica_count)]
+
+        for i, url in enumerate(replica_urls):
+            engine = create_engine(url)
+            Base.metadata.create_all(engine)
+            session = sessionmaker(bind=engine)()
+            session.add(User(id=1, clerk_user_id='user_1', email=f'replica{i}@example.com',
+                             tokens_remaining=5, total_tokens_used=0))
+            session.commit()
+            session.close()
+            engine.dispose()
+
+        if broken_replica:
+            replica_urls.append(f'sqlite:///{tmp_path / "missing" / "replica.db"}')
+
+        db_manager = make_db_manager(replica_urls=replica_urls)
+        with db_manager.get_session() as session:
+            session.add(User(id=1, clerk_user_id='user_1', email='primary@example.com',
+                             tokens_remaining=5, total_tokens_used=0))
+        reset_read_pin()
+        return db_manager
+
+    return make
+
+
+def test_reads_go_to_replica(make_databases):
+    db_manager = make_databases()
+    assert db_manager.get_user_by_id(1)['email'] == 'replica0@example.com'
+    assert db_manager.replicas.get_metrics()['replica_reads'] == 1
+
+
+def test_read_your_writes_after_commit(make_databases):
+    db_manager = make_databases()
+    assert db_manager.get_user_by_id(1)['tokens_remaining'] == 5
+
+    db_manager.add_tokens_to_user(1, 10)
+    user = db_manager.get_user_by_id(1)
+    assert user['email'] == 'primary@example.com', "read after a write must see the write"
+    assert user['tokens_remaining'] == 15
+
+    reset_read_pin()  # next request
+    assert db_manager.get_user_by_id(1)['email'] == 'replica0@example.com'
+
+
+def test_rolled_back_write_does_not_pin(make_databases):
+    db_manager = make_databases()
+    try:
+        with db_manager.get_session() as session:
+            session.query(User).filter_by(id=1).first().email = 'changed@example.com'
+            session.flush()
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert db_manager.get_user_by_id(1)['email'] == 'replica0@example.com'
+
+
+def test_round_robin_skips_unhealthy_replica(make_databases):
+    db_manager = make_databases(replica_count=2, broken_replica=True)
+    emails = {db_manager.get_user_by_id(1)['email'] for _ in range(6)}
+    assert emails == {'replica0@example.com', 'replica1@example.com'}
+
+    metrics = db_manager.replicas.get_metrics()
+    assert [r['healthy'] for r in metrics['replicas']] == [True, True, False]
+    assert metrics['primary_fallbacks'] == 0
+
+
+def test_no_healthy_replica_falls_back_to_primary(make_databases):
+    db_manager = make_databases(replica_count=0, broken_replica=True)
+    assert db_manager.get_user_by_id(1)['email'] == 'primary@example.com'
+    assert db_manager.replicas.get_metrics()['primary_fallbacks'] == 1
+
+
+def test_forked_process_drops_inherited_replica_connections(make_databases, monkeypatch):
+    import shared_db
+
+    db_manager = make_databases(replica_count=2)
+    disposed = []
+    for name, engine in [('primary', db_manager.engine)] + [
+        (f'replica{i}', replica.engine) for i, replica in enumerate(db_manager.replicas.replicas)
+    ]:
+        monkeypatch.setattr(engine, 'dispose', lambda close=True, name=name: disposed.append((name, close)))
+
+    # The manager was created by a parent process
+    monkeypatch.setattr(shared_db, '_manager', db_manager)
+    monkeypatch.setattr(shared_db, '_manager_pid', -1)
+
+    assert shared_db.get_db_manager() is db_manager
+    assert disposed == [('primary', False), ('replica0', False), ('replica1', False)]
+    shared_db.get_db_manager()
+    assert len(disposed) == 3
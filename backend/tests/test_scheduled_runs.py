@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Tests for the scheduled-run claim: a sweep during a running scheduled analysis
+must not publish it again, and a failed run backs off instead of being
+republished by every sweep.
+
+The pipeline is a stub and publishing is recorded instead of sent to the broker.
+
+    python -m pytest tests/test_scheduled_runs.py
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import tasks
+from config import Config
+from models import User, AreaOfInterest, AnalysisHistory
+from services.analysis_service import AnalysisError
+from services.schedule_slots import following_slot
+
+
+class SweepingPipeline:
+    """Runs a sweep in the middle of the analysis, then succeeds or fails"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.stage_timings = {}
+
+    def run_baseline_comparison(self, aoi_data, process_id, dates):
+        tasks.sweep_scheduled_analyses()
+        if self.fail:
+            raise AnalysisError("No current image available")
+        return {
+            'change_percentage': 3.5,
+            'record': {
+                'bbox_coordinates': aoi_data['bbox_coordinates'],
+                'image_filenames': {},
+                'change_percentage': 3.5,
+                'meta': {}
+            }
+        }
+
+
+class StubServices:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def new_pipeline(self, on_stage=None):
+        return self.pipeline
+
+
+@pytest.fixture
+def scheduled_aoi(db_manager, monkeypatch):
+    """
+    Factory: patch the test database and stubs into tasks and add an overdue
+    daily AOI; returns (aoi_id, run_at, published)
+    """
+
+    def make(fail=False):
+        published = []
+        monkeypatch.setattr(tasks, 'db_manager', db_manager)
+        monkeypatch.setattr(tasks, 'get_worker_services', lambda _: StubServices(SweepingPipeline(fail)))
+        monkeypatch.setattr(
+            tasks, '_publish_scheduled_run',
+            lambda aoi_id, task_id, run_at, priority=None, dispatch_at=None:
+                published.append((aoi_id, task_id, run_at)) or task_id
+        )
+        monkeypatch.setattr(tasks, '_revoke', lambda task_id: None)
+        return add_overdue_aoi(db_manager) + (published,)
+
+    return make
+
+
+def add_overdue_aoi(db_manager):
+    run_at = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=1)
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='schedule_user', email='schedule@example.com', tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        aoi = AreaOfInterest(user_id=user.id, name='Port', bbox_coordinates=[34.0, 31.0, 34.1, 31.1],
+                             monitoring_frequency='daily', is_active=True, baseline_status='completed',
+                             next_run_at=run_at, schedule_anchor_at=run_at)
+        session.add(aoi)
+        session.flush()
+        aoi_id = aoi.id
+    return aoi_id, run_at
+
+
+def load_aoi(db_manager, aoi_id):
+    with db_manager.get_session() as session:
+        aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
+        return aoi.next_run_at, aoi.scheduled_task_id, aoi.run_started_at
+
+
+def test_sweep_during_run_publishes_nothing(db_manager, scheduled_aoi):
+    aoi_id, run_at, published = scheduled_aoi()
+
+    # The overdue AOI is published once by a sweep
+    assert tasks.sweep_scheduled_analyses() == 1
+    assert len(published) == 1
+    task_id = published[0][1]
+
+    # ... and that task runs, with another sweep in the middle of it
+    result = tasks.run_scheduled_analysis.apply(args=[aoi_id], task_id=task_id).get()
+    assert result['success'], result
+    assert len(published) == 1
+
+    with db_manager.get_session() as session:
+        assert session.query(AnalysisHistory).filter_by(aoi_id=aoi_id).count() == 1
+
+    next_run_at, scheduled_task_id, run_started_at = load_aoi(db_manager, aoi_id)
+    assert next_run_at == following_slot(aoi_id, 'daily', run_at, run_at)
+    assert next_run_at > datetime.utcnow()
+    assert scheduled_task_id is None and run_started_at is None
+
+    # Nothing is due any more
+    assert tasks.sweep_scheduled_analyses() == 0
+    assert len(published) == 1
+
+
+def test_superseded_task_is_skipped(db_manager, scheduled_aoi):
+    aoi_id, run_at, published = scheduled_aoi()
+    tasks.sweep_scheduled_analyses()
+
+    result = tasks.run_scheduled_analysis.apply(args=[aoi_id], task_id=str(uuid.uuid4())).get()
+    assert result.get('skipped'), result
+    assert load_aoi(db_manager, aoi_id)[0] == run_at
+
+
+def test_failed_run_backs_off(db_manager, scheduled_aoi):
+    aoi_id, run_at, published = scheduled_aoi(fail=True)
+    tasks.sweep_scheduled_analyses()
+    task_id = published[0][1]
+
+    before = datetime.utcnow()
+    result = tasks.run_scheduled_analysis.apply(args=[aoi_id], task_id=task_id).get()
+    assert not result['success']
+
+    next_run_at, scheduled_task_id, run_started_at = load_aoi(db_manager, aoi_id)
+    retry_delay = timedelta(minutes=Config.SCHEDULE_RETRY_DELAY_MINUTES)
+    assert before + retry_delay <= next_run_at <= datetime.utcnow() + retry_delay
+    assert run_started_at is None
+
+    # One retry, at the backed-off time; later sweeps leave it alone
+    assert [entry[2] for entry in published[1:]] == [next_run_at]
+    assert scheduled_task_id == published[-1][1]
+    tasks.sweep_scheduled_analyses()
+    assert len(published) == 2
+
+
+def test_repeated_failures_back_off_then_move_on(db_manager, scheduled_aoi, monkeypatch):
+    monkeypatch.setattr(Config, 'SCHEDULE_MAX_RETRIES', 2)
+    aoi_id, run_at, published = scheduled_aoi(fail=True)
+    tasks.sweep_scheduled_analyses()
+
+    # Each retry waits twice as long as the one before
+    retry_delay = timedelta(minutes=Config.SCHEDULE_RETRY_DELAY_MINUTES)
+    for failures, delay in ((1, retry_delay), (2, retry_delay * 2)):
+        before = datetime.utcnow()
+        tasks.run_scheduled_analysis.apply(args=[aoi_id], task_id=published[-1][1]).get()
+        next_run_at, scheduled_task_id, run_started_at = load_aoi(db_manager, aoi_id)
+        assert before + delay <= next_run_at <= datetime.utcnow() + delay
+        with db_manager.get_session() as session:
+            assert session.query(AreaOfInterest).filter_by(id=aoi_id).first().schedule_failures == failures
+
+    # The last retry fails too: give up and move to the following slot
+    tasks.run_scheduled_analysis.apply(args=[aoi_id], task_id=published[-1][1]).get()
+    with db_manager.get_session() as session:
+        aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
+        assert aoi.schedule_failures == 0
+        assert aoi.next_run_at == following_slot(aoi_id, 'daily', next_run_at, run_at)
+        assert aoi.next_run_at > datetime.utcnow()
+
+
+def test_stale_claim_is_taken_over(db_manager, scheduled_aoi):
+    aoi_id, run_at, published = scheduled_aoi()
+    tasks.sweep_scheduled_analyses()
+
+    # The worker running the task died long ago
+    with db_manager.get_session() as session:
+        aoi = session.query(AreaOfInterest).filter_by(id=aoi_id).first()
+        aoi.run_started_at = datetime.utcnow() - timedelta(minutes=Config.SCHEDULE_RUN_TIMEOUT_MINUTES + 1)
+
+    tasks.sweep_scheduled_analyses()
+    assert len(published) == 2
+    next_run_at, scheduled_task_id, run_started_at = load_aoi(db_manager, aoi_id)
+    assert scheduled_task_id == published[1][1] and run_started_at is None
+
+
+def test_run_starting_during_sweep_keeps_its_claim(db_manager, scheduled_aoi, monkeypatch):
+    aoi_id, run_at, published = scheduled_aoi()
+    tasks.sweep_scheduled_analyses()
+    task_id = published[0][1]
+
+    # The published task starts between the sweep's SELECT and its claim, and the
+    # AOI is due a priority promotion, so the sweep tries to republish it
+    rank = tasks.effective_rank
+
+    def start_run(priority, next_run_at, now):
+        with db_manager.get_session() as session:
+            session.query(AreaOfInterest).filter_by(id=aoi_id).update({'run_started_at': datetime.utcnow()})
+        return rank(priority, next_run_at, now)
+
+    monkeypatch.setattr(tasks, 'effective_rank', start_run)
+    monkeypatch.setattr(tasks, 'promoted_since', lambda *args: True)
+
+    assert tasks.sweep_scheduled_analyses() == 0
+    assert len(published) == 1
+    next_run_at, scheduled_task_id, run_started_at = load_aoi(db_manager, aoi_id)
+    assert scheduled_task_id == task_id and run_started_at is not None
+
+
+def test_task_does_not_start_on_a_running_claim(db_manager, scheduled_aoi):
+    aoi_id, run_at, published = scheduled_aoi()
+    tasks.sweep_scheduled_analyses()
+    task_id = published[0][1]
+
+    # A duplicate delivery of the task arrives while the first one is running
+    with db_manager.get_session() as session:
+        session.query(AreaOfInterest).filter_by(id=aoi_id).update({'run_started_at': datetime.utcnow()})
+
+    result = tasks.run_scheduled_analysis.apply(args=[aoi_id], task_id=task_id).get()
+    assert result.get('skipped'), result
+    with db_manager.get_session() as session:
+        assert session.query(AnalysisHistory).filter_by(aoi_id=aoi_id).count() == 0
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for token debits
+
+Fires 100 parallel debits at a user who can afford only some of them and
+checks that no token is spent twice: exactly `balance` debits succeed, the
+balance ends at zero and every success has exactly one ledger row.
+
+Runs against TEST_DATABASE_URL (e.g. a scratch PostgreSQL database) when
+set, otherwise against a temporary SQLite file.
+
+    python -m pytest tests/test_token_concurrency.py
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models import User, TokenTransaction, AnalysisHistory
+
+PARALLEL_DEBITS = 100
+
+
+@pytest.fixture
+def db_manager(make_db_manager):
+    return make_db_manager({'pool_size': PARALLEL_DEBITS, 'max_overflow': 0}, use_test_database=True)
+
+
+def create_user(db_manager, tokens):
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id=f'concurrency_{os.urandom(6).hex()}', email='concurrency@example.com',
+                    tokens_remaining=tokens, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        return user.id
+
+
+def run_parallel(calls):
+    """Run the callables at once (released together by a barrier) and return their results"""
+    barrier = threading.Barrier(len(calls))
+
+    def run(call):
+        barrier.wait()
+        return call()
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        return list(pool.map(run, calls))
+
+
+def user_state(db_manager, user_id):
+    with db_manager.get_session() as session:
+        user = session.query(User).filter_by(id=user_id).one()
+        ledger = session.query(
+            TokenTransaction.balance_before, TokenTransaction.balance_after
+        ).filter_by(user_id=user_id).all()
+        return user.tokens_remaining, user.total_tokens_used, ledger
+
+
+def test_no_double_spend(db_manager):
+    starting_balance = 37
+    user_id = create_user(db_manager, starting_balance)
+
+    results = run_parallel([
+        lambda i=i: db_manager.use_token(user_id, 1, f"concurrency test {i}")
+        for i in range(PARALLEL_DEBITS)
+    ])
+
+    successes = [message for success, message in results if success]
+    failures = [message for success, message in results if not success]
+    balance, total_used, ledger = user_state(db_manager, user_id)
+
+    assert len(successes) == starting_balance, f"{len(successes)} debits succeeded"
+    assert set(failures) <= {'Insufficient tokens'}, set(failures)
+    assert balance == 0, f"balance ended at {balance}"
+    assert total_used == starting_balance
+    assert len(ledger) == starting_balance
+    # Each debit saw a distinct balance: the ledger forms an unbroken chain
+    assert sorted(tx.balance_after for tx in ledger) == list(range(starting_balance))
+    assert all(tx.balance_before == tx.balance_after + 1 for tx in ledger)
+
+
+def test_grants_and_debits_interleave(db_manager):
+    user_id = create_user(db_manager, 10)
+
+    calls = []
+    for i in range(PARALLEL_DEBITS):
+        if i % 4 == 0:
+            calls.append(lambda: (db_manager.add_tokens_to_user(user_id, 2)['success'], 'grant'))
+        else:
+            calls.append(lambda: db_manager.use_token(user_id, 1))
+    results = run_parallel(calls)
+
+    grants = sum(1 for success, kind in results if success and kind == 'grant')
+    debits = sum(1 for success, kind in results if success and kind != 'grant')
+    balance, total_used, ledger = user_state(db_manager, user_id)
+
+    assert grants == PARALLEL_DEBITS // 4
+    assert balance == 10 + 2 * grants - debits, "a concurrent update was lost"
+    assert balance >= 0
+    assert total_used == debits
+    assert len(ledger) == grants + debits
+
+
+def test_charged_analysis_is_all_or_nothing(db_manager):
+    user_id = create_user(db_manager, 3)
+
+    def charge(i, image_filenames):
+        return db_manager.save_charged_analysis(
+            user_id=user_id, aoi_id=None, process_id=f'job-{i}', tokens_used=1, reference_id=f"Analysis job {i}",
+            operation_name='test', location_description='Harbor', bbox_coordinates=[0, 0, 1, 1],
+            image_filenames=image_filenames, meta={}
+        )
+
+    # A history insert that fails takes the debit down with it
+    try:
+        charge('broken', None)
+        assert False, "save_charged_analysis should have raised"
+    except AttributeError:
+        pass
+    assert user_state(db_manager, user_id) == (3, 0, [])
+
+    results = run_parallel([lambda i=i: charge(i, {}) for i in range(10)])
+    balance, total_used, ledger = user_state(db_manager, user_id)
+    with db_manager.get_session() as session:
+        saved = session.query(AnalysisHistory).filter_by(user_id=user_id).count()
+
+    assert sum(1 for success, _, _ in results if success) == 3
+    assert {message for success, message, _ in results if not success} == {'Insufficient tokens'}
+    assert balance == 0 and total_used == 3
+    assert len(ledger) == saved == 3
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for the authenticated-user cache: TTL and LRU bounds, invalidation
+once a transaction that changed the user commits (not before, not on
+rollback), and the read_started guard that keeps a read which raced with
+such a commit out of the cache.
+
+    python -m pytest tests/test_user_cache.py
+"""
+import time
+
+import pytest
+
+import database
+from models import User
+from services import user_cache as user_cache_module
+from services.user_cache import UserCache
+from utils.decorators import _resolve_user
+
+
+def user_dict(user_id, clerk_user_id=None, tokens=5):
+    return {'id': user_id, 'clerk_user_id': clerk_user_id or f'clerk_{user_id}', 'tokens_remaining': tokens}
+
+
+def test_cached_users_are_copies():
+    cache = UserCache(ttl=60)
+    cache.set(user_dict(1))
+
+    user = cache.get('clerk_1')
+    user['tokens_remaining'] = 0
+    assert cache.get('clerk_1')['tokens_remaining'] == 5
+    assert cache.get('clerk_2') is None
+    assert cache.get_metrics()['hits'] == 2
+
+
+def test_entries_expire_and_are_bounded():
+    cache = UserCache(ttl=0.05, max_entries=2)
+    for user_id in (1, 2, 3):
+        cache.set(user_dict(user_id))
+    assert cache.get('clerk_1') is None  # least recently used, evicted
+    assert cache.get('clerk_3') is not None
+
+    time.sleep(0.06)
+    assert cache.get('clerk_3') is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = UserCache(ttl=0)
+    cache.set(user_dict(1))
+    assert cache.get('clerk_1') is None
+
+
+def test_read_that_raced_with_invalidation_is_not_cached():
+    cache = UserCache(ttl=60)
+
+    read_started = time.monotonic()
+    cache.invalidate(1)  # a change commits while the read is in flight
+    cache.set(user_dict(1, tokens=5), read_started=read_started)
+    assert cache.get('clerk_1') is None
+
+    # A read that started after the change is fresh
+    cache.set(user_dict(1, tokens=4), read_started=time.monotonic())
+    assert cache.get('clerk_1')['tokens_remaining'] == 4
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Fresh in-process cache used by the database and require_auth"""
+    cache = UserCache(ttl=60)
+    monkeypatch.setattr(database, 'user_cache', cache)
+    monkeypatch.setattr(user_cache_module, 'user_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def cached_user(db_manager, cache):
+    """A user with 5 tokens, cached; returns (user_id, clerk_user_id)"""
+    user = db_manager.get_or_create_user('cache_user', email='cache@example.com')
+    cache.set(user)
+    return user['id'], user['clerk_user_id']
+
+
+def test_token_debit_invalidates_after_commit(db_manager, cache, cached_user):
+    user_id, clerk_user_id = cached_user
+
+    success, message = db_manager.use_token(user_id, 1, 'cache test')
+    assert success, message
+    assert cache.get(clerk_user_id) is None
+
+
+def test_invalidation_waits_for_commit(db_manager, cache, cached_user):
+    user_id, clerk_user_id = cached_user
+
+    with db_manager.get_session() as session:
+        session.query(User).filter_by(id=user_id).one().role = 'admin'
+        session.flush()
+        assert cache.get(clerk_user_id)['role'] == 'user'  # not committed yet
+
+    assert cache.get(clerk_user_id) is None
+
+
+def test_rolled_back_change_keeps_the_entry(db_manager, cache, cached_user):
+    user_id, clerk_user_id = cached_user
+
+    with pytest.raises(RuntimeError):
+        with db_manager.get_session() as session:
+            session.query(User).filter_by(id=user_id).one().tokens_remaining = 100
+            session.flush()
+            raise RuntimeError("request failed")
+
+    assert cache.get(clerk_user_id)['tokens_remaining'] == 5
+
+
+def test_unrelated_writes_keep_the_entry(db_manager, cache, cached_user):
+    user_id, clerk_user_id = cached_user
+    db_manager.create_aoi(user_id, {'name': 'Harbor', 'bbox_coordinates': [0, 0, 1, 1]})
+    assert cache.get(clerk_user_id) is not None
+
+
+def test_resolve_user_does_not_cache_a_read_that_raced_with_a_debit(shared_db_manager, cache, monkeypatch):
+    db_manager = shared_db_manager
+    user_id = db_manager.get_or_create_user('race_user', email='race@example.com')['id']
+    claims = {'sub': 'race_user', 'email': 'race@example.com'}
+
+    read_user = db_manager.get_or_create_user
+
+    def read_then_debit(**kwargs):
+        # The debit commits after this read but before require_auth caches it
+        user = read_user(**kwargs)
+        assert db_manager.use_token(user_id, 1, 'concurrent request')[0]
+        return user
+
+    monkeypatch.setattr(db_manager, 'get_or_create_user', read_then_debit)
+    assert _resolve_user(claims)['tokens_remaining'] == 5
+    assert cache.get('race_user') is None
+
+    # The next request reads and caches the committed balance
+    monkeypatch.setattr(db_manager, 'get_or_create_user', read_user)
+    assert _resolve_user(claims)['tokens_remaining'] == 4
+    assert cache.get('race_user')['tokens_remaining'] == 4
+    assert _resolve_user(claims)['tokens_remaining'] == 4
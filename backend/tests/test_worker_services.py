@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-process worker service graph: it is built once per worker
+process (by the worker_process_init hook, or on first use), shared by every
+task the process runs, and each run still gets its own pipeline.
+
+    python -m pytest tests/test_worker_services.py
+"""
+import threading
+import uuid
+
+import pytest
+from celery.signals import worker_process_init
+
+import tasks
+from models import User
+from services import worker_services
+from services.s3_service import s3_service
+
+
+class StubSatelliteService:
+    def download_image(self, bbox, date_from, date_to):
+        return f'image {date_from}'
+
+    def save_image(self, image, filename, aoi_id=None):
+        return {'local_path': filename, 's3_key': None}
+
+    def create_heatmap(self, image1, image2, path, aoi_id=None):
+        return {'local_path': path, 's3_key': None}
+
+    def calculate_change_percentage(self, image1, image2):
+        return 1.5
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """No services built yet in this 'process'; counts satellite service and S3 client builds"""
+    counts = {'satellite': 0, 's3': 0}
+
+    def build_satellite_service():
+        counts['satellite'] += 1
+        return StubSatelliteService()
+
+    def connect():
+        counts['s3'] += 1
+
+    monkeypatch.setattr(worker_services, '_services', None)
+    monkeypatch.setattr(worker_services, 'build_satellite_service', build_satellite_service)
+    monkeypatch.setattr(s3_service, 'connect', connect)
+    return counts
+
+
+def test_built_once_on_first_use(db_manager, builds):
+    services = worker_services.get_worker_services(db_manager)
+    assert worker_services.get_worker_services(db_manager) is services
+    assert builds == {'satellite': 1, 's3': 1}
+
+    # Pipelines hold per-run timings, so each run gets a new one over the shared services
+    first, second = services.new_pipeline(), services.new_pipeline()
+    assert first is not second
+    assert first.satellite_service is second.satellite_service is services.satellite_service
+
+
+def test_concurrent_first_use_builds_once(db_manager, builds):
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def use():
+        barrier.wait()
+        seen.append(worker_services.get_worker_services(db_manager))
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(services) for services in seen}) == 1
+    assert builds['satellite'] == 1
+
+
+def test_worker_process_init_builds_the_process_graph(db_manager, builds, monkeypatch):
+    inherited = worker_services.get_worker_services(db_manager)
+    monkeypatch.setattr(tasks, 'db_manager', db_manager)
+
+    # A forked child must not keep using the parent's clients
+    worker_process_init.send(sender=None)
+    services = worker_services.get_worker_services(db_manager)
+    assert services is not inherited
+    assert builds == {'satellite': 2, 's3': 2}
+
+
+def test_tasks_reuse_the_process_graph(shared_db_manager, builds):
+    db_manager = shared_db_manager
+    with db_manager.get_session() as session:
+        user = User(clerk_user_id='worker_user', email='worker@example.com', tokens_remaining=5, total_tokens_used=0)
+        session.add(user)
+        session.flush()
+        user_id = user.id
+
+    worker_process_init.send(sender=None)
+    for _ in range(3):
+        job_id = str(uuid.uuid4())
+        db_manager.create_analysis_job(job_id, user_id, 'manual_comparison', {
+            'bbox_coordinates': [34.0, 31.0, 34.1, 31.1],
+            'dates': {'date1_from': '2024-01-01', 'date1_to': '2024-01-07',
+                      'date2_from': '2024-02-01', 'date2_to': '2024-02-07'}
+        })
+        result = tasks.run_analysis_job.apply(args=[job_id], task_id=job_id).get()
+        assert result['success'], result
+
+    assert builds == {'satellite': 1, 's3': 1}
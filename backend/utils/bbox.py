@@ -0,0 +1,106 @@
+"""
+Bounding-box helpers for the AOI spatial queries
+
+AOI boxes are stored in Sentinel order, [lon_min, lat_min, lon_max, lat_max],
+and mirrored into numeric min/max columns for indexing. Distances use the
+equirectangular approximation, which is accurate to well under a percent at
+AOI scales. Boxes crossing the antimeridian are not supported.
+"""
+import math
+from typing import List, Optional, Sequence, Tuple
+
+KM_PER_DEGREE = 111.32
+BBox = Tuple[float, float, float, float]  # (min_lon, min_lat, max_lon, max_lat)
+
+
+def bbox_bounds(coordinates: Optional[Sequence]) -> Optional[BBox]:
+    """(min_lon, min_lat, max_lon, max_lat) of a stored bbox_coordinates list, None if malformed"""
+    if not isinstance(coordinates, (list, tuple)) or len(coordinates) != 4:
+        return None
+    try:
+        lon1, lat1, lon2, lat2 = (float(value) for value in coordinates)
+    except (TypeError, ValueError):
+        return None
+    return min(lon1, lon2), min(lat1, lat2), max(lon1, lon2), max(lat1, lat2)
+
+
+def parse_bbox(value: str) -> BBox:
+    """Query-string bbox 'min_lon,min_lat,max_lon,max_lat'"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise ValueError("bbox must be within [-180, -90, 180, 90] with min values <= max values")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def parse_point(value: str) -> Tuple[float, float]:
+    """Query-string point 'lon,lat'"""
+    try:
+        lon, lat = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError("point must be lon,lat")
+    if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        raise ValueError("point must be within [-180, -90, 180, 90]")
+    return lon, lat
+
+
+def tile_bbox(z: int, x: int, y: int) -> BBox:
+    """Bounds of a web-mercator (XYZ) map tile"""
+    n = 2 ** z
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError(f"tile {z}/{x}/{y} does not exist")
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def bbox_tiles(bbox: BBox, zoom: int) -> List[Tuple[int, int, int]]:
+    """(z, x, y) of every web-mercator tile a box overlaps"""
+    n = 2 ** zoom
+    min_lon, min_lat, max_lon, max_lat = bbox
+
+    def column(lon):
+        return min(max(int((lon + 180.0) / 360.0 * n), 0), n - 1)
+
+    def row(lat):
+        lat = min(max(lat, -85.0511), 85.0511)
+        y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+        return min(max(int(y), 0), n - 1)
+
+    return [(zoom, x, y)
+            for x in range(column(min_lon), column(max_lon) + 1)
+            for y in range(row(max_lat), row(min_lat) + 1)]
+
+
+def point_bbox_distance_km(lon: float, lat: float, bbox: BBox) -> float:
+    """Distance from a point to the nearest point of a box (0 inside it)"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    dx = max(min_lon - lon, 0.0, lon - max_lon) * math.cos(math.radians(lat))
+    dy = max(min_lat - lat, 0.0, lat - max_lat)
+    return math.hypot(dx, dy) * KM_PER_DEGREE
+
+
+def km_window(lon: float, lat: float, radius_km: float) -> BBox:
+    """Box around a point containing every box within radius_km of it"""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return max(lon - dlon, -180.0), max(lat - dlat, -90.0), min(lon + dlon, 180.0), min(lat + dlat, 90.0)
+
+
+def covers_globe(bbox: BBox) -> bool:
+    """Whether a (clamped) search window already spans the whole globe"""
+    return bbox[0] <= -180.0 and bbox[1] <= -90.0 and bbox[2] >= 180.0 and bbox[3] >= 90.0
+
+
+def sorted_by_distance(lon: float, lat: float, rows: List, k: int) -> List[Tuple[float, object]]:
+    """The k rows (exposing min_lon .. max_lat) nearest to the point, as (distance_km, row)"""
+    ranked = sorted(
+        ((point_bbox_distance_km(lon, lat, (row.min_lon, row.min_lat, row.max_lon, row.max_lat)), row)
+         for row in rows),
+        key=lambda pair: (pair[0], pair[1].id)
+    )
+    return ranked[:k]
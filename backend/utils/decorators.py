@@ -1,6 +1,7 @@
 """
 Authentication and error handling decorators
 """
+import time
 import logging
 from functools import wraps
 from flask import request, jsonify
@@ -12,27 +13,47 @@ logger = logging.getLogger(__name__)
 class ClerkAuthenticator:
     def __init__(self, clerk_secret_key):
         self.clerk_secret_key = clerk_secret_key
+        self._verifier = None
     
-    def verify_token(self, token):
-        """Verify Clerk JWT token"""
-        try:
-            import jwt
+    @property
+    def verifier(self):
+        """Token verifier built from Config on first use"""
+        if self._verifier is None:
+            from services.jwt_verifier import JWKSKeyStore, TokenVerifier, jwks_url_from_publishable_key
             
-            # Remove 'Bearer ' prefix if present
-            if token.startswith('Bearer '):
-                token = token[7:]
+            refresh = {'refresh_interval': Config.JWKS_REFRESH_SECONDS}
+            jwks_url = Config.CLERK_JWKS_URL or jwks_url_from_publishable_key(Config.CLERK_PUBLISHABLE_KEY)
+            if Config.CLERK_JWKS_FILE:
+                key_store = JWKSKeyStore.from_file(Config.CLERK_JWKS_FILE, **refresh)
+            elif jwks_url:
+                key_store = JWKSKeyStore.from_url(jwks_url, **refresh)
+            else:
+                key_store = None
+                if not Config.AUTH_SKIP_SIGNATURE_VERIFICATION:
+                    logger.error("No CLERK_JWKS_URL, CLERK_JWKS_FILE or CLERK_PUBLISHABLE_KEY - all tokens will be rejected")
             
-            # In production, use proper signature verification
-            options = {"verify_signature": False} if Config.DEBUG else {}
+            if Config.AUTH_SKIP_SIGNATURE_VERIFICATION:
+                logger.warning("AUTH_SKIP_SIGNATURE_VERIFICATION is set - JWT signatures are NOT verified")
             
-            decoded = jwt.decode(
-                token,
-                self.clerk_secret_key,
-                algorithms=["RS256"],
-                options=options
+            self._verifier = TokenVerifier(
+                key_store,
+                issuer=Config.CLERK_ISSUER,
+                authorized_parties=Config.CLERK_AUTHORIZED_PARTIES,
+                cache_size=Config.JWT_CACHE_SIZE,
+                skip_signature=Config.AUTH_SKIP_SIGNATURE_VERIFICATION
             )
-            
-            return decoded
+        return self._verifier
+    
+    def verify_token(self, token):
+        """Verify Clerk JWT token"""
+        import jwt
+        
+        # Remove 'Bearer ' prefix if present
+        if token.startswith('Bearer '):
+            token = token[7:]
+        
+        try:
+            return self.verifier.verify(token)
         except jwt.ExpiredSignatureError:
             logger.warning("JWT token expired")
             return None
@@ -45,6 +66,34 @@ class ClerkAuthenticator:
 clerk_auth = ClerkAuthenticator(Config.CLERK_SECRET_KEY)
 
 
+def _resolve_user(user_data):
+    """
+    Database user for verified token claims.
+    
+    Served from the user cache while the cached profile still matches the
+    claims; otherwise get_or_create_user creates or updates the row.
+    """
+    from services.user_cache import user_cache
+    
+    clerk_user_id = user_data.get('sub')
+    claims = {
+        'email': user_data.get('email'),
+        'first_name': user_data.get('given_name') or user_data.get('first_name'),
+        'last_name': user_data.get('family_name') or user_data.get('last_name')
+    }
+    
+    user = user_cache.get(clerk_user_id)
+    if user and all(not value or user.get(field) == value for field, value in claims.items()):
+        return user
+    
+    from shared_db import db_manager
+    
+    read_started = time.monotonic()
+    user = db_manager.get_or_create_user(clerk_user_id=clerk_user_id, **claims)
+    user_cache.set(user, read_started=read_started)
+    return user
+
+
 def require_auth(f):
     """Enhanced authentication decorator"""
     @wraps(f)
@@ -54,6 +103,8 @@ def require_auth(f):
             return f(*args, **kwargs)
             
         auth_header = request.headers.get('Authorization')
+        if not auth_header and getattr(f, 'allow_query_token', False) and request.args.get('token'):
+            auth_header = f"Bearer {request.args.get('token')}"
         if not auth_header:
             return jsonify({
                 'error': 'No authorization token provided',
@@ -68,23 +119,10 @@ def require_auth(f):
                     'code': 'INVALID_TOKEN'
                 }), 401
             
-            logger.info(f"Auth successful for: {user_data.get('sub')}")
-            
-            # Log successful authentication
-            logger.info(f"User authenticated: {user_data.get('email')} (Clerk ID: {user_data.get('sub')})")
-            
-            # Get or create user in database
-            from shared_db import db_manager
-            
-            user = db_manager.get_or_create_user(
-                clerk_user_id=user_data.get('sub'),
-                email=user_data.get('email'),
-                first_name=user_data.get('given_name') or user_data.get('first_name'),
-                last_name=user_data.get('family_name') or user_data.get('last_name')
-            )
+            logger.debug(f"User authenticated: {user_data.get('email')} (Clerk ID: {user_data.get('sub')})")
             
-            logger.debug(f"Request user: {user}")
-            request.user = user
+            request.user = _resolve_user(user_data)
+            logger.debug(f"Request user: {request.user}")
             return f(*args, **kwargs)
             
         except Exception as e:
@@ -97,6 +135,30 @@ def require_auth(f):
     return decorated_function
 
 
+def allow_query_token(f):
+    """Accept the bearer token as ?token= (EventSource cannot send headers)"""
+    f.allow_query_token = True
+    return f
+
+
+def admission_controlled(f):
+    """Run under the analysis admission controller; reject with 429 and Retry-After when overloaded"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from services.admission_service import admission_controller, AdmissionRejected
+        from utils.responses import too_many_requests_response
+        
+        user = getattr(request, 'user', None) or {}
+        try:
+            with admission_controller.admit(user.get('id')):
+                return f(*args, **kwargs)
+        except AdmissionRejected as e:
+            logger.warning(f"Admission rejected for user {user.get('id')} ({e.code}), retry after {e.retry_after}s")
+            return too_many_requests_response(e.message, e.code, e.retry_after)
+    
+    return decorated_function
+
+
 def handle_errors(f):
     """Global error handling decorator"""
     @wraps(f)
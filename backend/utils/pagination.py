@@ -0,0 +1,137 @@
+"""
+Keyset pagination utilities
+
+Lists are ordered newest first on (timestamp, id). A page is fetched with
+WHERE (timestamp, id) < (last timestamp, last id) so that every page costs
+the same index range scan regardless of depth, unlike OFFSET. Clients get
+the position of the last row back as an opaque cursor.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, and_, text
+
+TOTAL_MODES = ('none', 'estimate', 'exact')
+
+
+class InvalidCursor(ValueError):
+    """Cursor that was not produced by encode_cursor (reported as a 400 by handle_errors)"""
+
+
+def encode_cursor(timestamp: Optional[datetime], row_id: int) -> str:
+    """Opaque cursor for the row at (timestamp, id)"""
+    payload = json.dumps([timestamp.isoformat() if timestamp else None, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverse of encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(row_id, int):
+            raise TypeError('cursor id must be an integer')
+        return (datetime.fromisoformat(timestamp) if timestamp else None), row_id
+    except (ValueError, TypeError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid pagination cursor: {cursor!r}") from e
+
+
+def parse_total_mode(value: Optional[str]) -> str:
+    """Validate the `total` query parameter (none, estimate or exact)"""
+    mode = (value or 'none').lower()
+    if mode not in TOTAL_MODES:
+        raise ValueError(f"total must be one of: {', '.join(TOTAL_MODES)}")
+    return mode
+
+
+def keyset_page(query, timestamp_column, id_column, limit: int,
+                cursor: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of `query`, newest first, after `cursor`.
+
+    Fetches limit + 1 rows to tell whether another page exists. Returns the
+    rows and the cursor for the next page (None on the last page). Rows
+    must expose the timestamp and id columns under their attribute names.
+    """
+    if cursor:
+        after_timestamp, after_id = decode_cursor(cursor)
+        if after_timestamp is None:
+            # NULL timestamps sort first in PostgreSQL DESC order
+            query = query.filter(or_(
+                and_(timestamp_column.is_(None), id_column < after_id),
+                timestamp_column.isnot(None)
+            ))
+        else:
+            query = query.filter(or_(
+                timestamp_column < after_timestamp,
+                and_(timestamp_column == after_timestamp, id_column < after_id)
+            ))
+
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+
+
+def merge_keyset_pages(pages: List[Tuple[List[Any], Optional[str]]], limit: int,
+                       timestamp_key: str, id_key: str) -> Tuple[List[Any], Optional[str]]:
+    """
+    Combine keyset_page results for one list stored in several tables (the
+    hot and archive history tiers), each fetched with the same cursor and
+    limit. Returns the newest `limit` rows across all pages and the cursor
+    after the last of them, which continues every table at once.
+    """
+    rows = [row for page_rows, _ in pages for row in page_rows]
+    # Same order as keyset_page: timestamp DESC with NULLs first, then id DESC
+    rows.sort(key=lambda row: (getattr(row, timestamp_key) is None,
+                               getattr(row, timestamp_key) or datetime.min,
+                               getattr(row, id_key)), reverse=True)
+
+    has_more = len(rows) > limit or any(next_cursor for _, next_cursor in pages)
+    rows = rows[:limit]
+    if not has_more or not rows:
+        return rows, None
+
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_key), getattr(last, id_key))
+
+
+def count_rows(session, query, table_name: str, mode: str) -> Optional[Dict[str, Any]]:
+    """
+    Row count for a list endpoint: None, the planner estimate or an exact COUNT(*).
+
+    The estimate comes from pg_class.reltuples, so callers only offer it for
+    unfiltered tables. Other databases (and never-analyzed tables) fall back
+    to COUNT(*).
+    """
+    if mode == 'none':
+        return None
+
+    if mode == 'estimate' and session.get_bind().dialect.name == 'postgresql':
+        estimate = session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table_name"),
+            {'table_name': table_name}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return {'value': int(estimate), 'estimated': True}
+
+    return {'value': query.order_by(None).count(), 'estimated': False}
+
+
+def page_info(limit: int, next_cursor: Optional[str], total: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Pagination block for API responses"""
+    info = {
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None
+    }
+    if total is not None:
+        info['total'] = total['value']
+        info['total_estimated'] = total['estimated']
+    return info
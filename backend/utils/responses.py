@@ -34,6 +34,13 @@ def error_response(message="An error occurred", code="ERROR", status_code=400, d
     return jsonify(response), status_code
 
 
+def too_many_requests_response(message="Too many requests", code="RATE_LIMITED", retry_after=1):
+    """Create a 429 response with a Retry-After header"""
+    body, status_code = error_response(message=message, code=code, status_code=429,
+                                       details={'retry_after': retry_after})
+    return body, status_code, {'Retry-After': str(retry_after)}
+
+
 def validation_error_response(message="Validation failed", errors=None):
     """Create a validation error response"""
     return error_response(
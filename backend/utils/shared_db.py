@@ -1,10 +1,5 @@
 """
 Shared Database Instance
-Provides a single DatabaseManager instance for all controllers to prevent
-multiple database connections and slow API performance.
+Kept for older imports; the process-wide manager lives in shared_db.py.
 """
-from database import DatabaseManager
-from config import Config
-
-# Single shared database instance
-db_manager = DatabaseManager(Config.DATABASE_URL, Config.SQLALCHEMY_ENGINE_OPTIONS)
\ No newline at end of file
+from shared_db import db_manager, get_db_manager  # noqa: F401
@@ -0,0 +1,48 @@
+"""
+Time bucketing for aggregate queries
+
+bucket_start() is a SQL expression for the start of the day, ISO week
+(Monday) or month containing a timestamp: date_trunc on PostgreSQL,
+date()/strftime() on SQLite. Grouping and ordering by it gives one
+chronological row per bucket.
+"""
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy.sql import func
+
+BUCKETS = ('day', 'week', 'month')
+
+
+def parse_bucket(value: str, allow_raw: bool = False) -> str:
+    """Validate a `bucket` query parameter (day, week, month and, with allow_raw, raw)"""
+    bucket = (value or 'day').lower()
+    choices = BUCKETS + ('raw',) if allow_raw else BUCKETS
+    if bucket not in choices:
+        raise ValueError(f"bucket must be one of: {', '.join(choices)}")
+    return bucket
+
+
+def bucket_start(column, bucket: str, dialect_name: str):
+    """SQL expression for the start of the bucket containing `column`"""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+
+    if dialect_name == 'postgresql':
+        return func.date_trunc(bucket, column)
+
+    if bucket == 'day':
+        return func.date(column)
+    if bucket == 'week':
+        # 'weekday 0' moves forward to Sunday; six days back is that week's Monday
+        return func.date(column, 'weekday 0', '-6 days')
+    return func.strftime('%Y-%m-01', column)
+
+
+def bucket_label(value: Any) -> str:
+    """ISO date of a bucket_start value (a datetime on PostgreSQL, a string on SQLite)"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10]
@@ -43,6 +43,10 @@ export const API_ENDPOINTS = {
   // Analysis endpoints
   PROCESS_IMAGES: '/api/process-satellite-images',
   RUN_ANALYSIS: (id) => `/api/aoi/${id}/run-analysis`,
+  JOB_STATUS: (jobId) => `/api/jobs/${jobId}`,
+  
+  // Server-Sent Events (EventSource passes the token as ?token=)
+  EVENTS_STREAM: '/api/events/stream',
   
   // Admin endpoints
   ADMIN_STATS: '/api/admin/stats',